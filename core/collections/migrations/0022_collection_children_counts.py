@@ -0,0 +1,34 @@
+# Generated by Django 3.1.8 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collections', '0021_collection_meta'),
+    ]
+
+    operations = [
+        # existing rows are left uncounted (null) here, counted by 0025_collection_count_children
+        migrations.AddField(
+            model_name='collection',
+            name='active_concepts',
+            field=models.IntegerField(blank=True, null=True, default=None),
+        ),
+        migrations.AddField(
+            model_name='collection',
+            name='active_mappings',
+            field=models.IntegerField(blank=True, null=True, default=None),
+        ),
+        migrations.AlterField(
+            model_name='collection',
+            name='active_concepts',
+            field=models.IntegerField(blank=True, null=True, default=0),
+        ),
+        migrations.AlterField(
+            model_name='collection',
+            name='active_mappings',
+            field=models.IntegerField(blank=True, null=True, default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.8 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collections', '0022_collection_children_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collection',
+            name='_last_child_update',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
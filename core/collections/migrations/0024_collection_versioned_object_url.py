@@ -0,0 +1,18 @@
+# Generated by Django 3.1.8 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collections', '0023_collection_last_child_update'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collection',
+            name='_versioned_object_url',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
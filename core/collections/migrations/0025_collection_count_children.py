@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def count_children(apps, schema_editor):
+    Collection = apps.get_model('collections', 'Collection')
+    for collection in Collection.objects.filter(
+            Q(active_concepts__isnull=True) | Q(active_mappings__isnull=True)).only('id').iterator():
+        Collection.objects.filter(id=collection.id).update(**{
+            field: getattr(collection, relation).filter(
+                retired=False, is_active=True).distinct('versioned_object_id').count()
+            for relation, field in dict(concepts='active_concepts', mappings='active_mappings').items()
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collections', '0024_collection_versioned_object_url'),
+        ('concepts', '0012_auto_20210414_1031'),
+        ('mappings', '0016_mapping_versioned_object_url'),
+    ]
+
+    operations = [
+        # versions that existed before the counts were stored
+        migrations.RunPython(count_children, migrations.RunPython.noop)
+    ]
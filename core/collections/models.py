@@ -27,10 +27,11 @@ from core.mappings.views import MappingListView
 class Collection(ConceptContainerModel):
     OBJECT_TYPE = COLLECTION_TYPE
     OBJECT_VERSION_TYPE = COLLECTION_VERSION_TYPE
+    index_membership_fields = ['collection', 'collection_owner_url', 'collection_version']
     es_fields = {
         'collection_type': {'sortable': True, 'filterable': True, 'facet': True, 'exact': True},
-        'mnemonic': {'sortable': True, 'filterable': True, 'exact': True},
-        'name': {'sortable': True, 'filterable': True, 'exact': True},
+        'mnemonic': {'sortable': True, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 2},
+        'name': {'sortable': True, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 5},
         'last_update': {'sortable': True, 'filterable': False, 'default': 'desc'},
         'locale': {'sortable': False, 'filterable': True, 'facet': True},
         'owner': {'sortable': True, 'filterable': True, 'facet': True, 'exact': True},
@@ -95,6 +96,9 @@ class Collection(ConceptContainerModel):
     def versions_url(self):
         return reverse_resource(self, 'collection-version-list')
 
+    def get_index_filters(self):
+        return dict(**super().get_index_filters(), collection_owner_url=self.parent_url)
+
     def update_version_data(self, obj=None):
         super().update_version_data(obj)
 
@@ -129,7 +133,7 @@ class Collection(ConceptContainerModel):
             self.concepts.add(*reference.concepts)
         if reference.mappings:
             self.mappings.add(*reference.mappings)
-        self.save()  # update counts
+        self.save(update_fields=self.get_save_fields())
 
     def validate(self, reference):
         reference.full_clean()
@@ -270,8 +274,8 @@ class Collection(ConceptContainerModel):
         if user and user.is_authenticated:
             collection_version.updated_by = user
             self.updated_by = user
-        collection_version.save()
-        self.save()
+        collection_version.save(update_fields=['updated_by', 'updated_at'])
+        self.save(update_fields=['updated_by', 'updated_at'])
         return added_references, errors
 
     def add_references(self, expressions, user=None):
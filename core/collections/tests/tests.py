@@ -1,6 +1,7 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db.models import QuerySet
-from mock import patch
+from mock import patch, Mock
 
 from core.collections.models import CollectionReference, Collection
 from core.collections.tests.factories import OrganizationCollectionFactory
@@ -261,6 +262,72 @@ class CollectionTest(OCLTestCase):
         collection.concepts.add(concept)
         self.assertEqual(collection.last_child_update, concept.updated_at)
 
+    def test_get_index_filters(self):
+        collection = OrganizationCollectionFactory(version='v1')
+
+        self.assertEqual(
+            collection.get_index_filters(),
+            dict(
+                collection=collection.mnemonic, collection_owner_url=collection.organization.url,
+                collection_version='v1'
+            )
+        )
+
+    @patch('core.common.models.UpdateByQuery')
+    def test_index_membership(self, update_by_query_klass_mock):
+        from core.concepts.documents import ConceptDocument
+        collection = OrganizationCollectionFactory(version='v1')
+        concept = ConceptFactory()
+        collection.concepts.add(concept)
+        update_by_query = update_by_query_klass_mock.return_value
+        update_by_query.filter.return_value = update_by_query
+        update_by_query.script.return_value = update_by_query
+        update_by_query.params.return_value = update_by_query
+        update_by_query.execute.return_value = Mock(total=1)
+
+        collection.index_membership(collection.concepts, ConceptDocument)
+        update_by_query_klass_mock.assert_not_called()  # test mode
+
+        settings.TEST_MODE = False
+        try:
+            collection.index_membership(collection.concepts, ConceptDocument)
+        finally:
+            settings.TEST_MODE = True
+
+        update_by_query_klass_mock.assert_called_once_with(using='default', index='concepts')
+        update_by_query.filter.assert_called_once_with('ids', values=[concept.id])
+        self.assertEqual(
+            update_by_query.script.call_args[1]['params'],
+            dict(
+                values=dict(
+                    collection=collection.mnemonic, collection_owner_url=collection.organization.url,
+                    collection_version='v1'
+                )
+            )
+        )
+        update_by_query.params.assert_called_once_with(conflicts='proceed', refresh=True)
+
+    @patch('core.common.models.ConceptContainerModel.batch_index')
+    @patch('core.common.models.UpdateByQuery')
+    def test_index_membership_when_children_not_indexed(self, update_by_query_klass_mock, batch_index_mock):
+        from core.concepts.documents import ConceptDocument
+        collection = OrganizationCollectionFactory(version='v1')
+        concept = ConceptFactory()
+        collection.concepts.add(concept)
+        update_by_query = update_by_query_klass_mock.return_value
+        update_by_query.filter.return_value.script.return_value.params.return_value.execute.return_value = Mock(
+            total=0)
+
+        settings.TEST_MODE = False
+        try:
+            collection.index_membership(collection.concepts, ConceptDocument)
+        finally:
+            settings.TEST_MODE = True
+
+        batch_index_mock.assert_called_once()
+        self.assertEqual(list(batch_index_mock.call_args[0][0]), [concept])
+        self.assertEqual(batch_index_mock.call_args[0][1], ConceptDocument)
+
 
 class CollectionReferenceTest(OCLTestCase):
     def test_invalid_expression(self):
@@ -143,35 +143,6 @@ class CollectionListView(CollectionBaseView, ConceptDictionaryCreateMixin, ListW
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
-    def get_csv_rows(self, queryset=None):  # pragma: no cover
-        if not queryset:
-            queryset = self.get_queryset()
-
-        values = queryset.values('mnemonic', 'name', 'full_name', 'collection_type', 'description', 'default_locale',
-                                 'supported_locales', 'website', 'external_id', 'updated_at', 'updated_by', 'uri')
-
-        for value in values:
-            value['Owner'] = Collection.objects.get(uri=value['uri']).parent.mnemonic
-            value['Collection ID'] = value.pop('mnemonic')
-            value['Collection Name'] = value.pop('name')
-            value['Collection Full Name'] = value.pop('full_name')
-            value['Collection Type'] = value.pop('collection_type')
-            value['Description'] = value.pop('description')
-            value['Default Locale'] = value.pop('default_locale')
-            value['Supported Locales'] = ",".join(value.pop('supported_locales'))
-            value['Website'] = value.pop('website')
-            value['External ID'] = value.pop('external_id')
-            value['Last Updated'] = value.pop('updated_at')
-            value['Updated By'] = value.pop('updated_by')
-            value['URI'] = value.pop('uri')
-
-        values.field_names.extend([
-            'Owner', 'Collection ID', 'Collection Name', 'Collection Full Name', 'Collection Type', 'Description',
-            'Default Locale', 'Supported Locales', 'Website', 'External ID', 'Last Updated', 'Updated By', 'URI'
-        ])
-        del values.field_names[0:12]
-        return values
-
 
 class CollectionLogoView(CollectionBaseView, BaseLogoView):
     serializer_class = CollectionDetailSerializer
@@ -550,8 +521,8 @@ class CollectionExtraRetrieveUpdateDestroyView(CollectionExtrasBaseView, Retriev
         head = instance.get_head()
         head.extras = get(head, 'extras', {})
         head.extras.update(instance.extras)
-        instance.save()
-        head.save()
+        instance.save(update_fields=instance.get_save_fields())
+        head.save(update_fields=head.get_save_fields())
         return Response({key: value})
 
     def delete(self, request, *args, **kwargs):
@@ -564,8 +535,8 @@ class CollectionExtraRetrieveUpdateDestroyView(CollectionExtrasBaseView, Retriev
             head = instance.get_head()
             head.extras = get(head, 'extras', {})
             del head.extras[key]
-            instance.save()
-            head.save()
+            instance.save(update_fields=instance.get_save_fields())
+            head.save(update_fields=head.get_save_fields())
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(dict(detail=NOT_FOUND), status=status.HTTP_404_NOT_FOUND)
@@ -51,7 +51,10 @@ LIMIT_PARAM = 'limit'
 LOOKUP_ATTRIBUTES_MUST_BE_IMPORTED = 'Lookup attributes must be imported'
 LIST_DEFAULT_LIMIT = 25
 CSV_DEFAULT_LIMIT = 1000
+ESTIMATED_COUNT_THRESHOLD = 10000
+ESTIMATED_COUNT_KWARGS = ['org', 'user', 'user_is_self']  # owner scoping, the only url kwargs of estimated listings
 SEARCH_PARAM = 'q'
+SEARCH_CURSOR_PARAM = 'cursor'
 INCLUDE_FACETS = 'HTTP_INCLUDEFACETS'
 HTTP_COMPRESS_HEADER = 'HTTP_COMPRESS'
 NOT_FOUND = 'Not found.'
@@ -67,3 +70,38 @@ MAX_PINS_ALLOWED = 4
 CONFIRM_EMAIL_ADDRESS_MAIL_SUBJECT = "Confirm E-mail Address"
 PASSWORD_RESET_MAIL_SUBJECT = "Password Reset E-mail"
 LATEST = 'latest'
+ES_BULK_INDEX_BATCH_SIZE = 1000
+ES_BULK_INDEX_SESSIONS_KEY = 'es-bulk-index-sessions:{}'
+ES_BULK_INDEX_SESSIONS_TIMEOUT = 86400  # seconds, in case a worker dies mid bulk indexing
+ES_REFRESH_INTERVAL_KEY = 'es-refresh-interval:{}'
+ES_REINDEX_WATERMARK_KEY = 'es-reindex-watermark:{}'
+SEARCH_CACHE_KEY = 'search:{}'
+SEARCH_CACHE_VERSION_KEY = 'search-version:{}'
+BACKGROUND_PROCESSING_KEY = 'processing:{}:{}'
+BACKGROUND_TASK_KEY = 'processing-task:{}'
+BACKGROUND_PROCESSING_TASKS = (  # tasks tracking themselves on the version they process (add/remove_processing)
+    'core.common.tasks.export_source', 'core.common.tasks.export_collection', 'core.common.tasks.add_references',
+    'core.common.tasks.seed_children'
+)
+CSV_EXPORT_KEY = 'csv-export:{}'
+CSV_EXPORT_TASK_KEY = 'csv-export-task:{}'
+TOKEN_USER_CACHE_KEY = 'token-user:{}'
+PROFILE_KEY = 'profile:{}'
+ES_APPEND_MEMBERSHIP_SCRIPT = """
+for (entry in params.values.entrySet()) {
+  def values = ctx._source[entry.getKey()];
+  if (values == null) { values = []; } else if (!(values instanceof List)) { values = [values]; }
+  if (!values.contains(entry.getValue())) { values.add(entry.getValue()); }
+  ctx._source[entry.getKey()] = values;
+}
+"""
+# presentation params, any other query param filters the listing and rules out estimated counts
+ESTIMATED_COUNT_PARAMS = [
+    LIMIT_PARAM, 'page', VERBOSE_PARAM, SEARCH_CURSOR_PARAM, INCLUDE_MAPPINGS_PARAM, INCLUDE_INVERSE_MAPPINGS_PARAM,
+    INCLUDE_EXTRAS_PARAM
+]
+SEARCH_HYDRATION_BYPASS_PARAMS = [
+    VERBOSE_PARAM, INCLUDE_MAPPINGS_PARAM, INCLUDE_INVERSE_MAPPINGS_PARAM, INCLUDE_EXTRAS_PARAM,
+    MAPPING_LOOKUP_CONCEPTS, MAPPING_LOOKUP_FROM_CONCEPT, MAPPING_LOOKUP_TO_CONCEPT, MAPPING_LOOKUP_SOURCES,
+    MAPPING_LOOKUP_FROM_SOURCE, MAPPING_LOOKUP_TO_SOURCE, 'csv'
+]
@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand
+
+from core.common.tasks import reindex_since
+
+
+class Command(BaseCommand):
+    help = 'reindex resources updated since the given datetime (or the last successful run) without saving them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since', type=str, default=None,
+            help='ISO 8601 datetime, defaults to the watermark stored by the last run (everything on the first run)'
+        )
+        parser.add_argument('--apps', type=str, default=None, help='comma separated app names, e.g. concepts,mappings')
+        parser.add_argument('--async', action='store_true', default=False, help='queue the task instead of running it')
+
+    def handle(self, *args, **options):
+        apps = options['apps'].split(',') if options['apps'] else None
+        if options['async']:
+            result = reindex_since.delay(options['since'], apps)
+            self.stdout.write('Queued task {}'.format(result.task_id))
+        else:
+            result = reindex_since(options['since'], apps)
+            for model, count in result.items():
+                self.stdout.write('{}: {} reindexed'.format(model, count))
@@ -0,0 +1,30 @@
+from django.core.management import BaseCommand
+from django.db.models import Q
+
+from core.collections.models import Collection
+from core.sources.models import Source
+
+
+class Command(BaseCommand):
+    help = 'recompute the stored active concepts/mappings counts and last child update of source/collection versions'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', type=str, choices=['sources', 'collections'])
+        parser.add_argument('ids', type=int, nargs='*', help='source/collection version ids, all by default')
+        parser.add_argument(
+            '--missing', action='store_true', default=False, help='only versions that were never counted')
+
+    def handle(self, *args, **options):
+        model = Source if options['resource'] == 'sources' else Collection
+        queryset = model.objects.order_by('id')
+        if options['ids']:
+            queryset = queryset.filter(id__in=options['ids'])
+        if options['missing']:
+            queryset = queryset.filter(
+                Q(active_concepts__isnull=True) | Q(active_mappings__isnull=True) | Q(_last_child_update__isnull=True))
+
+        for repository in queryset.only('id').iterator():
+            self.stdout.write('{} {}: {}'.format(
+                model.__name__, repository.id,
+                dict(**repository.update_children_counts(), last_child_update=repository.update_last_child_update())
+            ))
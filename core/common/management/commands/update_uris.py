@@ -0,0 +1,62 @@
+from django.core.management import BaseCommand
+from django.db.models import Q
+
+from core.collections.models import Collection
+from core.concepts.models import Concept
+from core.mappings.models import Mapping
+from core.orgs.models import Organization
+from core.sources.models import Source
+from core.users.models import UserProfile
+
+RESOURCES = dict(
+    users=(UserProfile, []),
+    orgs=(Organization, []),
+    sources=(Source, ['organization', 'user']),
+    collections=(Collection, ['organization', 'user']),
+    concepts=(Concept, ['parent__organization', 'parent__user']),
+    mappings=(Mapping, ['parent__organization', 'parent__user']),
+)
+
+
+class Command(BaseCommand):
+    help = 'store uri (and versioned object url) on the user/org/source/collection/concept/mapping rows missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resources', type=str, nargs='+', choices=list(RESOURCES.keys()), default=list(RESOURCES.keys()))
+        parser.add_argument(
+            '--all', action='store_true', default=False, help='recompute the stored values of every row')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for resource in options['resources']:
+            model, related = RESOURCES[resource]
+            self.stdout.write('{}: {}'.format(
+                model.__name__, self.process(model, related, options['all'], options['batch_size'])))
+
+    @staticmethod
+    def process(model, related, everything, batch_size):
+        versioned = hasattr(model, '_versioned_object_url')
+        fields = ['uri', '_versioned_object_url'] if versioned else ['uri']
+        queryset = model.objects.order_by('id')
+        if not everything:
+            criteria = Q(uri__isnull=True) | Q(uri='')
+            if versioned:
+                criteria |= Q(_versioned_object_url__isnull=True) | Q(_versioned_object_url='')
+            queryset = queryset.filter(criteria)
+        if related:
+            queryset = queryset.select_related(*related)
+
+        updated = 0
+        last_id = 0
+        while True:
+            batch = list(queryset.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            for instance in batch:
+                instance.stamp_uri()
+            model.objects.bulk_update(batch, fields)
+            updated += len(batch)
+            last_id = batch[-1].id
+
+        return updated
@@ -0,0 +1,22 @@
+from django.core.management import BaseCommand
+
+from core.common.tasks import repair_index
+
+
+class Command(BaseCommand):
+    help = 'compare source/collection versions children in DB and ES and reindex only the drifted ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', type=str, choices=['sources', 'collections'])
+        parser.add_argument('ids', type=int, nargs='+', help='source/collection version ids')
+        parser.add_argument('--repair', action='store_true', default=False, help='reindex drifted children')
+        parser.add_argument('--async', action='store_true', default=False, help='queue the task instead of running it')
+
+    def handle(self, *args, **options):
+        model_name = 'Source' if options['resource'] == 'sources' else 'Collection'
+        for version_id in options['ids']:
+            args = (options['resource'], model_name, version_id, not options['repair'])
+            if options['async']:
+                self.stdout.write('{} {}: queued task {}'.format(model_name, version_id, repair_index.delay(*args)))
+            else:
+                self.stdout.write('{} {}: {}'.format(model_name, version_id, repair_index(*args)))
@@ -1,49 +1,65 @@
+import hashlib
 import logging
+from datetime import datetime
 from math import ceil
 
 from django.conf import settings
-from django.core.paginator import Paginator
-from django.db.models import Q, F
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q, F, QuerySet
 from django.http import HttpResponseForbidden, Http404
 from django.shortcuts import get_object_or_404
 from django.urls import resolve, reverse, Resolver404
 from django.utils.functional import cached_property
 from pydash import compact, get
 from rest_framework import status
+from rest_framework.exceptions import ParseError
 from rest_framework.mixins import ListModelMixin, CreateModelMixin
 from rest_framework.response import Response
 
 from core.common.constants import HEAD, ACCESS_TYPE_EDIT, ACCESS_TYPE_VIEW, ACCESS_TYPE_NONE, INCLUDE_FACETS, \
-    LIST_DEFAULT_LIMIT, HTTP_COMPRESS_HEADER, CSV_DEFAULT_LIMIT
-from core.common.permissions import HasPrivateAccess, HasOwnership, CanViewConceptDictionary
+    LIST_DEFAULT_LIMIT, HTTP_COMPRESS_HEADER, CSV_DEFAULT_LIMIT, SEARCH_CURSOR_PARAM, ESTIMATED_COUNT_THRESHOLD, \
+    ESTIMATED_COUNT_KWARGS, ESTIMATED_COUNT_PARAMS
+from core.common.permissions import HasPrivateAccess, HasOwnership, CanViewConceptDictionary, is_owner_or_member
 from core.common.services import S3
-from .utils import write_csv_to_s3, get_csv_from_s3, get_query_params_from_url_string, compact_dict_by_values
+from .utils import queue_csv_export, get_csv_from_s3, get_query_params_from_url_string, compact_dict_by_values, \
+    encode_cursor, decode_cursor, get_estimated_count
 
 logger = logging.getLogger('oclapi')
 
 
 class CustomPaginator:
-    def __init__(self, request, total_count, queryset, page_size):
+    def __init__(  # pylint: disable=too-many-arguments
+            self, request, total_count, queryset, page_size, is_cursor_paginated=False, next_cursor=None
+    ):
         self.total = total_count
         self.request = request
         self.queryset = queryset
         self.page_size = page_size
-        self.page_number = int(request.GET.get('page', '1'))
-        self.paginator = Paginator(self.queryset, self.page_size)
-        self.page_object = self.paginator.get_page(self.page_number)
-        self.page_count = ceil(int(self.total_count) / int(self.page_size))
+        self.is_cursor_paginated = is_cursor_paginated
+        self.next_cursor = next_cursor
+        self.page_number = 1 if is_cursor_paginated else int(request.GET.get('page', '1'))
+        self.page_count = None if is_cursor_paginated else ceil(int(self.total_count) / int(self.page_size))
 
     @property
     def current_page_number(self):
         return self.page_number
 
-    @property
+    @cached_property
     def current_page_results(self):
-        return self.page_object.object_list
+        """
+        The page's slice of the queryset (out of range page numbers fall back to the first/last page). Sliced directly
+        rather than through django's Paginator, which would COUNT the queryset again, even with total_count known.
+        """
+        if self.is_cursor_paginated:
+            return self.queryset
+
+        page_number = max(min(self.page_number, self.page_count), 1)
+        offset = (page_number - 1) * int(self.page_size)
+        return self.queryset[offset:offset + int(self.page_size)]
 
     @cached_property
     def total_count(self):
-        return get(self, 'total') or self.queryset.count()
+        return self.queryset.count() if self.total is None else self.total
 
     def __get_query_params(self):
         return self.request.GET.copy()
@@ -61,6 +77,12 @@ class CustomPaginator:
         query_params['page'] = str(self.current_page_number - 1)
         return self.__get_full_url() + '?' + query_params.urlencode()
 
+    def get_next_cursor_url(self):
+        query_params = self.__get_query_params()
+        query_params.pop('page', None)
+        query_params[SEARCH_CURSOR_PARAM] = self.next_cursor
+        return self.__get_full_url() + '?' + query_params.urlencode()
+
     def has_next(self):
         return self.page_number < self.page_count
 
@@ -69,6 +91,9 @@ class CustomPaginator:
 
     @property
     def headers(self):
+        if self.is_cursor_paginated:
+            return self.cursor_headers
+
         headers = dict(
             num_found=self.total_count, num_returned=len(self.current_page_results),
             pages=self.page_count, page_number=self.page_number
@@ -80,30 +105,37 @@ class CustomPaginator:
 
         return headers
 
+    @property
+    def cursor_headers(self):
+        headers = dict(num_returned=len(self.current_page_results))
+        if self.total is not None:
+            headers['num_found'] = self.total
+        if self.next_cursor:
+            headers['next'] = self.get_next_cursor_url()
+
+        return headers
+
 
 class ListWithHeadersMixin(ListModelMixin):
     default_filters = {'is_active': True}
     object_list = None
     limit = LIST_DEFAULT_LIMIT
     document_model = None
+    is_count_estimated = False
+    cursor_pagination_fields = ()  # e.g. ('updated_at', 'id'), opts db listings in keyset pagination with the cursor
 
     def head(self, request, **kwargs):  # pylint: disable=unused-argument
         queryset = self.filter_queryset(self.get_queryset())
         res = Response()
-        res['num_found'] = get(self, 'total_count') or queryset.count()
+        res['num_found'] = get(self, 'total_count') or self.get_count(queryset)
+        if get(self, 'is_count_estimated'):
+            res['num_found_estimated'] = 'true'
         return res
 
     def list(self, request, *args, **kwargs):  # pylint:disable=too-many-locals
         query_params = request.query_params.dict()
         is_csv = query_params.get('csv', False)
         search_string = query_params.get('type', None)
-        exact_match = query_params.get('exact_match', None)
-        search_term = query_params.get('q', None)
-        if not exact_match and is_csv:
-            pattern = search_term
-            if pattern:
-                query_params._mutable = True  # pylint: disable=protected-access
-                query_params['q'] = "*" + search_term + "*"
 
         if is_csv and not search_string:
             return self.get_csv(request)
@@ -112,8 +144,8 @@ class ListWithHeadersMixin(ListModelMixin):
             self.object_list = self.filter_queryset(self.get_queryset())
 
         if is_csv and search_string:
-            klass = type(self.object_list[0])
-            queryset = klass.objects.filter(id__in=self.get_object_ids())
+            queryset = self.object_list if isinstance(self.object_list, QuerySet) else \
+                self.get_queryset().model.objects.filter(id__in=self.get_object_ids())
             return self.get_csv(request, queryset)
 
         # Skip pagination if compressed results are requested
@@ -122,18 +154,20 @@ class ListWithHeadersMixin(ListModelMixin):
         if not compress and (not self.limit or int(self.limit) == 0 or int(self.limit) > 1000):
             self.limit = LIST_DEFAULT_LIMIT
 
+        if not compress and self.should_paginate_queryset_by_cursor():
+            self.object_list = self.get_cursor_page(self.object_list)
+
         sorted_list = self.object_list
 
         headers = dict()
         results = sorted_list
         if not compress:
-            paginator = CustomPaginator(
-                request=request, queryset=sorted_list, page_size=self.limit, total_count=self.total_count
-            )
-            headers = paginator.headers
-            results = paginator.current_page_results
+            headers, results = self.paginate(request, sorted_list)
 
-        result_dict = self.get_serializer(results, many=True).data
+        if get(self, 'is_search_results_hydrated'):
+            result_dict = results
+        else:
+            result_dict = self.get_serializer(results, many=True).data
         if self.should_include_facets():
             data = dict(results=result_dict, facets=dict(fields=self.get_facets()))
         else:
@@ -146,6 +180,87 @@ class ListWithHeadersMixin(ListModelMixin):
             response['num_found'] = len(sorted_list)
         return response
 
+    def paginate(self, request, object_list):
+        total_count = get(self, 'total_count')
+        if not total_count and not get(self, 'is_cursor_paginated'):
+            total_count = self.get_count(object_list)
+        paginator = CustomPaginator(
+            request=request, queryset=object_list, page_size=self.limit, total_count=total_count,
+            is_cursor_paginated=get(self, 'is_cursor_paginated'), next_cursor=get(self, 'cursor_next')
+        )
+        headers = paginator.headers
+        if get(self, 'is_count_estimated'):
+            headers['num_found_estimated'] = 'true'
+
+        return headers, paginator.current_page_results
+
+    def get_count(self, queryset):
+        """
+        Exact count, unless the planner estimates an unfiltered (or owner only) db listing at
+        ESTIMATED_COUNT_THRESHOLD rows or more, where that estimate is used instead (flagged by is_count_estimated) to
+        spare a COUNT(*) over a huge table.
+        """
+        self.is_count_estimated = False
+        if isinstance(queryset, QuerySet) and self.is_count_estimable():
+            estimated_count = get_estimated_count(queryset)
+            if estimated_count >= ESTIMATED_COUNT_THRESHOLD:
+                self.is_count_estimated = True
+                return estimated_count
+
+        return queryset.count()
+
+    def is_count_estimable(self):
+        """Planner estimates of filtered listings can be off by orders of magnitude, those are always counted."""
+        return all(kwarg in ESTIMATED_COUNT_KWARGS for kwarg in get(self, 'kwargs') or dict()) and all(
+            param in ESTIMATED_COUNT_PARAMS for param in self.request.query_params)
+
+    def should_paginate_queryset_by_cursor(self):
+        return bool(self.cursor_pagination_fields) and not get(self, 'is_cursor_paginated') and \
+            SEARCH_CURSOR_PARAM in self.request.query_params and isinstance(self.object_list, QuerySet)
+
+    def get_cursor_page(self, queryset):
+        """
+        Keyset pagination: rows ordered (descending) by cursor_pagination_fields, continuing after the values of
+        the previous page's last row carried by the cursor, so deep pages cost the same as the first one and no
+        count is run.
+        """
+        fields = self.cursor_pagination_fields
+        limit = int(self.limit)
+        queryset = queryset.order_by(*['-' + field for field in fields])
+        values = self.get_cursor_values(queryset.model)
+        if values:
+            criteria = Q()
+            for index, field in enumerate(fields):
+                criteria |= Q(**{field + '__lt': values[index]}, **dict(zip(fields[:index], values[:index])))
+            queryset = queryset.filter(criteria)
+
+        page = list(queryset[:limit])
+        self.is_cursor_paginated = True
+        self.total_count = None
+        self.cursor_next = None
+        if len(page) == limit:
+            self.cursor_next = encode_cursor([
+                value.isoformat() if isinstance(value, datetime) else value
+                for value in [getattr(page[-1], field) for field in fields]
+            ])
+
+        return page
+
+    def get_cursor_values(self, model):
+        """The cursor's values parsed by their cursor_pagination_fields, ParseError (400) if they do not parse."""
+        fields = self.cursor_pagination_fields
+        values = decode_cursor(self.request.query_params.get(SEARCH_CURSOR_PARAM))
+        if not values or len(values) != len(fields):
+            return None
+
+        try:
+            return [
+                model._meta.get_field(field).to_python(value)  # pylint: disable=protected-access
+                for field, value in zip(fields, values)
+            ]
+        except (DjangoValidationError, TypeError, ValueError) as ex:
+            raise ParseError('Invalid cursor.') from ex
+
     def should_include_facets(self):
         return self.request.META.get(INCLUDE_FACETS, False) in ['true', True]
 
@@ -157,45 +272,40 @@ class ListWithHeadersMixin(ListModelMixin):
         return map(lambda o: o.id, self.object_list[0:100])
 
     def get_csv(self, request, queryset=None):
+        """
+        The url of the (zipped) CSV of the listing if already exported, else queues its export (one per file at a
+        time) and answers 202 with the job status, to be followed at the csv export status endpoint.
+        """
         filename, url, prepare_new_file, is_member = None, None, True, False
 
         parent = None  # TODO: fix this for parent (owner)
 
         if parent:
             prepare_new_file = False
-            user = request.query_params.get('user', None)
-            is_member = self._is_member(parent, user)
+            is_member = is_owner_or_member(request, parent)
 
         try:
             path = request.__dict__.get('_request').path
             filename = '_'.join(compact(path.split('/'))).replace('.', '_')
-            kwargs = {
-                'filename': filename,
-            }
+            query_params = request.query_params.copy()
+            query_params.pop('csv', None)
+            if query_params:
+                filename += '_' + hashlib.md5(query_params.urlencode().encode('utf-8')).hexdigest()
         except Exception:  # pylint: disable=broad-except
-            kwargs = {}
+            filename = 'export'
 
-        if filename and prepare_new_file:
+        if prepare_new_file:
             url = get_csv_from_s3(filename, is_member)
 
-        if not url:
-            queryset = queryset or self._get_query_set_from_view(is_member)
-            data = self.get_csv_rows(queryset) if hasattr(self, 'get_csv_rows') else queryset.values()
-            url = write_csv_to_s3(data, is_member, **kwargs)
-
-        return Response({'url': url}, status=200)
-
-    @staticmethod
-    def _is_member(parent, requesting_user):
-        if not parent or type(parent).__name__ in ['UserProfile', 'Organization']:
-            return False
+        if url:
+            return Response({'url': url}, status=status.HTTP_200_OK)
 
-        owner = parent.owner
-        return owner.members.filter(username=requesting_user).exists() if type(owner).__name__ == 'Organization' else \
-            requesting_user == parent.created_by
+        queryset = self._get_query_set_from_view(is_member, queryset)
+        return Response(queue_csv_export(queryset, filename, is_member), status=status.HTTP_202_ACCEPTED)
 
-    def _get_query_set_from_view(self, is_member):
-        return self.get_queryset() if is_member else self.get_queryset()[0:CSV_DEFAULT_LIMIT]
+    def _get_query_set_from_view(self, is_member, queryset=None):
+        queryset = self.get_queryset() if queryset is None else queryset
+        return queryset if is_member else queryset[0:CSV_DEFAULT_LIMIT]
 
 
 class PathWalkerMixin:
@@ -220,12 +330,53 @@ class PathWalkerMixin:
                 i += 1
         return path_info
 
+    @classmethod
+    def get_object_for_path(cls, path_info, request):
+        """
+        Resource at path_info, memoised on the request. Owner/repository paths are looked up from their url kwargs in
+        a single query, other paths through their own view.
+        """
+        objects_by_path = request.__dict__.setdefault('_objects_by_path', dict())
+        if path_info not in objects_by_path:
+            callback, _, callback_kwargs = resolve(path_info)
+            if callback_kwargs and set(callback_kwargs) <= {
+                    'org', 'user', 'user_is_self', 'source', 'collection', 'version'}:
+                obj = cls.get_object_for_kwargs(callback_kwargs, request)
+            else:
+                view = callback.cls(request=request, kwargs=callback_kwargs)
+                view.initialize(request, path_info, **callback_kwargs)
+                obj = view.get_object()
+            objects_by_path[path_info] = obj
+
+        return objects_by_path[path_info]
+
     @staticmethod
-    def get_object_for_path(path_info, request):
-        callback, _, callback_kwargs = resolve(path_info)
-        view = callback.cls(request=request, kwargs=callback_kwargs)
-        view.initialize(request, path_info, **callback_kwargs)
-        return view.get_object()
+    def get_object_for_kwargs(kwargs, request):
+        from core.collections.models import Collection
+        from core.orgs.models import Organization
+        from core.sources.models import Source
+        from core.users.models import UserProfile
+
+        username = request.user.username if kwargs.get('user_is_self') else kwargs.get('user')
+        if 'source' in kwargs or 'collection' in kwargs:
+            model = Source if 'source' in kwargs else Collection
+            filters = dict(
+                mnemonic=kwargs.get('source') or kwargs.get('collection'), version=kwargs.get('version', HEAD))
+            if 'org' in kwargs:
+                filters['organization__mnemonic'] = kwargs['org']
+            elif username:
+                filters['user__username'] = username
+            queryset = model.objects.select_related('organization', 'user')
+        elif 'org' in kwargs:
+            queryset, filters = Organization.objects, dict(mnemonic=kwargs['org'])
+        else:
+            queryset, filters = UserProfile.objects, dict(username=username)
+
+        obj = queryset.filter(is_active=True, **filters).first()
+        if not obj:
+            raise Http404()
+
+        return obj
 
 
 class SubResourceMixin(PathWalkerMixin):
@@ -587,7 +738,8 @@ class ConceptContainerProcessingMixin:
 
         if is_debug:
             return Response(dict(is_processing=version.is_processing,
-                                 process_ids=version._background_process_ids))  # pylint: disable=protected-access
+                                 process_ids=version._background_process_ids,  # pylint: disable=protected-access
+                                 tasks=version.get_processing_tasks()))
 
         logger.debug('Processing flag requested for %s version %s', self.resource, version)
 
@@ -1,4 +1,10 @@
+import json
+import threading
+import time
+
+from celery import states
 from celery.result import AsyncResult
+from django.apps import apps
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericRelation
 from django.contrib.postgres.fields import ArrayField
@@ -8,11 +14,15 @@ from django.db import models, IntegrityError
 from django.db.models import Value, Q
 from django.db.models.expressions import CombinedExpression, F
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_elasticsearch_dsl.registries import registry
 from django_elasticsearch_dsl.signals import RealTimeSignalProcessor
+from elasticsearch import TransportError
+from elasticsearch_dsl import UpdateByQuery
 from pydash import get
+from redis.exceptions import RedisError
 
-from core.common.services import S3
+from core.common.services import S3, RedisService
 from core.common.utils import reverse_resource, reverse_resource_version, parse_updated_since_param, drop_version
 from core.settings import DEFAULT_LOCALE
 from core.sources.constants import CONTENT_REFERRED_PRIVATELY
@@ -20,7 +30,10 @@ from .constants import (
     ACCESS_TYPE_CHOICES, DEFAULT_ACCESS_TYPE, NAMESPACE_REGEX,
     ACCESS_TYPE_VIEW, ACCESS_TYPE_EDIT, SUPER_ADMIN_USER_ID,
     HEAD, PERSIST_NEW_ERROR_MESSAGE, SOURCE_PARENT_CANNOT_BE_NONE, PARENT_RESOURCE_CANNOT_BE_NONE,
-    CREATOR_CANNOT_BE_NONE, CANNOT_DELETE_ONLY_VERSION, CUSTOM_VALIDATION_SCHEMA_OPENMRS)
+    CREATOR_CANNOT_BE_NONE, CANNOT_DELETE_ONLY_VERSION, CUSTOM_VALIDATION_SCHEMA_OPENMRS, ES_REFRESH_INTERVAL_KEY,
+    ES_BULK_INDEX_BATCH_SIZE, ES_BULK_INDEX_SESSIONS_KEY, ES_BULK_INDEX_SESSIONS_TIMEOUT, ES_APPEND_MEMBERSHIP_SCRIPT,
+    SEARCH_CACHE_VERSION_KEY,
+    BACKGROUND_PROCESSING_KEY, BACKGROUND_TASK_KEY)
 from .tasks import handle_save, handle_m2m_changed, seed_children
 
 
@@ -59,6 +72,9 @@ class BaseModel(models.Model):
     extras_have_been_encoded = False
     extras_have_been_decoded = False
     is_being_saved = False
+    # relations read when rendering list representations (list serializers, search results, index documents)
+    list_select_related = ()
+    list_prefetch_related = ()
 
     @property
     def model_name(self):
@@ -70,22 +86,30 @@ class BaseModel(models.Model):
 
     def index(self):
         if not get(settings, 'TEST_MODE', False):
-            handle_save.delay(self.app_name, self.model_name, self.id)
+            session = IndexingSession.current()
+            if session:
+                session.add(self.__class__, [self.id])
+            else:
+                handle_save.delay(self.app_name, self.model_name, self.id)
 
     def save(self, force_insert=False, force_update=False, using=None, update_fields=None):
         if not self.internal_reference_id and self.id:
             self.internal_reference_id = str(self.id)
         super().save(force_insert, force_update, using, update_fields)
 
+    def get_save_fields(self):  # pylint: disable=no-self-use
+        """update_fields of a full save of this object, None for all fields"""
+        return None
+
     def soft_delete(self):
         if self.is_active:
             self.is_active = False
-            self.save()
+            self.save(update_fields=self.get_save_fields())
 
     def undelete(self):
         if not self.is_active:
             self.is_active = True
-            self.save()
+            self.save(update_fields=self.get_save_fields())
 
     @property
     def is_versioned(self):
@@ -110,6 +134,9 @@ class BaseModel(models.Model):
 
         return self.calculate_uri()
 
+    def stamp_uri(self):
+        self.uri = self.calculate_uri()
+
     def calculate_uri(self):
         if self.is_versioned and not self.is_head:
             uri = reverse_resource_version(self, self.view_name)
@@ -175,7 +202,7 @@ class CommonLogoModel(models.Model):
     def upload_base64_logo(self, data, name):
         name = self.uri[1:] + name
         self.logo_path = S3.upload_base64(data, name, False, True)
-        self.save()
+        self.save(update_fields=self.get_save_fields())
 
 
 class BaseResourceModel(BaseModel, CommonLogoModel):
@@ -210,6 +237,7 @@ class VersionedModel(BaseResourceModel):
     description = models.TextField(null=True, blank=True)
     external_id = models.TextField(null=True, blank=True)
     custom_validation_schema = models.TextField(blank=True, null=True)
+    _versioned_object_url = models.TextField(null=True, blank=True)
 
     class Meta:
         abstract = True
@@ -218,6 +246,10 @@ class VersionedModel(BaseResourceModel):
     def is_versioned(self):
         return True
 
+    def stamp_uri(self):
+        super().stamp_uri()
+        self._versioned_object_url = drop_version(self.uri)
+
     @property
     def versioned_resource_type(self):
         return self.resource_type
@@ -263,7 +295,7 @@ class VersionedModel(BaseResourceModel):
 
     @property
     def versioned_object_url(self):
-        return drop_version(self.uri)
+        return self._versioned_object_url or drop_version(self.uri)
 
     @classmethod
     def get_version(cls, mnemonic, version=HEAD, filters=None):
@@ -312,21 +344,72 @@ class ConceptContainerModel(VersionedModel):
     snapshot = models.JSONField(null=True, blank=True, default=dict)
     experimental = models.BooleanField(null=True, blank=True, default=None)
     meta = models.JSONField(null=True, blank=True)
+    active_concepts = models.IntegerField(null=True, blank=True, default=0)
+    active_mappings = models.IntegerField(null=True, blank=True, default=0)
+    _last_child_update = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         abstract = True
 
+    index_membership_fields = []  # ES list fields of children documents holding this version's membership
+    children_count_fields = dict(concepts='active_concepts', mappings='active_mappings')
+    children_stats_fields = [*children_count_fields.values(), '_last_child_update']
+
+    def get_save_fields(self):
+        """
+        All fields but the children stats, which are maintained with update queries (saving a stale in memory copy of
+        them would undo those), for saving an existing version.
+        """
+        if self._state.adding or not self.pk:
+            return None
+
+        return [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.children_stats_fields
+        ]
+
     @property
     def is_openmrs_schema(self):
         return self.custom_validation_schema == CUSTOM_VALIDATION_SCHEMA_OPENMRS
 
-    @property
-    def active_concepts(self):
-        return self.concepts.filter(retired=False, is_active=True).distinct('versioned_object_id').count()
+    def get_active_children_count(self, relation):
+        return getattr(self, relation).filter(retired=False, is_active=True).distinct('versioned_object_id').count()
+
+    def update_children_counts(self):
+        """Recounts the stored active concepts/mappings counts, which are otherwise updated incrementally."""
+        counts = {
+            field: self.get_active_children_count(relation) for relation, field in self.children_count_fields.items()
+        }
+        self.__class__.objects.filter(id=self.id).update(**counts)
+        for field, count in counts.items():
+            setattr(self, field, count)
+
+        return counts
+
+    def update_active_children_count(self, relation, children_ids, added):
+        """
+        Updates the stored count of relation (concepts/mappings) for children_ids just added to or removed from it, by
+        the number of versioned objects they were the only active members of.
+        """
+        children = getattr(self, relation)
+        versioned_object_ids = set(
+            children.model.objects.filter(
+                id__in=children_ids, retired=False, is_active=True
+            ).values_list('versioned_object_id', flat=True)
+        )
+        if versioned_object_ids:
+            versioned_object_ids -= set(
+                children.filter(
+                    versioned_object_id__in=versioned_object_ids, retired=False, is_active=True
+                ).exclude(id__in=children_ids).values_list('versioned_object_id', flat=True)
+            )
 
-    @property
-    def active_mappings(self):
-        return self.mappings.filter(retired=False, is_active=True).distinct('versioned_object_id').count()
+        if versioned_object_ids:
+            field = self.children_count_fields[relation]
+            delta = len(versioned_object_ids) if added else -len(versioned_object_ids)
+            self.__class__.objects.filter(id=self.id).update(**{field: F(field) + delta})
+            if getattr(self, field) is not None:
+                setattr(self, field, getattr(self, field) + delta)
 
     @property
     def last_concept_update(self):
@@ -342,13 +425,29 @@ class ConceptContainerModel(VersionedModel):
             updated_at = self.mappings.latest('updated_at').updated_at
         return updated_at
 
-    @property
-    def last_child_update(self):
+    def get_last_child_update(self):
         last_concept_update = self.last_concept_update
         last_mapping_update = self.last_mapping_update
         if last_concept_update and last_mapping_update:
             return max(last_concept_update, last_mapping_update)
-        return last_concept_update or last_mapping_update or self.updated_at or timezone.now()
+        return last_concept_update or last_mapping_update
+
+    @property
+    def last_child_update(self):
+        return self._last_child_update or self.get_last_child_update() or self.updated_at or timezone.now()
+
+    def update_last_child_update(self):
+        """Recomputes the stored last_child_update, which is otherwise moved forward as children change."""
+        self._last_child_update = self.get_last_child_update()
+        self.__class__.objects.filter(id=self.id).update(_last_child_update=self._last_child_update)
+
+        return self._last_child_update
+
+    @classmethod
+    def touch_last_child_update(cls, queryset, updated_at):
+        queryset.filter(
+            Q(_last_child_update__isnull=True) | Q(_last_child_update__lt=updated_at)
+        ).update(_last_child_update=updated_at)
 
     @classmethod
     def get_base_queryset(cls, params):
@@ -372,6 +471,26 @@ class ConceptContainerModel(VersionedModel):
 
         return queryset
 
+    @classmethod
+    def get_csv_rows(cls, queryset):
+        name = cls.__name__
+        header = [
+            'Owner', name + ' ID', name + ' Name', name + ' Full Name', name + ' Type', 'Description',
+            'Default Locale', 'Supported Locales', 'Website', 'External ID', 'Last Updated', 'Updated By', 'URI'
+        ]
+        values = queryset.values_list(
+            'organization__mnemonic', 'user__username', 'mnemonic', 'name', 'full_name', name.lower() + '_type',
+            'description', 'default_locale', 'supported_locales', 'website', 'external_id', 'updated_at',
+            'updated_by__username', 'uri'
+        )
+
+        def rows():
+            for org, user, *row in values.iterator():
+                row[6] = ','.join(row[6] or [])
+                yield [org or user, *row]
+
+        return header, rows()
+
     @property
     def concepts_url(self):
         return reverse_resource(self, 'concept-list')
@@ -430,7 +549,7 @@ class ConceptContainerModel(VersionedModel):
                 if not prev_version:
                     raise ValidationError(dict(detail=CANNOT_DELETE_ONLY_VERSION))
                 prev_version.is_latest_version = True
-                prev_version.save()
+                prev_version.save(update_fields=prev_version.get_save_fields())
 
         from core.pins.models import Pin
         Pin.objects.filter(resource_type__model=self.resource_type.lower(), resource_id=self.id).delete()
@@ -518,6 +637,7 @@ class ConceptContainerModel(VersionedModel):
         serializer = SourceDetailSerializer if obj.__class__.__name__ == 'Source' else CollectionDetailSerializer
         obj.snapshot = serializer(obj.head).data
         obj.update_version_data()
+        obj.active_concepts = obj.active_mappings = 0  # counted while seeding
         obj.save(**kwargs)
 
         if get(settings, 'TEST_MODE', False):
@@ -555,7 +675,7 @@ class ConceptContainerModel(VersionedModel):
         if updated_by:
             obj.updated_by = updated_by
         try:
-            obj.save(**kwargs)
+            obj.save(**dict(dict(update_fields=obj.get_save_fields()), **kwargs))
         except IntegrityError as ex:
             errors.update({'__all__': ex.args})
 
@@ -615,7 +735,7 @@ class ConceptContainerModel(VersionedModel):
             self.concepts.set(concepts)
             if index:
                 from core.concepts.documents import ConceptDocument
-                self.batch_index(self.concepts, ConceptDocument)
+                self.index_membership(self.concepts, ConceptDocument)
 
     def seed_mappings(self, index=True):
         head = self.head
@@ -629,12 +749,17 @@ class ConceptContainerModel(VersionedModel):
             self.mappings.set(mappings)
             if index:
                 from core.mappings.documents import MappingDocument
-                self.batch_index(self.mappings, MappingDocument)
+                self.index_membership(self.mappings, MappingDocument)
 
     @staticmethod
     def batch_index(queryset, document):
+        session = IndexingSession.current()
+        if session:
+            session.add(document.django.model, queryset.values_list('id', flat=True))
+            return
+
         count = queryset.count()
-        batch_size = 1000
+        batch_size = ES_BULK_INDEX_BATCH_SIZE
         offset = 0
         limit = batch_size
         while offset < count:
@@ -646,10 +771,110 @@ class ConceptContainerModel(VersionedModel):
         from core.concepts.documents import ConceptDocument
         from core.mappings.documents import MappingDocument
 
-        self.batch_index(self.concepts, ConceptDocument)
-        self.batch_index(self.mappings, MappingDocument)
+        self.index_membership(self.concepts, ConceptDocument)
+        self.index_membership(self.mappings, MappingDocument)
+
+    @property
+    def search_cache_version_key(self):
+        return SEARCH_CACHE_VERSION_KEY.format(drop_version(self.url))
+
+    def bump_search_cache_version(self):
+        """Makes cached search results of this repository and of its children (all versions) stale."""
+        RedisService().incr(self.search_cache_version_key)
+
+    def get_index_membership_values(self):
+        filters = self.get_index_filters()
+        return {field: filters[field] for field in self.index_membership_fields}
+
+    def index_membership(self, queryset, document):
+        """
+        Seeded children are indexed already, only their membership list fields (index_membership_fields) lack this
+        version. Appends it with scripted update_by_query requests instead of re-indexing every child document.
+        Batches where some children are not found in ES are fully indexed.
+        """
+        if get(settings, 'TEST_MODE', False):
+            return
+
+        ids = list(queryset.order_by('id').values_list('id', flat=True))
+        values = self.get_index_membership_values()
+        for start in range(0, len(ids), ES_BULK_INDEX_BATCH_SIZE):
+            batch = ids[start:start + ES_BULK_INDEX_BATCH_SIZE]
+            response = UpdateByQuery(
+                using=document._get_using(), index=document._index._name  # pylint: disable=protected-access
+            ).filter('ids', values=batch).script(
+                source=ES_APPEND_MEMBERSHIP_SCRIPT, lang='painless', params=dict(values=values)
+            ).params(conflicts='proceed', refresh=start + ES_BULK_INDEX_BATCH_SIZE >= len(ids)).execute()
+
+            if response.total < len(batch):
+                self.batch_index(document.django.model.objects.filter(id__in=batch), document)
+
+    def get_index_filters(self):  # term filters matching ES documents of children of this version
+        resource = self.get_resource_url_kwarg()
+        return {resource: self.mnemonic, resource + '_version': self.version}
+
+    def get_index_drift(self, queryset, document):
+        """
+        Compares (id, updated_at) of children in queryset with (id, last_update) of ES documents of this version.
+        Returns ids missing from ES, ids with stale ES documents and ids indexed as children but not children anymore.
+        """
+        db_updated_at = dict()
+        last_id = 0
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id).order_by('id').values_list(
+                    'id', 'updated_at')[:ES_BULK_INDEX_BATCH_SIZE]
+            )
+            if not batch:
+                break
+            for child_id, updated_at in batch:
+                db_updated_at[child_id] = to_index_precision(updated_at)
+            last_id = batch[-1][0]
+
+        search = document.search().source(['last_update']).params(size=ES_BULK_INDEX_BATCH_SIZE)
+        for field, value in self.get_index_filters().items():
+            search = search.filter('term', **{field: value})
+
+        stale = set()
+        extra = set()
+        for hit in search.scan():
+            child_id = int(hit.meta.id)
+            if child_id not in db_updated_at:
+                extra.add(child_id)
+            elif db_updated_at.pop(child_id) != to_index_precision(get(hit, 'last_update')):
+                stale.add(child_id)
+
+        return dict(missing=sorted(db_updated_at), stale=sorted(stale), extra=sorted(extra))
+
+    def repair_index(self, dry_run=False):
+        """
+        Re-indexes only the children whose ES documents have drifted from the DB (see get_index_drift) and removes
+        documents of deleted children.
+        """
+        from core.concepts.documents import ConceptDocument
+        from core.mappings.documents import MappingDocument
+
+        result = dict()
+        for queryset, document in [(self.concepts, ConceptDocument), (self.mappings, MappingDocument)]:
+            model = document.django.model
+            drift = self.get_index_drift(queryset, document)
+            result[model.__name__.lower()] = {key: len(ids) for key, ids in drift.items()}
+            ids = set(drift['missing'] + drift['stale'] + drift['extra'])
+            if dry_run or not ids:
+                continue
+
+            existing_ids = set(model.objects.filter(id__in=ids).values_list('id', flat=True))
+            if existing_ids:
+                IndexingSession.bulk_index(document, sorted(existing_ids))
+            if ids - existing_ids:
+                document.search().filter('ids', values=sorted(ids - existing_ids)).delete()
+
+        return result
+
+    @property
+    def processing_key(self):
+        return BACKGROUND_PROCESSING_KEY.format(self.app_name, self.id)
 
-    def add_processing(self, process_id):
+    def add_processing(self, process_id, task_name=None):
         if self.id:
             self.__class__.objects.filter(id=self.id).update(
                 _background_process_ids=CombinedExpression(
@@ -660,44 +885,84 @@ class ConceptContainerModel(VersionedModel):
             )
         if process_id:
             self._background_process_ids.append(process_id)
+            if self.id:
+                service = RedisService()
+                service.hset(
+                    self.processing_key, process_id, json.dumps(dict(name=task_name or '', started_at=time.time())))
+                service.expire(self.processing_key, settings.CELERY_RESULT_EXPIRES)
+                service.set_json(
+                    BACKGROUND_TASK_KEY.format(process_id), dict(app=self.app_name, model=self.model_name, id=self.id),
+                    settings.CELERY_RESULT_EXPIRES
+                )
 
     def remove_processing(self, process_id):
         if self.id and self._background_process_ids and process_id in self._background_process_ids:
             self._background_process_ids.remove(process_id)
             self.save(update_fields=['_background_process_ids'])
+        if self.id and process_id:
+            service = RedisService()
+            service.hdel(self.processing_key, process_id)
+            service.delete(BACKGROUND_TASK_KEY.format(process_id))
+
+    @staticmethod
+    def remove_task_processing(process_id):
+        """
+        Removes a finished/revoked task from the version it was processing, for tasks that never reached
+        remove_processing (worker lost, revoked/terminated).
+        """
+        if not process_id:
+            return
+
+        service = RedisService()
+        version = service.get_formatted(BACKGROUND_TASK_KEY.format(process_id))
+        if not isinstance(version, dict):
+            return
+
+        instance = apps.get_model(version['app'], version['model']).objects.filter(id=version['id']).first()
+        if instance:
+            instance.remove_processing(process_id)
+        else:
+            service.delete(BACKGROUND_TASK_KEY.format(process_id))
+
+    def get_processing_tasks(self):
+        """
+        Running background tasks of this version as {task id: task name}. Tasks are tracked in redis on start and
+        finish, so this is a single lookup (none when no task was ever added). Tasks tracked for longer than
+        BACKGROUND_PROCESSING_TIMEOUT are checked against their celery state and dropped unless still running, as their
+        worker may have been killed before finishing them (the whole hash expires with the celery results anyway).
+        """
+        if not self.id or not self._background_process_ids:
+            return dict()
+
+        tasks = dict()
+        for process_id, task in RedisService().hgetall_formatted(self.processing_key).items():
+            try:
+                task = json.loads(task)
+            except ValueError:
+                task = dict(name=task, started_at=0)
+            if time.time() - task['started_at'] > settings.BACKGROUND_PROCESSING_TIMEOUT and \
+                    AsyncResult(process_id).state not in [states.STARTED, states.RETRY]:
+                self.remove_processing(process_id)
+            else:
+                tasks[process_id] = task['name']
+
+        return tasks
 
     @property
     def is_processing(self):
-        background_ids = self._background_process_ids
-        if background_ids:
-            for process_id in background_ids.copy():
-                if process_id:
-                    res = AsyncResult(process_id)
-                    if res.successful() or res.failed():
-                        self.remove_processing(process_id)
-                    else:
-                        return True
-                else:
-                    self.remove_processing(process_id)
-
-        return False
+        return bool(self.get_processing_tasks())
 
     def clear_processing(self):
         self._background_process_ids = list()
         self.save(update_fields=['_background_process_ids'])
+        if self.id:
+            RedisService().delete(self.processing_key)
 
     @property
     def is_exporting(self):
-        is_processing = self.is_processing
-
-        if is_processing:
-            for process_id in self._background_process_ids:
-                res = AsyncResult(process_id)
-                task_name = res.name
-                if task_name and task_name.startswith('core.common.tasks.export_'):
-                    return True
-
-        return False
+        return any(
+            task_name.startswith('core.common.tasks.export_') for task_name in self.get_processing_tasks().values()
+        )
 
     @property
     def export_path(self):
@@ -718,11 +983,189 @@ class ConceptContainerModel(VersionedModel):
         return S3.exists(self.export_path)
 
 
+def to_index_precision(value):  # ES dates are stored with millisecond precision
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if not value:
+        return None
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+class IndexingSession:
+    """
+    Context manager for indexing heavy operations (bulk imports, version seeding).
+    While a session is active in the current thread, saved resources are not indexed one by one (each with its own
+    refresh), they are collected and written to ES on exit in bulk requests, with refresh disabled on the affected
+    indexes and a single refresh per index at the end.
+    Nested sessions join the outermost one.
+    """
+    _local = threading.local()
+
+    def __init__(self):
+        self.pending = dict()
+        self.is_outermost = False
+
+    @classmethod
+    def current(cls):
+        return getattr(cls._local, 'session', None)
+
+    def __enter__(self):
+        if not self.current():
+            self.is_outermost = True
+            self._local.session = self
+
+        return self.current()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.is_outermost:
+            self._local.session = None
+            self.flush()
+
+    def add(self, model, ids):
+        ids = set(ids)
+        if ids:
+            self.pending[model] = self.pending.get(model, set()) | ids
+
+    def flush(self):
+        pending = self.pending
+        self.pending = dict()
+        for model, ids in pending.items():
+            for document in registry.get_documents([model]):
+                self.bulk_index(document, sorted(ids))
+
+    @classmethod
+    def bulk_index(cls, document, ids):
+        index = document._index  # pylint: disable=protected-access
+        refresh_interval = cls.disable_refresh(index)
+        try:
+            for start in range(0, len(ids), ES_BULK_INDEX_BATCH_SIZE):
+                queryset = document().get_queryset().filter(id__in=ids[start:start + ES_BULK_INDEX_BATCH_SIZE])
+                document().update(queryset, refresh=False, parallel=True)
+        finally:
+            cls.restore_refresh(index, refresh_interval)
+
+    @classmethod
+    def disable_refresh(cls, index):
+        """
+        Disables refresh on the index for a bulk indexing.
+        Sessions on the index (from any worker) are counted in redis, only the first one reads the index's refresh
+        interval from ES, keeps it in redis and disables refresh, so that overlapping sessions neither turn refresh
+        back on under each other nor take the disabled interval for the original one.
+        Returns the refresh interval read from ES (None if refresh was already disabled by another session).
+        """
+        redis_service = RedisService()
+        sessions_key = ES_BULK_INDEX_SESSIONS_KEY.format(index._name)  # pylint: disable=protected-access
+        try:
+            sessions = redis_service.incr(sessions_key)
+            redis_service.expire(sessions_key, ES_BULK_INDEX_SESSIONS_TIMEOUT)
+        except RedisError:
+            sessions = 1
+        if sessions > 1:
+            return None
+
+        refresh_interval = cls.get_refresh_interval(index)
+        if refresh_interval == '-1':  # left disabled by a dead session, the original interval is kept in redis
+            return None
+        try:
+            redis_service.set_json(
+                ES_REFRESH_INTERVAL_KEY.format(index._name), refresh_interval)  # pylint: disable=protected-access
+        except RedisError:
+            pass
+        cls.set_refresh_interval(index, '-1')
+
+        return refresh_interval
+
+    @classmethod
+    def restore_refresh(cls, index, refresh_interval=None):
+        """
+        Refreshes the index after a bulk indexing, and restores its original refresh interval when it was the last
+        session on it (the interval kept in redis by the first one, else the given one).
+        """
+        redis_service = RedisService()
+        sessions_key = ES_BULK_INDEX_SESSIONS_KEY.format(index._name)  # pylint: disable=protected-access
+        refresh_interval_key = ES_REFRESH_INTERVAL_KEY.format(index._name)  # pylint: disable=protected-access
+        try:
+            if redis_service.decr(sessions_key) > 0:
+                cls.refresh(index)
+                return
+            redis_service.delete(sessions_key)
+            if redis_service.exists(refresh_interval_key):
+                refresh_interval = redis_service.get_formatted(refresh_interval_key)
+        except RedisError:
+            pass
+
+        if cls.set_refresh_interval(index, refresh_interval):
+            cls.refresh(index)
+
+    @staticmethod
+    def get_refresh_interval(index):
+        """Refresh interval set on the index in ES, None when it uses the server's default"""
+        try:
+            index_settings = index.get_settings()
+        except TransportError:
+            return None
+
+        return get(list(index_settings.values()), '0.settings.index.refresh_interval')
+
+    @staticmethod
+    def set_refresh_interval(index, refresh_interval):
+        try:
+            index.put_settings(body=dict(index=dict(refresh_interval=refresh_interval)))
+        except TransportError:
+            return False
+
+        return True
+
+    @staticmethod
+    def refresh(index):
+        try:
+            index.refresh()
+        except TransportError:
+            pass
+
+
 class CelerySignalProcessor(RealTimeSignalProcessor):
+    @staticmethod
+    def invalidate_search_cache(instance, repositories=()):
+        """
+        Bumps the search cache version of the repository instance, or of the parent and collections of the child
+        instance, and of the repositories whose membership of instance changed.
+        """
+        if not get(settings, 'SEARCH_CACHE_TIMEOUT') or instance.__class__ not in registry.get_models():
+            return
+
+        if isinstance(instance, ConceptContainerModel):
+            repositories = [instance, *repositories]
+        elif isinstance(get(instance, 'parent'), ConceptContainerModel):
+            repositories = [instance.parent, *instance.collection_set.all(), *repositories]
+
+        for repository in {repository.search_cache_version_key: repository for repository in repositories}.values():
+            repository.bump_search_cache_version()
+
     def handle_save(self, sender, instance, **kwargs):
+        self.invalidate_search_cache(instance)
         if settings.ES_SYNC and instance.__class__ in registry.get_models():
-            handle_save.delay(instance.app_name, instance.model_name, instance.id)
+            session = IndexingSession.current()
+            if session:
+                session.add(instance.__class__, [instance.id])
+            else:
+                handle_save.delay(instance.app_name, instance.model_name, instance.id)
 
     def handle_m2m_changed(self, sender, instance, action, **kwargs):
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            model, pk_set = kwargs.get('model'), kwargs.get('pk_set')
+            if action == 'post_clear':
+                pk_set = getattr(instance, 'cleared_pk_set', None)  # stored on pre_clear by the children counts signal
+            repositories = ()
+            if pk_set and not isinstance(instance, ConceptContainerModel) and issubclass(model, ConceptContainerModel):
+                repositories = model.objects.filter(id__in=pk_set)  # including the ones instance was removed from
+            self.invalidate_search_cache(instance, repositories)
         if settings.ES_SYNC and instance.__class__ in registry.get_models():
-            handle_m2m_changed.delay(instance.app_name, instance.model_name, instance.id, action)
+            session = IndexingSession.current()
+            if session and action in ('post_add', 'post_remove', 'post_clear'):
+                session.add(instance.__class__, [instance.id])
+            else:
+                handle_m2m_changed.delay(instance.app_name, instance.model_name, instance.id, action)
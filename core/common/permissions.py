@@ -3,6 +3,32 @@ from rest_framework.permissions import BasePermission
 from core.common.constants import ACCESS_TYPE_EDIT, ACCESS_TYPE_VIEW
 
 
+def get_organization_ids(request):
+    """
+    Ids of the requesting user's organizations, loaded once per request (memoized on request.user), so that
+    permission checks run in memory.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset()
+
+    return user.get_organization_ids()
+
+
+def is_owner_or_member(request, obj):
+    """
+    Requesting user is obj's owner (user) or a member of its owner (organization), or of obj itself if it is an
+    organization.
+    """
+    from core.orgs.models import Organization
+    if isinstance(obj, Organization):
+        return obj.id in get_organization_ids(request)
+    if getattr(obj, 'organization_id', None):
+        return obj.organization_id in get_organization_ids(request)
+
+    return bool(getattr(obj, 'user_id', None)) and obj.user_id == request.user.id
+
+
 class HasPrivateAccess(BasePermission):
     """
     Current user is authenticated as a staff user, or is designated as the referenced object's owner,
@@ -12,14 +38,7 @@ class HasPrivateAccess(BasePermission):
         user = request.user
         if user.is_staff:
             return True
-        if user.is_authenticated:
-            if hasattr(obj, 'parent_id') and user == obj.parent:
-                return True
-            if user.organizations.filter(id=obj.id).exists():
-                return True
-            if hasattr(obj, 'parent_id') and user.organizations.filter(id=obj.parent_id).exists():
-                return True
-        return False
+        return user.is_authenticated and is_owner_or_member(request, obj)
 
 
 class HasOwnership(BasePermission):
@@ -36,7 +55,7 @@ class HasOwnership(BasePermission):
             if isinstance(obj, UserProfile):
                 return obj == user
             if isinstance(obj, Organization):
-                return obj.is_member(user)
+                return obj.id in get_organization_ids(request)
             return True
         return False
 
@@ -74,14 +93,8 @@ class HasAccessToVersionedObject(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.user.is_staff:
             return True
-        versioned_object = obj.head
-
-        from core.users.models import UserProfile
-        if isinstance(versioned_object.parent, UserProfile) and request.user.id == versioned_object.parent_id:
-            return True
-        if request.user.is_authenticated:
-            return request.user.organizations.filter(id=versioned_object.parent_id).exists()
-        return False
+        # every version has the owner of the object it versions
+        return request.user.is_authenticated and is_owner_or_member(request, obj)
 
 
 class CanViewConceptDictionaryVersion(HasAccessToVersionedObject):
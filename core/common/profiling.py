@@ -0,0 +1,116 @@
+"""
+Opt-in (PROFILING_ENABLED) per request instrumentation. While a request is profiled, the `profile` context manager
+and `profiled` decorator add the count and time of db queries, ES/Redis/S3 calls and serialization to its profile.
+Outside of a profiled request they do nothing.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from elasticsearch import Transport
+
+_current_profile = ContextVar('request_profile', default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.latency = None
+        self.metrics = dict()  # name -> [calls, seconds]
+        self.running = set()
+
+    def add(self, name, duration):
+        metric = self.metrics.setdefault(name, [0, 0])
+        metric[0] += 1
+        metric[1] += duration
+
+    def stop(self):
+        self.latency = time.perf_counter() - self.start_time
+
+    @property
+    def server_timing(self):
+        entries = [
+            '{};dur={:.1f};desc="{} calls"'.format(name, duration * 1000, calls)
+            for name, (calls, duration) in sorted(self.metrics.items())
+        ]
+        return ', '.join([*entries, 'total;dur={:.1f}'.format((self.latency or 0) * 1000)])
+
+    def to_dict(self):
+        return dict(
+            latency_ms=round((self.latency or 0) * 1000, 1),
+            **{name: [calls, round(duration * 1000, 1)] for name, (calls, duration) in self.metrics.items()}
+        )
+
+
+@contextmanager
+def profiling():
+    request_profile = RequestProfile()
+    token = _current_profile.set(request_profile)
+    try:
+        yield request_profile
+    finally:
+        request_profile.stop()
+        _current_profile.reset(token)
+
+
+def is_profiling():
+    return _current_profile.get() is not None
+
+
+@contextmanager
+def profile(name):
+    """Times the block as one `name` call, nested `name` blocks (e.g. S3.upload -> S3.generate_signed_url) included"""
+    request_profile = _current_profile.get()
+    if request_profile is None or name in request_profile.running:
+        yield
+        return
+
+    request_profile.running.add(name)
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        request_profile.running.discard(name)
+        request_profile.add(name, time.perf_counter() - start_time)
+
+
+def profiled(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ProfiledTransport(Transport):
+    def perform_request(self, method, url, headers=None, params=None, body=None):  # pylint: disable=too-many-arguments
+        with profile('es'):
+            return super().perform_request(method, url, headers=headers, params=params, body=body)
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return dict()
+
+    return {
+        'p' + str(rank): values[min(len(values) - 1, int(len(values) * rank / 100))] for rank in (50, 95, 99)
+    }
+
+
+def get_profile_stats(samples):
+    """Latency and per metric calls/time percentiles of a view's recorded profiles"""
+    metrics = {name for sample in samples for name in sample if name != 'latency_ms'}
+    return dict(
+        samples=len(samples),
+        latency_ms=percentiles([sample['latency_ms'] for sample in samples]),
+        **{
+            name: dict(
+                calls=percentiles([sample.get(name, [0, 0])[0] for sample in samples]),
+                ms=percentiles([sample.get(name, [0, 0])[1] for sample in samples]),
+            ) for name in sorted(metrics)
+        }
+    )
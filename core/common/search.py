@@ -1,4 +1,45 @@
-from elasticsearch_dsl import FacetedSearch
+from elasticsearch_dsl import FacetedSearch, Q, analyzer, token_filter, Text
+from pydash import get
+
+autocomplete_filter = token_filter('autocomplete_filter', 'edge_ngram', min_gram=1, max_gram=20)
+keyword_autocomplete_analyzer = analyzer(
+    'keyword_autocomplete', tokenizer='keyword', filter=['lowercase', autocomplete_filter])
+keyword_lowercase_analyzer = analyzer('keyword_lowercase', tokenizer='keyword', filter=['lowercase'])
+text_autocomplete_analyzer = analyzer(
+    'text_autocomplete', tokenizer='standard', filter=['lowercase', autocomplete_filter])
+
+
+def autocomplete_fields(keyword=True):
+    """
+    Multi-fields for an edge n-gram 'autocomplete' sub-field, prefixes of the whole value for keyword (code like)
+    fields and prefixes of every word for text (name like) fields.
+    """
+    if keyword:
+        return dict(
+            autocomplete=Text(analyzer=keyword_autocomplete_analyzer, search_analyzer=keyword_lowercase_analyzer))
+
+    return dict(autocomplete=Text(analyzer=text_autocomplete_analyzer, search_analyzer='standard'))
+
+
+def get_search_criterion(search_str, es_fields):
+    """
+    Matches search_str as a prefix of the es_fields configured with 'autocomplete' (scored by their 'boost', exact
+    matches scoring higher) or as a whole term of any field.
+    """
+    if not search_str:
+        return Q('match_all')
+
+    criterion = Q('multi_match', query=search_str, lenient=True)
+    for field, config in es_fields.items():
+        if config.get('autocomplete', False):
+            boost = config.get('boost', 1)
+            criterion |= Q(
+                'match', **{field: dict(query=search_str, boost=boost * 2)}
+            ) | Q(
+                'match', **{field + '.autocomplete': dict(query=search_str, operator='and', boost=boost)}
+            )
+
+    return criterion
 
 
 class CommonSearch(FacetedSearch):
@@ -6,17 +47,13 @@ class CommonSearch(FacetedSearch):
         self.exact_match = exact_match
         super().__init__(query=query, filters=filters, sort=sort)
 
-    def format_search_str(self, search_str):
-        if self.exact_match:
-            return search_str
-        return "*{}*".format(search_str)
-
     def query(self, search, query):
         if query:
-            search_str = self.format_search_str(query)
+            if not self.exact_match:
+                return search.filter(get_search_criterion(query, get(self, 'doc_types.0.es_fields') or dict()))
             if self.fields:
-                return search.filter('query_string', fields=self.fields, query=search_str)
+                return search.filter('query_string', fields=self.fields, query=query)
 
-            return search.query('multi_match', query=search_str)
+            return search.query('multi_match', query=query)
 
         return search
@@ -9,6 +9,7 @@ from botocore.exceptions import NoCredentialsError, ClientError
 from django.conf import settings
 from django.core.files.base import ContentFile
 
+from core.common.profiling import profiled
 from core.settings import REDIS_HOST, REDIS_PORT, REDIS_DB
 
 
@@ -33,6 +34,7 @@ class S3:
         )
 
     @classmethod
+    @profiled('s3')
     def generate_signed_url(cls, accessor, key):
         try:
             _conn = cls._conn()
@@ -48,6 +50,7 @@ class S3:
             pass
 
     @classmethod
+    @profiled('s3')
     def upload(cls, file_path, file_content, headers=None):
         url = cls.generate_signed_url(cls.PUT, file_path)
         result = None
@@ -60,12 +63,14 @@ class S3:
         return result
 
     @classmethod
+    @profiled('s3')
     def upload_file(cls, key, file_path=None, headers=None, binary=False):
         read_directive = 'rb' if binary else 'r'
         file_path = file_path if file_path else key
         return cls.upload(key, open(file_path, read_directive).read(), headers)
 
     @classmethod
+    @profiled('s3')
     def upload_public(cls, file_path, file_content):
         try:
             client = cls._conn()
@@ -124,6 +129,7 @@ class S3:
         return url
 
     @classmethod
+    @profiled('s3')
     def exists(cls, key):
         try:
             cls.resource().meta.client.head_object(Key=key, Bucket=settings.AWS_STORAGE_BUCKET_NAME)
@@ -144,6 +150,7 @@ class S3:
         return cls._session().resource('s3')
 
     @classmethod
+    @profiled('s3')
     def delete_objects(cls, path):  # pragma: no cover
         try:
             s3_resource = cls.resource()
@@ -156,6 +163,7 @@ class S3:
             pass
 
     @classmethod
+    @profiled('s3')
     def missing_objects(cls, objects, prefix_path, sub_paths):  # pragma: no cover
         missing_objects = []
 
@@ -175,6 +183,7 @@ class S3:
         return missing_objects
 
     @classmethod
+    @profiled('s3')
     def remove(cls, key):
         try:
             _conn = cls._conn()
@@ -189,12 +198,18 @@ class S3:
 class RedisService:  # pragma: no cover
     def __init__(self):
         self.conn = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=REDIS_DB)
+        if settings.PROFILING_ENABLED:
+            self.conn.execute_command = profiled('redis')(self.conn.execute_command)
 
-    def set(self, key, val):
-        return self.conn.set(key, val)
+    def set(self, key, val, expiry=None):
+        return self.conn.set(key, val, ex=expiry)
 
-    def set_json(self, key, val):
-        return self.conn.set(key, json.dumps(val))
+    def set_nx(self, key, val, expiry=None):
+        """Sets key only if it does not exist, returns whether it was set"""
+        return bool(self.conn.set(key, val, ex=expiry, nx=True))
+
+    def set_json(self, key, val, expiry=None):
+        return self.conn.set(key, json.dumps(val), ex=expiry)
 
     def get_formatted(self, key):
         val = self.get(key)
@@ -217,5 +232,41 @@ class RedisService:  # pragma: no cover
     def keys(self, pattern):
         return self.conn.keys(pattern)
 
+    def scan_keys(self, pattern):
+        """Keys matching pattern, iterated with SCAN (unlike KEYS, does not block the server)"""
+        return self.conn.scan_iter(match=pattern)
+
+    def incr(self, key):
+        return self.conn.incr(key)
+
+    def decr(self, key):
+        return self.conn.decr(key)
+
+    def delete(self, *keys):
+        return self.conn.delete(*keys)
+
+    def hset(self, key, field, val):
+        return self.conn.hset(key, field, val)
+
+    def hdel(self, key, field):
+        return self.conn.hdel(key, field)
+
+    def expire(self, key, seconds):
+        return self.conn.expire(key, seconds)
+
+    def hgetall_formatted(self, key):
+        return {
+            field.decode() if isinstance(field, bytes) else field: val.decode() if isinstance(val, bytes) else val
+            for field, val in self.conn.hgetall(key).items()
+        }
+
+    def push_capped(self, key, val, size):
+        """Prepends val to the list at key, keeping only its latest size entries"""
+        self.conn.lpush(key, json.dumps(val))
+        return self.conn.ltrim(key, 0, size - 1)
+
+    def get_list_formatted(self, key):
+        return [json.loads(val) for val in self.conn.lrange(key, 0, -1)]
+
     def get_int(self, key):
         return int(self.conn.get(key).decode('utf-8'))
@@ -1,15 +1,33 @@
-from django.db.models.signals import pre_save, post_save
+from celery.signals import task_postrun, task_revoked
+from django.db.models.signals import pre_save, post_save, m2m_changed, pre_delete, post_delete
+from django.db.models import Max
 from django.dispatch import receiver
+from pydash import get
+from rest_framework.authtoken.models import Token
 
-from core.common.models import BaseModel
+from core.collections.models import Collection
+from core.common.constants import BACKGROUND_PROCESSING_TASKS
+from core.common.models import BaseModel, ConceptContainerModel
+from core.concepts.models import Concept
+from core.mappings.models import Mapping
 from core.orgs.models import Organization
+from core.sources.models import Source
+from core.users.authentication import clear_token_user_cache
 from core.users.models import UserProfile
 
+# repository's relation to children and children's relation to repositories, by m2m through model
+CHILDREN_RELATIONS = {
+    Concept.sources.through: ('concepts', 'sources'),
+    Mapping.sources.through: ('mappings', 'sources'),
+    Collection.concepts.through: ('concepts', 'collection_set'),
+    Collection.mappings.through: ('mappings', 'collection_set'),
+}
+
 
 @receiver(pre_save)
 def stamp_uri(sender, instance, **kwargs):  # pylint: disable=unused-argument
     if issubclass(sender, BaseModel):
-        instance.uri = instance.calculate_uri()
+        instance.stamp_uri()
 
 
 @receiver(post_save, sender=Organization)
@@ -18,3 +36,107 @@ def propagate_owner_status(sender, instance=None, created=False, **kwargs):  # p
     if not created and instance:
         instance.source_set.exclude(is_active=instance.is_active).update(is_active=instance.is_active)
         instance.collection_set.exclude(is_active=instance.is_active).update(is_active=instance.is_active)
+
+
+@receiver(post_save, sender=UserProfile)
+def clear_token_cache(sender, instance=None, created=False, **kwargs):  # pylint: disable=unused-argument
+    if not created and instance:
+        instance.clear_token_cache()
+
+
+@receiver(post_delete, sender=Token)
+def clear_deleted_token_cache(sender, instance=None, **kwargs):  # pylint: disable=unused-argument
+    if instance:
+        clear_token_user_cache([instance.key])
+
+
+@receiver(m2m_changed, sender=UserProfile.organizations.through)
+def clear_organization_ids_cache(  # pylint: disable=too-many-arguments
+        sender, instance, action, model, pk_set, **kwargs):  # pylint: disable=unused-argument
+    if action in ['post_add', 'post_remove', 'post_clear'] and isinstance(instance, UserProfile):
+        instance.clear_organization_ids_cache()
+
+
+@receiver(m2m_changed, sender=Concept.sources.through)
+@receiver(m2m_changed, sender=Mapping.sources.through)
+@receiver(m2m_changed, sender=Collection.concepts.through)
+@receiver(m2m_changed, sender=Collection.mappings.through)
+def update_active_children_counts(  # pylint: disable=too-many-arguments
+        sender, instance, action, model, pk_set, **kwargs):  # pylint: disable=unused-argument
+    relation, children_relation = CHILDREN_RELATIONS[sender]
+    is_repository = isinstance(instance, ConceptContainerModel)
+
+    if action == 'pre_clear':
+        instance.cleared_pk_set = set(
+            getattr(instance, relation if is_repository else children_relation).values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, 'cleared_pk_set', None)
+    elif action not in ['post_add', 'post_remove']:
+        return
+    if not pk_set:
+        return
+
+    added = action == 'post_add'
+    if is_repository:
+        instance.update_active_children_count(relation, pk_set, added)
+    else:
+        for repository in model.objects.filter(id__in=pk_set):
+            repository.update_active_children_count(relation, [instance.id], added)
+
+
+@receiver(pre_delete, sender=Concept)
+@receiver(pre_delete, sender=Mapping)
+def store_deleted_child_repositories(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    # deleting a child deletes its through rows without m2m_changed, its repositories are recounted on post_delete
+    instance.deleted_from_repository_ids = {
+        Source: list(instance.sources.values_list('id', flat=True)),
+        Collection: list(instance.collection_set.values_list('id', flat=True)),
+    }
+
+
+@receiver(post_delete, sender=Concept)
+@receiver(post_delete, sender=Mapping)
+def update_deleted_child_repositories_counts(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    for repository_class, ids in getattr(instance, 'deleted_from_repository_ids', dict()).items():
+        for repository in repository_class.objects.filter(id__in=ids):
+            repository.update_children_counts()
+
+
+@receiver(m2m_changed, sender=Concept.sources.through)
+@receiver(m2m_changed, sender=Mapping.sources.through)
+@receiver(m2m_changed, sender=Collection.concepts.through)
+@receiver(m2m_changed, sender=Collection.mappings.through)
+def update_last_child_update(sender, instance, action, model, pk_set, **kwargs):  # pylint: disable=unused-argument
+    if action != 'post_add' or not pk_set:
+        return
+
+    if isinstance(instance, ConceptContainerModel):
+        updated_at = model.objects.filter(id__in=pk_set).aggregate(Max('updated_at'))['updated_at__max']
+        if updated_at:
+            instance.touch_last_child_update(instance.__class__.objects.filter(id=instance.id), updated_at)
+            instance.refresh_from_db(fields=['_last_child_update'])
+    elif instance.updated_at:
+        model.touch_last_child_update(model.objects.filter(id__in=pk_set), instance.updated_at)
+
+
+@receiver(post_save, sender=Concept)
+@receiver(post_save, sender=Mapping)
+def touch_repositories_last_child_update(sender, instance=None, **kwargs):  # pylint: disable=unused-argument
+    if instance and instance.updated_at:
+        relation = 'concepts' if sender == Concept else 'mappings'
+        for repository_class in [Source, Collection]:
+            repository_class.touch_last_child_update(
+                repository_class.objects.filter(**{relation: instance}), instance.updated_at)
+
+
+@task_postrun.connect
+def remove_finished_task_processing(sender=None, task_id=None, **kwargs):  # pylint: disable=unused-argument
+    if get(sender, 'name') in BACKGROUND_PROCESSING_TASKS:
+        ConceptContainerModel.remove_task_processing(task_id)
+
+
+@task_revoked.connect
+def remove_revoked_task_processing(sender=None, request=None, **kwargs):  # pylint: disable=unused-argument
+    if get(sender, 'name') in BACKGROUND_PROCESSING_TASKS:
+        ConceptContainerModel.remove_task_processing(get(request, 'id'))
@@ -1,4 +1,3 @@
-
 from billiard.exceptions import WorkerLostError
 from celery.utils.log import get_task_logger
 from celery_once import QueueOnce
@@ -7,12 +6,16 @@ from django.conf import settings
 from django.core.mail import EmailMessage
 from django.core.management import call_command
 from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_elasticsearch_dsl.registries import registry
 from pydash import get
 
 from core.celery import app
-from core.common.constants import CONFIRM_EMAIL_ADDRESS_MAIL_SUBJECT, PASSWORD_RESET_MAIL_SUBJECT
-from core.common.utils import write_export_file, web_url
+from core.common.constants import CONFIRM_EMAIL_ADDRESS_MAIL_SUBJECT, PASSWORD_RESET_MAIL_SUBJECT, \
+    ES_REINDEX_WATERMARK_KEY, CSV_EXPORT_KEY, CSV_EXPORT_TASK_KEY
+from core.common.utils import write_export_file, web_url, get_csv_rows, get_csv_export_queryset, write_csv_to_s3, \
+    get_downloads_path
 
 logger = get_task_logger(__name__)
 
@@ -53,7 +56,7 @@ def export_source(self, version_id):
         logger.info('Not found source version %s', version_id)
         return
 
-    version.add_processing(self.request.id)
+    version.add_processing(self.request.id, self.name)
     try:
         logger.info('Found source version %s.  Beginning export...', version.version)
         write_export_file(version, 'source', 'core.sources.serializers.SourceVersionExportSerializer', logger)
@@ -75,7 +78,7 @@ def export_collection(self, version_id):
         logger.info('Not found collection version %s', version_id)
         return
 
-    version.add_processing(self.request.id)
+    version.add_processing(self.request.id, self.name)
     try:
         logger.info('Found collection version %s.  Beginning export...', version.version)
         write_export_file(
@@ -86,25 +89,48 @@ def export_collection(self, version_id):
         version.remove_processing(self.request.id)
 
 
+@app.task(bind=True)
+def export_csv(self, query, filename, is_owner):
+    from core.common.services import RedisService
+    service = RedisService()
+    status_key = CSV_EXPORT_TASK_KEY.format(self.request.id)
+    status = dict(task=self.request.id, state='STARTED', url=None)
+    service.set_json(status_key, status, settings.CSV_EXPORT_STATUS_TIMEOUT)
+    try:
+        status['url'] = write_csv_to_s3(*get_csv_rows(get_csv_export_queryset(query)), is_owner, filename)
+        status['state'] = 'SUCCESS'
+    except Exception as ex:
+        status['state'] = 'FAILURE'
+        status['error'] = str(ex)
+        raise
+    finally:
+        service.set_json(status_key, status, settings.CSV_EXPORT_STATUS_TIMEOUT)
+        service.delete(CSV_EXPORT_KEY.format(get_downloads_path(is_owner) + filename))
+
+    return status['url']
+
+
 @app.task(bind=True)
 def add_references(
         self, user, data, collection, host_url, cascade_mappings=False
 ):  # pylint: disable=too-many-arguments
+    from core.common.models import IndexingSession
     head = collection.get_head()
-    head.add_processing(self.request.id)
+    head.add_processing(self.request.id, self.name)
 
     try:
         (added_references, errors) = collection.add_expressions(data, host_url, user, cascade_mappings)
     finally:
         head.remove_processing(self.request.id)
 
-    for ref in added_references:
-        if ref.concepts:
-            for concept in ref.concepts:
-                concept.index()
-        if ref.mappings:
-            for mapping in ref.mappings:
-                mapping.index()
+    with IndexingSession():
+        for ref in added_references:
+            if ref.concepts:
+                for concept in ref.concepts:
+                    concept.index()
+            if ref.mappings:
+                for mapping in ref.mappings:
+                    mapping.index()
 
     return added_references, errors
 
@@ -153,6 +179,65 @@ def rebuild_indexes(app_names=None):  # app_names has to be an iterable of strin
     __run_search_index_command('--rebuild', app_names)
 
 
+@app.task(base=QueueOnce)
+def reindex_since(since=None, app_names=None):  # since has to be an ISO 8601 datetime string
+    """
+    Re-indexes documents whose model rows have updated_at >= since (or the last stored watermark per model, if since
+    is not given), straight from the DB in bulk, without saving anything or going through signals.
+    The watermark of each model is moved to the start of this run once its documents are indexed.
+    """
+    from core.common.models import IndexingSession
+    from core.common.services import RedisService
+    redis_service = RedisService()
+    started_at = timezone.now()
+    result = dict()
+
+    for document in registry.get_documents():
+        model = document.django.model
+        if app_names and model._meta.app_label not in app_names:  # pylint: disable=protected-access
+            continue
+
+        watermark_key = ES_REINDEX_WATERMARK_KEY.format(model._meta.label_lower)  # pylint: disable=protected-access
+        watermark = __parse_watermark(since or redis_service.get_formatted(watermark_key))
+        queryset = model.objects.filter(updated_at__gte=watermark) if watermark else model.objects
+        ids = list(queryset.order_by('id').values_list('id', flat=True))
+
+        logger.info('Re-indexing %s %s updated since %s', len(ids), model.__name__, watermark or 'the beginning')
+        if ids:
+            IndexingSession.bulk_index(document, ids)
+
+        redis_service.set(watermark_key, started_at.isoformat())
+        result[model._meta.label_lower] = len(ids)  # pylint: disable=protected-access
+
+    return result
+
+
+@app.task(base=QueueOnce)
+def repair_index(app_name, model_name, version_id, dry_run=False):
+    version = apps.get_model(app_name, model_name).objects.filter(id=version_id).first()
+
+    if not version:  # pragma: no cover
+        logger.info('Not found %s version %s', model_name, version_id)
+        return None
+
+    logger.info('Verifying index of %s version %s...', model_name, version.uri)
+    result = version.repair_index(dry_run)
+    logger.info('Index drift of %s version %s: %s', model_name, version.uri, result)
+
+    return result
+
+
+def __parse_watermark(value):
+    if not value:
+        return None
+
+    watermark = parse_datetime(value) if isinstance(value, str) else value
+    if watermark and timezone.is_naive(watermark):
+        watermark = timezone.make_aware(watermark)
+
+    return watermark
+
+
 def __run_search_index_command(command, app_names=None):
     if not command:
         return
@@ -249,19 +334,21 @@ def seed_children(self, resource, obj_id, export=True):
         export_task = export_collection
 
     if instance:
+        from core.common.models import IndexingSession
         task_id = self.request.id
 
         index = not export
 
         try:
-            instance.add_processing(task_id)
-            instance.seed_concepts(index=index)
-            instance.seed_mappings(index=index)
-            instance.seed_references()
-
-            if export:
-                export_task.delay(obj_id)
-                instance.index_children()
+            instance.add_processing(task_id, self.name)
+            with IndexingSession():
+                instance.seed_concepts(index=index)
+                instance.seed_mappings(index=index)
+                instance.seed_references()
+
+                if export:
+                    export_task.delay(obj_id)
+                    instance.index_children()
         finally:
             instance.remove_processing(task_id)
 
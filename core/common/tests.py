@@ -1,32 +1,46 @@
 import base64
+import json
 import uuid
-from unittest.mock import patch, Mock, mock_open
+import zipfile
+from io import StringIO
+from unittest.mock import patch, Mock, mock_open, call, ANY
 
 import boto3
 from botocore.exceptions import ClientError
 from colour_runner.django_runner import ColourRunnerMixin
 from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.core.files.base import ContentFile
 from django.core.management import call_command
-from django.test import TestCase
+from django.http import Http404, QueryDict
+from django.test import TestCase, override_settings
 from django.test.runner import DiscoverRunner
+from elasticsearch import TransportError
 from moto import mock_s3
 from requests.auth import HTTPBasicAuth
+from redis.exceptions import RedisError
 from rest_framework.test import APITestCase
 
 from core.collections.models import Collection
-from core.common.constants import HEAD, OCL_ORG_ID, SUPER_ADMIN_USER_ID
+from core.common.constants import HEAD, OCL_ORG_ID, SUPER_ADMIN_USER_ID, ESTIMATED_COUNT_THRESHOLD
+from core.common.mixins import ListWithHeadersMixin, CustomPaginator
+from core.common.models import IndexingSession, ConceptContainerModel, CelerySignalProcessor
+from core.common.profiling import profile, profiling, is_profiling, percentiles, get_profile_stats
+from core.common.search import autocomplete_fields, get_search_criterion
 from core.common.utils import (
     compact_dict_by_values, to_snake_case, flower_get, task_exists, parse_bulk_import_task_id,
     to_camel_case,
     drop_version, is_versioned_uri, separate_version, to_parent_uri, jsonify_safe, es_get,
-    get_resource_class_from_resource_name, flatten_dict)
+    get_resource_class_from_resource_name, flatten_dict, encode_cursor, decode_cursor, reverse_resource,
+    reverse_resource_version, get_kwargs_for_view, get_estimated_count, get_csv_rows, write_csv_to_s3,
+    get_csv_export_query, get_csv_export_queryset, queue_csv_export)
 from core.concepts.models import Concept, LocalizedText
 from core.mappings.models import Mapping
 from core.orgs.models import Organization
 from core.sources.models import Source
 from core.users.models import UserProfile
-from .services import S3
+from .services import S3, RedisService
 
 
 def delete_all():
@@ -47,6 +61,7 @@ class PauseElasticSearchIndex:
     settings.TEST_MODE = True
     settings.ELASTICSEARCH_DSL_AUTOSYNC = False
     settings.ES_SYNC = False
+    settings.SEARCH_CACHE_TIMEOUT = 0
 
 
 class BaseTestCase(PauseElasticSearchIndex):
@@ -210,6 +225,7 @@ class OCLAPITestCase(APITestCase, BaseTestCase):
     def tearDown(self):
         super().tearDown()
         delete_all()
+        cache.clear()
 
 
 class OCLTestCase(TestCase, BaseTestCase):
@@ -221,6 +237,7 @@ class OCLTestCase(TestCase, BaseTestCase):
     def tearDown(self):
         super().tearDown()
         delete_all()
+        cache.clear()
 
 
 class S3Test(TestCase):
@@ -692,6 +709,79 @@ class UtilsTest(OCLTestCase):
         #     }
         # )
 
+    def test_get_estimated_count(self):
+        estimated_count = get_estimated_count(Concept.objects.filter(is_active=True))
+
+        self.assertTrue(isinstance(estimated_count, int))
+        self.assertTrue(estimated_count >= 0)
+
+        view = ListWithHeadersMixin()
+        view.kwargs = dict(org='foo')
+        view.request = Mock(query_params=QueryDict('limit=10&page=2'))
+        queryset = Concept.objects.filter(is_active=True)
+        with patch('core.common.mixins.get_estimated_count', return_value=ESTIMATED_COUNT_THRESHOLD - 1):
+            self.assertEqual(view.get_count(queryset), queryset.count())
+            self.assertFalse(view.is_count_estimated)
+
+        with patch('core.common.mixins.get_estimated_count', return_value=ESTIMATED_COUNT_THRESHOLD):
+            self.assertEqual(view.get_count(queryset), ESTIMATED_COUNT_THRESHOLD)
+            self.assertTrue(view.is_count_estimated)
+
+            view.request = Mock(query_params=QueryDict('conceptClass=foo'))
+            self.assertEqual(view.get_count(queryset), queryset.count())
+            self.assertFalse(view.is_count_estimated)
+
+            view.request = Mock(query_params=QueryDict(''))
+            view.kwargs = dict(org='foo', source='bar')
+            self.assertEqual(view.get_count(queryset), queryset.count())
+            self.assertFalse(view.is_count_estimated)
+
+    def test_encode_decode_cursor(self):
+        cursor = encode_cursor([1.5, 'foo', 10])
+
+        self.assertTrue(isinstance(cursor, str))
+        self.assertEqual(decode_cursor(cursor), [1.5, 'foo', 10])
+        self.assertIsNone(decode_cursor(None))
+        self.assertIsNone(decode_cursor(''))
+        self.assertIsNone(decode_cursor('foobar'))
+        self.assertIsNone(decode_cursor(encode_cursor(dict(foo='bar'))))
+
+    def test_reverse_resource(self):
+        from core.sources.tests.factories import OrganizationSourceFactory
+        from core.concepts.tests.factories import ConceptFactory
+        source = OrganizationSourceFactory(mnemonic='source')
+        source_v1 = OrganizationSourceFactory(
+            mnemonic='source', version='v1', organization=source.organization, is_latest_version=True)
+        concept = ConceptFactory(parent=source, mnemonic='concept')
+        org_uri = source.organization.uri
+
+        source_versions = list(
+            Source.objects.filter(id__in=[source.id, source_v1.id]).select_related('organization').order_by('id'))
+        concepts = list(Concept.objects.filter(id=concept.id).select_related('parent__organization'))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [reverse_resource(version, 'concept-list') for version in source_versions],
+                [org_uri + 'sources/source/concepts/', org_uri + 'sources/source/v1/concepts/']
+            )
+            self.assertEqual(
+                reverse_resource_version(source_versions[1], 'source-version-detail'),
+                org_uri + 'sources/source/v1/'
+            )
+            self.assertEqual(
+                reverse_resource(concepts[0], 'concept-version-list'),
+                org_uri + 'sources/source/concepts/concept/versions/'
+            )
+            self.assertEqual(
+                reverse_resource(source_versions[0], 'source-detail', kwargs=dict(source='other', foo='bar')),
+                org_uri + 'sources/other/'
+            )
+
+        get_kwargs_for_view.cache_clear()
+        self.assertEqual(get_kwargs_for_view('source-version-detail'), {'org', 'user', 'source', 'version'})
+        get_kwargs_for_view('source-version-detail')
+        self.assertEqual(get_kwargs_for_view.cache_info().hits, 1)
+
 
 class BaseModelTest(OCLTestCase):
     def test_model_name(self):
@@ -701,3 +791,649 @@ class BaseModelTest(OCLTestCase):
     def test_app_name(self):
         self.assertEqual(Concept().app_name, 'concepts')
         self.assertEqual(Source().app_name, 'sources')
+
+    def test_uri_and_versioned_object_url_are_stored(self):
+        from core.sources.tests.factories import OrganizationSourceFactory
+        from core.concepts.tests.factories import ConceptFactory
+        source = OrganizationSourceFactory(mnemonic='source', version='v1')
+        concept = ConceptFactory(parent=source, mnemonic='concept')
+        org = source.organization
+        source_url = org.uri + 'sources/source/'
+
+        self.assertEqual(source.uri, source_url + 'v1/')
+        self.assertEqual(source._versioned_object_url, source_url)  # pylint: disable=protected-access
+        self.assertEqual(concept._versioned_object_url, concept.uri)  # pylint: disable=protected-access
+
+        Source.objects.filter(id=source.id).update(uri=None, _versioned_object_url=None)
+        Organization.objects.filter(id=org.id).update(uri='')
+        stdout = StringIO()
+        call_command('update_uris', resources=['orgs', 'sources', 'concepts'], stdout=stdout)
+
+        self.assertIn('Source: 1', stdout.getvalue())
+        self.assertIn('Concept: 0', stdout.getvalue())
+        source.refresh_from_db()
+        org.refresh_from_db()
+        self.assertEqual(org.uri, '/orgs/{}/'.format(org.mnemonic))
+        self.assertEqual(source.uri, source_url + 'v1/')
+        self.assertEqual(source.versioned_object_url, source_url)
+        self.assertEqual(source._versioned_object_url, source_url)  # pylint: disable=protected-access
+
+
+class IndexingSessionTest(OCLTestCase):
+    def test_nested_sessions_join_outermost(self):
+        self.assertIsNone(IndexingSession.current())
+
+        with IndexingSession() as session:
+            self.assertEqual(IndexingSession.current(), session)
+            with IndexingSession() as inner_session:
+                self.assertEqual(inner_session, session)
+            self.assertEqual(IndexingSession.current(), session)
+
+        self.assertIsNone(IndexingSession.current())
+
+    @patch('core.common.models.IndexingSession.bulk_index')
+    def test_batch_index_is_buffered_till_exit(self, bulk_index_mock):
+        from core.concepts.documents import ConceptDocument
+        from core.concepts.tests.factories import ConceptFactory
+        concept1 = ConceptFactory()
+        concept2 = ConceptFactory()
+
+        with IndexingSession() as session:
+            ConceptContainerModel.batch_index(Concept.objects.filter(id=concept1.id), ConceptDocument)
+            ConceptContainerModel.batch_index(
+                Concept.objects.filter(id__in=[concept1.id, concept2.id]), ConceptDocument)
+            self.assertEqual(session.pending, {Concept: {concept1.id, concept2.id}})
+            bulk_index_mock.assert_not_called()
+
+        bulk_index_mock.assert_called_once_with(ConceptDocument, sorted([concept1.id, concept2.id]))
+
+    @patch('core.common.models.handle_save')
+    def test_signal_processor_buffers_saves(self, handle_save_mock):
+        from core.concepts.tests.factories import ConceptFactory
+        concept = ConceptFactory()
+        processor = CelerySignalProcessor(Mock())
+        settings.ES_SYNC = True
+
+        try:
+            with IndexingSession() as session:
+                processor.handle_save(Concept, concept)
+                self.assertEqual(session.pending, {Concept: {concept.id}})
+                session.pending = dict()
+            handle_save_mock.delay.assert_not_called()
+
+            processor.handle_save(Concept, concept)
+            handle_save_mock.delay.assert_called_once_with('concepts', 'Concept', concept.id)
+        finally:
+            settings.ES_SYNC = False
+
+    @patch('core.common.models.RedisService')
+    def test_signal_processor_invalidates_search_cache(self, redis_service_mock):
+        from core.concepts.tests.factories import ConceptFactory
+        concept = ConceptFactory()
+        processor = CelerySignalProcessor(Mock())
+
+        processor.handle_save(Concept, concept)
+        redis_service_mock.assert_not_called()
+
+        settings.SEARCH_CACHE_TIMEOUT = 300
+        try:
+            processor.handle_save(Concept, concept)
+            processor.handle_m2m_changed(Source, concept.parent, 'pre_add')
+            processor.handle_m2m_changed(Source, concept.parent, 'post_add')
+            processor.handle_save(Organization, concept.parent.organization)
+        finally:
+            settings.SEARCH_CACHE_TIMEOUT = 0
+
+        self.assertEqual(
+            redis_service_mock.return_value.incr.mock_calls,
+            [call('search-version:' + concept.parent.uri), call('search-version:' + concept.parent.uri)]
+        )
+
+    @patch('core.common.models.RedisService')
+    def test_signal_processor_invalidates_collections_search_cache(self, redis_service_mock):
+        from core.collections.tests.factories import OrganizationCollectionFactory
+        from core.concepts.tests.factories import ConceptFactory
+        concept = ConceptFactory()
+        collection = OrganizationCollectionFactory()
+        collection.concepts.add(concept)
+        other_collection = OrganizationCollectionFactory()
+        processor = CelerySignalProcessor(Mock())
+
+        settings.SEARCH_CACHE_TIMEOUT = 300
+        try:
+            processor.handle_save(Concept, concept)
+            self.assertEqual(
+                redis_service_mock.return_value.incr.mock_calls,
+                [call('search-version:' + concept.parent.uri), call('search-version:' + collection.uri)]
+            )
+
+            redis_service_mock.reset_mock()
+            processor.handle_m2m_changed(
+                Collection.concepts.through, concept, 'post_remove', model=Collection, pk_set={other_collection.id})
+            self.assertEqual(
+                redis_service_mock.return_value.incr.mock_calls,
+                [
+                    call('search-version:' + concept.parent.uri), call('search-version:' + collection.uri),
+                    call('search-version:' + other_collection.uri)
+                ]
+            )
+        finally:
+            settings.SEARCH_CACHE_TIMEOUT = 0
+
+    @staticmethod
+    def get_document(refresh_interval=None):
+        index_settings = dict(index=dict(refresh_interval=refresh_interval)) if refresh_interval else dict(index=dict())
+        index = Mock(_name='concepts')
+        index.get_settings.return_value = {'concepts-1': dict(settings=index_settings)}
+        document = Mock(django=Mock(model=Concept), _index=index)
+        document.return_value.get_queryset.return_value = Concept.objects.all()
+        return document
+
+    @patch('core.common.models.RedisService')
+    def test_bulk_index(self, redis_service_mock):
+        from core.concepts.tests.factories import ConceptFactory
+        concept = ConceptFactory()
+        document = self.get_document('30s')
+        redis_service_mock.return_value.incr.return_value = 1
+        redis_service_mock.return_value.decr.return_value = 0
+        redis_service_mock.return_value.exists.return_value = True
+        redis_service_mock.return_value.get_formatted.return_value = '30s'
+
+        IndexingSession.bulk_index(document, [concept.id])
+
+        self.assertEqual(
+            document._index.put_settings.mock_calls,  # pylint: disable=protected-access
+            [
+                call(body=dict(index=dict(refresh_interval='-1'))),
+                call(body=dict(index=dict(refresh_interval='30s'))),
+            ]
+        )
+        redis_service_mock.return_value.set_json.assert_called_once_with('es-refresh-interval:concepts', '30s')
+        redis_service_mock.return_value.get_formatted.assert_called_once_with('es-refresh-interval:concepts')
+        redis_service_mock.return_value.delete.assert_called_once_with('es-bulk-index-sessions:concepts')
+        document._index.refresh.assert_called_once()  # pylint: disable=protected-access
+        self.assertEqual(list(document.return_value.update.call_args[0][0]), [concept])
+        self.assertEqual(document.return_value.update.call_args[1], dict(refresh=False, parallel=True))
+
+    @patch('core.common.models.RedisService')
+    def test_bulk_index_overlapping_sessions(self, redis_service_mock):
+        from core.concepts.tests.factories import ConceptFactory
+        concept = ConceptFactory()
+        document = self.get_document('30s')
+        redis_service_mock.return_value.incr.return_value = 2
+        redis_service_mock.return_value.decr.return_value = 1
+
+        IndexingSession.bulk_index(document, [concept.id])
+
+        document._index.get_settings.assert_not_called()  # pylint: disable=protected-access
+        document._index.put_settings.assert_not_called()  # pylint: disable=protected-access
+        redis_service_mock.return_value.set_json.assert_not_called()
+        redis_service_mock.return_value.delete.assert_not_called()
+        document._index.refresh.assert_called_once()  # pylint: disable=protected-access
+        document.return_value.update.assert_called_once()
+
+    @patch('core.common.models.RedisService')
+    def test_bulk_index_after_a_dead_session(self, redis_service_mock):
+        from core.concepts.tests.factories import ConceptFactory
+        concept = ConceptFactory()
+        document = self.get_document('-1')
+        redis_service_mock.return_value.incr.return_value = 1
+        redis_service_mock.return_value.decr.return_value = 0
+        redis_service_mock.return_value.exists.return_value = True
+        redis_service_mock.return_value.get_formatted.return_value = '30s'
+
+        IndexingSession.bulk_index(document, [concept.id])
+
+        redis_service_mock.return_value.set_json.assert_not_called()
+        self.assertEqual(
+            document._index.put_settings.mock_calls,  # pylint: disable=protected-access
+            [call(body=dict(index=dict(refresh_interval='30s')))]
+        )
+        document._index.refresh.assert_called_once()  # pylint: disable=protected-access
+
+    @patch('core.common.models.RedisService')
+    def test_bulk_index_without_redis(self, redis_service_mock):
+        from core.concepts.tests.factories import ConceptFactory
+        concept = ConceptFactory()
+        document = self.get_document()
+        redis_service_mock.return_value.incr.side_effect = RedisError('N/A')
+        redis_service_mock.return_value.decr.side_effect = RedisError('N/A')
+        redis_service_mock.return_value.set_json.side_effect = RedisError('N/A')
+
+        IndexingSession.bulk_index(document, [concept.id])
+
+        self.assertEqual(
+            document._index.put_settings.mock_calls,  # pylint: disable=protected-access
+            [
+                call(body=dict(index=dict(refresh_interval='-1'))),
+                call(body=dict(index=dict(refresh_interval=None))),
+            ]
+        )
+        document._index.refresh.assert_called_once()  # pylint: disable=protected-access
+
+    @patch('core.common.models.RedisService')
+    def test_bulk_index_when_refresh_interval_cannot_be_set(self, redis_service_mock):
+        from core.concepts.tests.factories import ConceptFactory
+        concept = ConceptFactory()
+        document = self.get_document()
+        document._index.put_settings.side_effect = TransportError('N/A')  # pylint: disable=protected-access
+        redis_service_mock.return_value.incr.return_value = 1
+        redis_service_mock.return_value.decr.return_value = 0
+        redis_service_mock.return_value.exists.return_value = False
+
+        IndexingSession.bulk_index(document, [concept.id])
+
+        self.assertEqual(document._index.put_settings.call_count, 2)  # pylint: disable=protected-access
+        self.assertFalse(document._index.refresh.called)  # pylint: disable=protected-access
+        document.return_value.update.assert_called_once()
+
+
+class ReindexSinceTaskTest(OCLTestCase):
+    @patch('core.common.models.IndexingSession.bulk_index')
+    @patch('core.common.services.RedisService')
+    def test_reindex_since_watermark(self, redis_service_mock, bulk_index_mock):
+        from core.common.tasks import reindex_since
+        from core.concepts.documents import ConceptDocument
+        from core.concepts.tests.factories import ConceptFactory
+        ConceptFactory()
+        concept = ConceptFactory()
+        Concept.objects.exclude(id=concept.id).update(updated_at='2020-01-01T00:00:00Z')
+        redis_service_mock.return_value.get_formatted.return_value = '2021-01-01T00:00:00Z'
+
+        result = reindex_since(None, ['concepts'])
+
+        self.assertEqual(result, {'concepts.concept': 1})
+        bulk_index_mock.assert_called_once_with(ConceptDocument, [concept.id])
+        redis_service_mock.return_value.get_formatted.assert_called_once_with('es-reindex-watermark:concepts.concept')
+        self.assertEqual(redis_service_mock.return_value.set.call_args[0][0], 'es-reindex-watermark:concepts.concept')
+
+    @patch('core.common.models.IndexingSession.bulk_index')
+    @patch('core.common.services.RedisService')
+    def test_reindex_since_given_datetime(self, redis_service_mock, bulk_index_mock):
+        from core.common.tasks import reindex_since
+        from core.concepts.tests.factories import ConceptFactory
+        ConceptFactory()
+
+        result = reindex_since('2999-01-01T00:00:00', ['concepts', 'mappings'])
+
+        self.assertEqual(result, {'concepts.concept': 0, 'mappings.mapping': 0})
+        bulk_index_mock.assert_not_called()
+        redis_service_mock.return_value.get_formatted.assert_not_called()
+        self.assertEqual(redis_service_mock.return_value.set.call_count, 2)
+
+    @patch('core.common.models.IndexingSession.bulk_index')
+    @patch('core.common.services.RedisService')
+    def test_reindex_since_without_watermark(self, redis_service_mock, bulk_index_mock):
+        from core.common.tasks import reindex_since
+        redis_service_mock.return_value.get_formatted.return_value = None
+
+        result = reindex_since(None, ['orgs'])
+
+        org_ids = list(Organization.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(result, {'orgs.organization': len(org_ids)})
+        self.assertEqual(bulk_index_mock.call_args[0][1], org_ids)
+
+
+class ExportCSVTaskTest(OCLTestCase):
+    @patch('core.common.tasks.write_csv_to_s3')
+    @patch('core.common.services.RedisService')
+    def test_export_csv(self, redis_service_mock, write_csv_to_s3_mock):
+        from core.common.tasks import export_csv
+        from core.sources.tests.factories import OrganizationSourceFactory
+        source = OrganizationSourceFactory(supported_locales=['en', 'fr'])
+        OrganizationSourceFactory()
+        write_csv_to_s3_mock.side_effect = lambda header, rows, *args: list(rows) and 'https://s3/file.csv.zip'
+
+        result = export_csv.apply(
+            (get_csv_export_query(Source.objects.filter(id=source.id)), 'file', True), task_id='task-1').get()
+
+        self.assertEqual(result, 'https://s3/file.csv.zip')
+        header, _, is_owner, filename = write_csv_to_s3_mock.call_args[0]
+        self.assertEqual(header[0:3], ['Owner', 'Source ID', 'Source Name'])
+        self.assertEqual((is_owner, filename), (True, 'file'))
+        redis_service_mock.return_value.set_json.assert_called_with(
+            'csv-export-task:task-1', dict(task='task-1', state='SUCCESS', url='https://s3/file.csv.zip'), 86400)
+        redis_service_mock.return_value.delete.assert_called_once_with('csv-export:downloads/creator/file')
+
+    def test_get_csv_rows(self):
+        from core.sources.tests.factories import OrganizationSourceFactory
+        source = OrganizationSourceFactory(supported_locales=['en', 'fr'])
+
+        header, rows = get_csv_rows(Source.objects.filter(id=source.id))
+        rows = list(rows)
+
+        self.assertEqual(len(header), 13)
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(len(rows[0]), 13)
+        self.assertEqual(rows[0][0:3], [source.organization.mnemonic, source.mnemonic, source.name])
+        self.assertEqual(rows[0][7], 'en,fr')
+        self.assertEqual(rows[0][12], source.uri)
+
+        header, rows = get_csv_rows(Organization.objects.filter(id=source.organization_id))
+
+        self.assertEqual(header[0], 'id')
+        self.assertEqual(list(rows)[0][0], source.organization_id)
+
+    def test_get_csv_export_query(self):
+        from core.sources.tests.factories import OrganizationSourceFactory
+        sources = [OrganizationSourceFactory(mnemonic=mnemonic) for mnemonic in ['b', 'c', 'a']]
+        queryset = Source.objects.filter(
+            id__in=[source.id for source in sources], updated_at__gte=sources[1].updated_at).order_by('mnemonic')[0:1]
+
+        with self.assertNumQueries(0):
+            query = json.loads(json.dumps(get_csv_export_query(queryset)))
+
+        self.assertEqual(query['model'], 'sources.Source')
+        self.assertEqual(query['ordering'], ['mnemonic'])
+        self.assertEqual(list(get_csv_export_queryset(query)), [sources[2]])
+        self.assertEqual(
+            list(get_csv_export_queryset(get_csv_export_query(Source.objects.filter(mnemonic='a')))), [sources[2]])
+
+    @patch('core.common.utils.RedisService')
+    @patch('core.common.tasks.export_csv')
+    def test_queue_csv_export(self, export_csv_mock, redis_service_mock):
+        from core.sources.tests.factories import OrganizationSourceFactory
+        source = OrganizationSourceFactory()
+        redis_service_mock.return_value.set_nx.return_value = True
+
+        with self.assertNumQueries(0):
+            status = queue_csv_export(Source.objects.filter(id=source.id), 'file', True)
+
+        self.assertEqual(status, dict(task=ANY, state='PENDING', url=None))
+        redis_service_mock.return_value.set_nx.assert_called_once_with(
+            'csv-export:downloads/creator/file', status['task'], 86400)
+        export_csv_mock.apply_async.assert_called_once_with(
+            (get_csv_export_query(Source.objects.filter(id=source.id)), 'file', True), task_id=status['task'])
+
+        export_csv_mock.reset_mock()
+        redis_service_mock.return_value.set_nx.return_value = False
+        redis_service_mock.return_value.get_formatted.side_effect = ['task-1', None]
+
+        self.assertEqual(
+            queue_csv_export(Source.objects.filter(id=source.id), 'file', True),
+            dict(task='task-1', state='PENDING', url=None)
+        )
+        export_csv_mock.apply_async.assert_not_called()
+
+    @patch('core.common.utils.S3')
+    def test_write_csv_to_s3(self, s3_mock):
+        contents = dict()
+
+        def upload_file(key, file_path, binary):  # pylint: disable=unused-argument
+            with zipfile.ZipFile(file_path) as zip_file:
+                contents.update({name: zip_file.read(name).decode() for name in zip_file.namelist()})
+
+        s3_mock.upload_file.side_effect = upload_file
+        s3_mock.url_for.return_value = 'https://s3/file.csv.zip'
+
+        url = write_csv_to_s3(['a', 'b'], iter([[1, 'foo'], [2, 'bar, baz']]), False, 'file')
+
+        self.assertEqual(url, 'https://s3/file.csv.zip')
+        self.assertEqual(contents, {'file.csv': 'a,b\r\n1,foo\r\n2,"bar, baz"\r\n'})
+        s3_mock.upload_file.assert_called_once_with(key='downloads/reader/file.csv.zip', file_path=ANY, binary=True)
+        s3_mock.url_for.assert_called_once_with('downloads/reader/file.csv.zip')
+
+
+class PermissionsTest(OCLTestCase):
+    def test_has_private_access(self):
+        from core.common.permissions import HasPrivateAccess, HasAccessToVersionedObject
+        from core.sources.tests.factories import OrganizationSourceFactory, UserSourceFactory
+        from core.users.tests.factories import UserProfileFactory
+        user = UserProfileFactory()
+        org_source = OrganizationSourceFactory()
+        org_source_version = OrganizationSourceFactory(
+            mnemonic=org_source.mnemonic, organization=org_source.organization, version='v1')
+        user_source = UserSourceFactory(user=user)
+        other_source = OrganizationSourceFactory()
+        user.organizations.add(org_source.organization)
+        request = Mock(spec=['user'], user=user)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(HasPrivateAccess().has_object_permission(request, None, org_source))
+            self.assertTrue(HasPrivateAccess().has_object_permission(request, None, org_source.organization))
+            self.assertTrue(HasPrivateAccess().has_object_permission(request, None, user_source))
+            self.assertFalse(HasPrivateAccess().has_object_permission(request, None, other_source))
+            self.assertFalse(HasPrivateAccess().has_object_permission(request, None, other_source.organization))
+            self.assertTrue(HasAccessToVersionedObject().has_object_permission(request, None, org_source_version))
+
+        self.assertFalse(HasPrivateAccess().has_object_permission(
+            Mock(spec=['user'], user=AnonymousUser()), None, org_source))
+
+
+class CustomPaginatorTest(OCLTestCase):
+    def test_current_page_results(self):
+        queryset = Mock(__getitem__=Mock(side_effect=lambda page: list(range(5))[page]))
+
+        paginator = CustomPaginator(
+            request=Mock(GET=QueryDict('page=2')), total_count=5, queryset=queryset, page_size=2)
+        self.assertEqual(paginator.current_page_results, [2, 3])
+        self.assertEqual(paginator.page_count, 3)
+        queryset.count.assert_not_called()
+
+        paginator = CustomPaginator(
+            request=Mock(GET=QueryDict('page=5')), total_count=5, queryset=queryset, page_size=2)
+        self.assertEqual(paginator.current_page_results, [4])
+
+        paginator = CustomPaginator(
+            request=Mock(GET=QueryDict('page=0')), total_count=0, queryset=queryset, page_size=2)
+        self.assertEqual(paginator.current_page_results, [0, 1])
+        queryset.count.assert_not_called()
+
+
+class PathWalkerMixinTest(OCLTestCase):
+    def test_get_object_for_path(self):
+        from core.common.mixins import PathWalkerMixin
+        from core.sources.tests.factories import OrganizationSourceFactory, UserSourceFactory
+        source = OrganizationSourceFactory()
+        source_version = OrganizationSourceFactory(
+            mnemonic=source.mnemonic, organization=source.organization, version='v1')
+        user_source = UserSourceFactory()
+        request = Mock(spec=['user'], user=user_source.user)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(PathWalkerMixin.get_object_for_path(source.uri, request), source)
+            self.assertEqual(PathWalkerMixin.get_object_for_path(source.uri, request), source)
+            self.assertEqual(PathWalkerMixin.get_object_for_path(source.uri, request).organization, source.organization)
+
+        self.assertEqual(PathWalkerMixin.get_object_for_path(source_version.uri, request), source_version)
+        self.assertEqual(PathWalkerMixin.get_object_for_path(user_source.uri, request), user_source)
+        self.assertEqual(PathWalkerMixin.get_object_for_path('/user/', request), user_source.user)
+        self.assertEqual(
+            PathWalkerMixin.get_object_for_path(source.organization.uri, request), source.organization)
+        with self.assertRaises(Http404):
+            PathWalkerMixin.get_object_for_path(source.organization.uri + 'sources/foobar/', request)
+
+
+class RequestLogMiddlewareTest(OCLAPITestCase):
+    @override_settings(REQUEST_LOG_MODE='structured', REQUEST_LOG_SAMPLE_RATE=1, REQUEST_LOG_BODY_SAMPLE_RATES={})
+    @patch('core.middlewares.middlewares.request_logger')
+    def test_structured_log(self, request_logger_mock):
+        response = self.client.get('/orgs/?limit=1')
+
+        self.assertEqual(response.status_code, 200)
+        request_logger_mock.info.assert_called_once()
+        request_logger_mock.log.assert_not_called()
+        log = json.loads(request_logger_mock.info.call_args[0][0])
+        self.assertEqual(
+            log,
+            dict(
+                method='GET', path='/orgs/?limit=1', user='', remote_addr='127.0.0.1', status=200, latency_ms=ANY,
+                request_size=0, response_size=len(response.content)
+            )
+        )
+
+    @override_settings(REQUEST_LOG_MODE='structured', REQUEST_LOG_SAMPLE_RATE=0, REQUEST_LOG_BODY_SAMPLE_RATES={})
+    @patch('core.middlewares.middlewares.request_logger')
+    def test_structured_log_sampled_out(self, request_logger_mock):
+        self.assertEqual(self.client.get('/orgs/').status_code, 200)
+        request_logger_mock.info.assert_not_called()
+
+        self.assertEqual(self.client.get('/orgs/foobar/').status_code, 404)
+        self.assertEqual(json.loads(request_logger_mock.info.call_args[0][0])['status'], 404)
+        request_logger_mock.log.assert_not_called()
+
+    @override_settings(
+        REQUEST_LOG_MODE='structured', REQUEST_LOG_SAMPLE_RATE=0, REQUEST_LOG_BODY_SAMPLE_RATES={'/orgs/': 1})
+    @patch('core.middlewares.middlewares.request_logger')
+    def test_structured_log_with_body_sampling(self, request_logger_mock):
+        self.assertEqual(self.client.get('/orgs/').status_code, 200)
+
+        request_logger_mock.info.assert_called_once()
+        self.assertTrue(request_logger_mock.log.called)
+
+        request_logger_mock.reset_mock()
+        self.assertEqual(self.client.get('/users/').status_code, 200)
+
+        request_logger_mock.info.assert_not_called()
+        request_logger_mock.log.assert_not_called()
+
+
+class ProfilingTest(OCLTestCase):
+    def test_profile(self):
+        with profile('db'):
+            self.assertFalse(is_profiling())
+
+        with profiling() as request_profile:
+            self.assertTrue(is_profiling())
+            with profile('s3'):
+                with profile('s3'):
+                    pass
+            with profile('db'):
+                pass
+            with profile('db'):
+                pass
+
+        self.assertFalse(is_profiling())
+        self.assertEqual(request_profile.metrics['s3'][0], 1)
+        self.assertEqual(request_profile.metrics['db'][0], 2)
+        self.assertIsNotNone(request_profile.latency)
+        self.assertRegex(
+            request_profile.server_timing,
+            r'^db;dur=[\d.]+;desc="2 calls", s3;dur=[\d.]+;desc="1 calls", total;dur=[\d.]+$'
+        )
+        self.assertEqual(
+            request_profile.to_dict(), dict(latency_ms=ANY, db=[2, ANY], s3=[1, ANY]))
+
+    def test_get_profile_stats(self):
+        self.assertEqual(percentiles([]), dict())
+        self.assertEqual(percentiles(list(range(100, 0, -1))), dict(p50=51, p95=96, p99=100))
+        self.assertEqual(
+            get_profile_stats([dict(latency_ms=10, db=[2, 4]), dict(latency_ms=30)]),
+            dict(
+                samples=2,
+                latency_ms=dict(p50=30, p95=30, p99=30),
+                db=dict(calls=dict(p50=2, p95=2, p99=2), ms=dict(p50=4, p95=4, p99=4)),
+            )
+        )
+
+    @patch('core.middlewares.middlewares.RedisService')
+    def test_profiling_middleware(self, redis_service_mock):
+        response = self.client.get('/orgs/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('Server-Timing'))
+        redis_service_mock.assert_not_called()
+
+        with override_settings(PROFILING_ENABLED=True):
+            response = self.client.get('/orgs/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serializer;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+        redis_service_mock().push_capped.assert_called_once_with(
+            'profile:GET core.orgs.views.OrganizationListView', ANY, 1000)
+        self.assertEqual(
+            sorted(redis_service_mock().push_capped.call_args[0][1].keys()), ['db', 'latency_ms', 'serializer'])
+
+    @patch('core.middlewares.middlewares.RedisService')
+    def test_profiling_middleware_ignores_record_errors(self, redis_service_mock):
+        redis_service_mock().push_capped.side_effect = Exception('Redis is down')
+
+        with override_settings(PROFILING_ENABLED=True):
+            response = self.client.get('/orgs/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_redis_service_profiles_commands_only_when_enabled(self):
+        self.assertFalse(hasattr(RedisService().conn.execute_command, '__wrapped__'))
+
+        with override_settings(PROFILING_ENABLED=True):
+            self.assertTrue(hasattr(RedisService().conn.execute_command, '__wrapped__'))
+
+    @patch('core.common.views.RedisService')
+    def test_profiling_view(self, redis_service_mock):
+        from core.users.tests.factories import UserProfileFactory
+        redis_service_mock().scan_keys.return_value = [b'profile:GET core.orgs.views.OrganizationListView']
+        redis_service_mock().get_list_formatted.return_value = [dict(latency_ms=10, db=[2, 4])]
+
+        response = self.client.get(
+            '/profiling/', HTTP_AUTHORIZATION='Token ' + UserProfileFactory().get_token())
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.get(
+            '/profiling/', HTTP_AUTHORIZATION='Token ' + UserProfileFactory(is_staff=True).get_token())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data,
+            {
+                'GET core.orgs.views.OrganizationListView': dict(
+                    samples=1,
+                    latency_ms=dict(p50=10, p95=10, p99=10),
+                    db=dict(calls=dict(p50=2, p95=2, p99=2), ms=dict(p50=4, p95=4, p99=4)),
+                )
+            }
+        )
+        redis_service_mock().get_list_formatted.assert_called_once_with(
+            'profile:GET core.orgs.views.OrganizationListView')
+        redis_service_mock().scan_keys.assert_called_once_with('profile:*')
+        redis_service_mock().keys.assert_not_called()
+
+        redis_service_mock().scan_keys.return_value = [b'profile:GET core.orgs.views.OrganizationListView']
+        response = self.client.delete(
+            '/profiling/', HTTP_AUTHORIZATION='Token ' + UserProfileFactory(is_staff=True).get_token())
+        self.assertEqual(response.status_code, 204)
+        redis_service_mock().delete.assert_called_once_with(b'profile:GET core.orgs.views.OrganizationListView')
+
+
+class SearchTest(OCLTestCase):
+    def test_autocomplete_fields(self):
+        self.assertEqual(
+            autocomplete_fields()['autocomplete'].to_dict(),
+            dict(type='text', analyzer='keyword_autocomplete', search_analyzer='keyword_lowercase')
+        )
+        self.assertEqual(
+            autocomplete_fields(keyword=False)['autocomplete'].to_dict(),
+            dict(type='text', analyzer='text_autocomplete', search_analyzer='standard')
+        )
+
+    def test_get_search_criterion(self):
+        self.assertEqual(get_search_criterion('', Concept.es_fields).to_dict(), dict(match_all={}))
+        self.assertEqual(
+            get_search_criterion('mal', dict(id=dict(autocomplete=True, boost=2), source=dict())).to_dict(),
+            dict(
+                bool=dict(
+                    should=[
+                        dict(match=dict(id=dict(query='mal', boost=4))),
+                        dict(match={'id.autocomplete': dict(query='mal', operator='and', boost=2)}),
+                        dict(multi_match=dict(query='mal', lenient=True)),
+                    ]
+                )
+            )
+        )
+
+    def test_common_search_query(self):
+        from core.concepts.search import ConceptSearch
+        search = Mock()
+
+        ConceptSearch().query(search, 'mal')
+        search.filter.assert_called_once_with(get_search_criterion('mal', Concept.es_fields))
+
+        search = Mock()
+        ConceptSearch(exact_match=True).query(search, 'mal')
+        search.filter.assert_called_once_with('query_string', fields=ConceptSearch.fields, query='mal')
+
+        search = Mock()
+        self.assertEqual(ConceptSearch().query(search, ''), search)
+        search.filter.assert_not_called()
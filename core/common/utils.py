@@ -1,3 +1,6 @@
+import base64
+import csv
+import io
 import json
 import os
 import random
@@ -5,20 +8,24 @@ import tempfile
 import uuid
 import zipfile
 from collections import MutableMapping, OrderedDict  # pylint: disable=no-name-in-module
+from functools import lru_cache
 from urllib import parse
 
 import requests
 from celery_once.helpers import queue_once_key
 from dateutil import parser
+from django.apps import apps
 from django.conf import settings
+from django.db import connections
+from django.db.models.expressions import RawSQL
 from django.urls import NoReverseMatch, reverse, get_resolver, resolve, Resolver404
-from djqscsv import csv_file_for
-from pydash import flatten
+from pydash import flatten, get
 from requests.auth import HTTPBasicAuth
 from rest_framework.utils import encoders
 
-from core.common.constants import UPDATED_SINCE_PARAM, BULK_IMPORT_QUEUES_COUNT, TEMP
-from core.common.services import S3
+from core.common.constants import UPDATED_SINCE_PARAM, BULK_IMPORT_QUEUES_COUNT, TEMP, CSV_EXPORT_KEY, \
+    CSV_EXPORT_TASK_KEY
+from core.common.services import S3, RedisService
 
 
 def get_latest_dir_in_path(path):  # pragma: no cover
@@ -33,20 +40,80 @@ def cd_temp():  # pragma: no cover
     return cwd
 
 
-def write_csv_to_s3(data, is_owner, **kwargs):  # pragma: no cover
-    cwd = cd_temp()
-    csv_file = csv_file_for(data, **kwargs)
-    csv_file.close()
-    zip_file_name = csv_file.name + '.zip'
-    with zipfile.ZipFile(zip_file_name, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        zip_file.write(csv_file.name)
-
-    key = get_downloads_path(is_owner) + zip_file.filename
-    S3.upload_file(key=key, file_path=os.path.abspath(zip_file.filename), binary=True)
-    os.chdir(cwd)
+def get_csv_rows(queryset):
+    """
+    CSV header and rows (streamed from the db with .iterator()) of the queryset, by its model's get_csv_rows or
+    else all its concrete fields.
+    """
+    if hasattr(queryset.model, 'get_csv_rows'):
+        return queryset.model.get_csv_rows(queryset)
+
+    field_names = [field.attname for field in queryset.model._meta.concrete_fields]  # pylint: disable=protected-access
+    return field_names, queryset.values_list(*field_names).iterator()
+
+
+def write_csv_to_s3(header, rows, is_owner, filename):
+    """
+    Writes the rows straight into a zipped filename.csv in a temp dir of its own (no chdir, so safe in threaded
+    workers) and uploads it to the downloads path.
+    """
+    key = get_downloads_path(is_owner) + filename + '.csv.zip'
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        zip_file_path = os.path.join(tmp_dir, filename + '.csv.zip')
+        with zipfile.ZipFile(zip_file_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            with io.TextIOWrapper(
+                    zip_file.open(filename + '.csv', 'w', force_zip64=True), encoding='utf-8', newline=''
+            ) as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(header)
+                writer.writerows(rows)
+
+        S3.upload_file(key=key, file_path=zip_file_path, binary=True)
+
     return S3.url_for(key)
 
 
+def get_csv_export_query(queryset):
+    """
+    Json serializable description of the queryset to export: its model, the SQL (and params) selecting its rows' ids
+    (slicing included) and its explicit ordering, to rebuild it in the export task with get_csv_export_queryset.
+    """
+    sql, params = queryset.values('id').query.sql_with_params()
+    return dict(
+        model=queryset.model._meta.label,  # pylint: disable=protected-access
+        sql=sql,
+        params=json.loads(json.dumps(params, cls=encoders.JSONEncoder)),
+        ordering=[field for field in queryset.query.order_by if isinstance(field, str)]
+    )
+
+
+def get_csv_export_queryset(query):
+    queryset = apps.get_model(query['model']).objects.filter(id__in=RawSQL(query['sql'], query['params']))
+    return queryset.order_by(*query['ordering']) if query['ordering'] else queryset
+
+
+def queue_csv_export(queryset, filename, is_owner):
+    """
+    Queues the CSV export of the queryset's rows (described by get_csv_export_query, the task runs the query), unless
+    the same file is already being exported, and returns the export job status (task, state and url once done).
+    """
+    service = RedisService()
+    export_key = CSV_EXPORT_KEY.format(get_downloads_path(is_owner) + filename)
+    task_id = str(uuid.uuid4())
+    if not service.set_nx(export_key, task_id, settings.CSV_EXPORT_STATUS_TIMEOUT):
+        task_id = service.get_formatted(export_key)
+        return service.get_formatted(CSV_EXPORT_TASK_KEY.format(task_id)) or dict(
+            task=task_id, state='PENDING', url=None)
+
+    status = dict(task=task_id, state='PENDING', url=None)
+    service.set_json(CSV_EXPORT_TASK_KEY.format(task_id), status, settings.CSV_EXPORT_STATUS_TIMEOUT)
+
+    from core.common.tasks import export_csv
+    export_csv.apply_async((get_csv_export_query(queryset), filename, is_owner), task_id=task_id)
+
+    return status
+
+
 def compact_dict_by_values(_dict):
     copied_dict = _dict.copy()
     for key, value in copied_dict.copy().items():
@@ -69,38 +136,39 @@ def get_csv_from_s3(filename, is_owner):  # pragma: no cover
     return None
 
 
+def get_url_kwargs(resource):
+    """
+    URL kwargs of resource and its parents. Only reads the mnemonic/version attributes of the (already loaded) parent
+    chain: a head or latest version lookup would only contribute the mnemonic every version already has.
+    """
+    if not hasattr(resource, 'get_url_kwarg'):
+        return None
+
+    if resource.is_versioned and not resource.is_head:
+        kwargs = {resource.get_resource_url_kwarg(): resource.mnemonic, resource.get_url_kwarg(): resource.version}
+    else:
+        kwargs = {resource.get_url_kwarg(): resource.mnemonic}
+
+    parent = resource.parent if hasattr(resource, 'parent') else None
+    if parent is not None:
+        parent_kwargs = get_url_kwargs(parent)
+        if parent_kwargs is None:
+            return None
+        kwargs = {**parent_kwargs, **kwargs}
+
+    return kwargs
+
+
 def reverse_resource(resource, viewname, args=None, kwargs=None, **extra):
     """
     Generate the URL for the view specified as viewname of the object specified as resource.
     """
-    kwargs = kwargs or {}
-    parent = resource
-    while parent is not None:
-        if not hasattr(parent, 'get_url_kwarg'):
-            return NoReverseMatch('Cannot get URL kwarg for %s' % resource)  # pragma: no cover
-
-        if parent.is_versioned and not parent.is_head:
-            from core.collections.models import Collection
-            from core.sources.models import Source
-            if isinstance(parent, (Source, Collection)):
-                head = parent.get_latest_version()
-            else:
-                head = parent.head
-
-            if head:
-                kwargs.update({head.get_url_kwarg(): head.mnemonic})
-
-            kwargs.update({parent.get_url_kwarg(): parent.version})
-            parent_resource_url_kwarg = parent.get_resource_url_kwarg()
-            if parent_resource_url_kwarg not in kwargs:
-                kwargs.update({parent_resource_url_kwarg: parent.mnemonic})
-        else:
-            kwargs.update({parent.get_url_kwarg(): parent.mnemonic})
-        parent = parent.parent if hasattr(parent, 'parent') else None
-        allowed_kwargs = get_kwargs_for_view(viewname)
-        for key in kwargs.copy():
-            if key not in allowed_kwargs:
-                kwargs.pop(key)
+    resource_kwargs = get_url_kwargs(resource)
+    if resource_kwargs is None:
+        return NoReverseMatch('Cannot get URL kwarg for %s' % resource)  # pragma: no cover
+
+    allowed_kwargs = get_kwargs_for_view(viewname)
+    kwargs = {key: value for key, value in {**resource_kwargs, **(kwargs or {})}.items() if key in allowed_kwargs}
 
     return reverse(viewname=viewname, args=args, kwargs=kwargs, **extra)
 
@@ -111,30 +179,14 @@ def reverse_resource_version(resource, viewname, args=None, kwargs=None, **extra
     versioned by the object specified as resource.
     Assumes that resource extends ResourceVersionMixin, and therefore has a versioned_object attribute.
     """
-    from core.collections.models import Collection
-    from core.sources.models import Source
-    if isinstance(resource, (Source, Collection)):
-        head = resource.get_latest_version()
-    else:
-        head = resource.head
-
-    kwargs = kwargs or {}
-    if head:
-        kwargs.update({head.get_url_kwarg(): head.mnemonic})
-
-    kwargs.update({resource.get_url_kwarg(): resource.version})
-    resource_url_kwarg = resource.get_resource_url_kwarg()
-
-    if resource_url_kwarg not in kwargs:
-        kwargs[resource_url_kwarg] = resource.mnemonic
-
     return reverse_resource(resource, viewname, args, kwargs, **extra)
 
 
+@lru_cache(maxsize=None)
 def get_kwargs_for_view(view_name):
     resolver = get_resolver()
     patterns = resolver.reverse_dict.getlist(view_name)
-    return list(set(flatten([p[0][0][1] for p in patterns])))
+    return frozenset(flatten([p[0][0][1] for p in patterns]))
 
 
 def parse_updated_since_param(params):
@@ -150,6 +202,33 @@ def parse_updated_since(updated_since):  # pragma: no cover
     return None
 
 
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    if cursor:
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode() + b'=' * (-len(cursor) % 4)))
+            if isinstance(values, list):
+                return values
+        except (ValueError, TypeError):
+            pass
+    return None
+
+
+def get_estimated_count(queryset):
+    """
+    Number of rows the postgres planner estimates (from table statistics, without running the query) for the queryset.
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connections[queryset.db].cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+
+    return int(get(plan, '0.Plan.Plan Rows') or 0)
+
+
 def parse_boolean_query_param(request, param, default=None):
     val = request.query_params.get(param, default)
     if val is None:
@@ -278,10 +357,10 @@ def write_export_file(
             end = min(start + batch_size, total_mappings)
             logger.info('Serializing mappings %d - %d...' % (start+1, end))
             mappings = mappings_qs.order_by('-id').select_related(
-                'parent__organization', 'parent__user', 'from_concept', 'to_concept',
+                'parent__organization', 'parent__user', 'from_concept__parent', 'to_concept__parent',
                 'from_source__organization', 'from_source__user',
                 'to_source__organization', 'to_source__user',
-            )[start:end]
+            ).prefetch_related('from_concept__names', 'to_concept__names')[start:end]
             reference_serializer = mapping_serializer_class(mappings, many=True)
             reference_data = reference_serializer.data
             reference_string = json.dumps(reference_data, cls=encoders.JSONEncoder)
@@ -1,25 +1,36 @@
 import base64
+import hashlib
+import json
 from email.mime.image import MIMEImage
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.mail import EmailMessage
 from django.http import Http404
+from django.db.models import Case, When
 from django.shortcuts import get_object_or_404
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
 from elasticsearch_dsl import Q
 from pydash import get
+from redis.exceptions import RedisError
 from rest_framework import response, generics, status
 from rest_framework.generics import ListAPIView, RetrieveUpdateDestroyAPIView
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from core.common.constants import SEARCH_PARAM, LIST_DEFAULT_LIMIT, CSV_DEFAULT_LIMIT, \
-    LIMIT_PARAM, NOT_FOUND, MUST_SPECIFY_EXTRA_PARAM_IN_BODY, INCLUDE_RETIRED_PARAM, VERBOSE_PARAM, HEAD, LATEST
+    LIMIT_PARAM, NOT_FOUND, MUST_SPECIFY_EXTRA_PARAM_IN_BODY, INCLUDE_RETIRED_PARAM, VERBOSE_PARAM, HEAD, LATEST, \
+    SEARCH_HYDRATION_BYPASS_PARAMS, SEARCH_CURSOR_PARAM, SEARCH_CACHE_KEY, SEARCH_CACHE_VERSION_KEY, \
+    CSV_EXPORT_TASK_KEY, PROFILE_KEY
 from core.common.mixins import PathWalkerMixin
+from core.common.profiling import is_profiling, profiled, get_profile_stats
+from core.common.search import get_search_criterion
+from core.common.services import RedisService
 from core.common.serializers import RootSerializer
-from core.common.utils import compact_dict_by_values, to_snake_case, to_camel_case, parse_updated_since_param
+from core.common.utils import compact_dict_by_values, to_snake_case, to_camel_case, parse_updated_since_param, \
+    encode_cursor, decode_cursor
 from core.concepts.permissions import CanViewParentDictionary, CanEditParentDictionary
 from core.orgs.constants import ORG_OBJECT_TYPE
 from core.users.constants import USER_OBJECT_TYPE
@@ -43,6 +54,12 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
     exact_match = 'exact_match'
     facet_class = None
     total_count = 0
+    search_hydration_serializer_class = None
+    is_search_results_hydrated = False
+    search_facets = None
+    search_cursor_tiebreaker = None
+    is_cursor_paginated = False
+    cursor_next = None
 
     def _should_exclude_retired_from_search_results(self):
         if self.is_owner_document_model():
@@ -70,6 +87,13 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
 
         self.limit = request.query_params.dict().get(LIMIT_PARAM, LIST_DEFAULT_LIMIT)
 
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if is_profiling():
+            serializer.to_representation = profiled('serializer')(serializer.to_representation)
+
+        return serializer
+
     def get_object(self, queryset=None):  # pylint: disable=arguments-differ
         # Determine the base queryset to use.
         if queryset is None:
@@ -148,9 +172,6 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
 
         return search_str
 
-    def get_wildcard_search_string(self):
-        return "*{}*".format(self.get_search_string())
-
     def get_sort_attr(self):
         sort_field, desc = self.get_sort_and_desc()
         if sort_field and sort_field.lower() in ['score', '_score', 'best match']:
@@ -183,23 +204,15 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
 
         return criterion
 
-    def get_faceted_criterion(self):
+    def get_faceted_criterion(self, exclude=None):
         filters = self.get_faceted_filters()
+        filters.pop(exclude, None)
 
         def get_query(attr, val):
             not_query = val.startswith('!')
-            vals = val.replace('!', '', 1).split(',')
-            query = Q('match', **{attr: vals.pop().strip('\"').strip('\'')})
-            criteria = ~query if not_query else query  # pylint: disable=invalid-unary-operand-type
-
-            for _val in vals:
-                query = Q('match', **{attr: _val.strip('\"').strip('\'')})
-                if not_query:
-                    criteria &= ~query  # pylint: disable=invalid-unary-operand-type
-                else:
-                    criteria |= query
-
-            return criteria
+            vals = [_val.strip('\"').strip('\'') for _val in val.replace('!', '', 1).split(',')]
+            query = Q('terms', **{attr: vals})
+            return ~query if not_query else query  # pylint: disable=invalid-unary-operand-type
 
         if filters:
             first_filter = filters.popitem()
@@ -209,6 +222,35 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
 
             return criterion
 
+        return None
+
+    def should_aggregate_facets(self):
+        return self.should_include_facets() and bool(self.facet_class) and not self.is_user_document()
+
+    def aggregate_facets(self, search):
+        """
+        Adds a terms aggregation per facet of facet_class to search, so that facets come with the hits in one request.
+        Like FacetedSearch, facet selections are applied as post_filter (see __search_results) and each facet is
+        aggregated with all selections but its own, with the same semantics as get_faceted_criterion.
+        """
+        for name, facet in self.facet_class.facets.items():
+            criterion = self.get_faceted_criterion(exclude=get(facet, '_params.field')) or Q('match_all')
+            search.aggs.bucket('_filter_' + name, 'filter', filter=criterion).bucket(name, facet.get_aggregation())
+
+        return search
+
+    def get_facets_from_response(self, search_response):
+        faceted_filters = self.get_faceted_filters(True)
+        facets = dict()
+        for name, facet in self.facet_class.facets.items():
+            selected_values = [
+                value for value in faceted_filters.get(get(facet, '_params.field'), []) if not value.startswith('!')
+            ]
+            facets[name] = facet.get_values(
+                search_response.aggregations['_filter_' + name][name], selected_values)
+
+        return facets
+
     def get_faceted_filters(self, split=False):
         faceted_filters = dict()
         faceted_fields = self.get_faceted_fields()
@@ -291,6 +333,8 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
         if self.should_include_facets() and self.facet_class:
             if self.is_user_document():
                 return facets
+            if self.search_facets is not None:
+                return self.search_facets
             is_source_child_document_model = self.is_source_child_document_model()
             default_filters = self.default_filters.copy()
 
@@ -364,16 +408,16 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
         return self.document_model in [SourceDocument, CollectionDocument]
 
     def get_public_criteria(self):
-        criteria = Q('match', public_can_view=True)
+        criteria = Q('term', public_can_view=True)
         user = self.request.user
 
         if user.is_authenticated:
             username = user.username
             from core.orgs.documents import OrganizationDocument
             if self.document_model in [OrganizationDocument]:
-                criteria |= (Q('match', public_can_view=False) & Q('match', user=username))
+                criteria |= (Q('term', public_can_view=False) & Q('term', user=username))
             if self.is_concept_container_document_model():
-                criteria |= (Q('match', public_can_view=False) & Q('match', created_by=username))
+                criteria |= (Q('term', public_can_view=False) & Q('term', created_by=username))
 
         return criteria
 
@@ -385,7 +429,7 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
         return (not collection or collection.startswith('!')) and (not version or version.startswith('!'))
 
     @property
-    def __search_results(self):  # pylint: disable=too-many-branches,too-many-locals
+    def __search_results(self):  # pylint: disable=too-many-branches,too-many-locals,too-many-statements
         results = None
 
         if self.should_perform_es_search():
@@ -395,7 +439,7 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
                 default_filters['is_latest_version'] = True
 
             for field, value in default_filters.items():
-                results = results.query("match", **{field: value})
+                results = results.filter('term', **{field: value})
 
             faceted_criterion = self.get_faceted_criterion()
             extras_fields = self.get_extras_searchable_fields_from_query_params()
@@ -403,16 +447,19 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
             extras_fields_exists = self.get_extras_fields_exists_from_query_params()
 
             if faceted_criterion:
-                results = results.query(faceted_criterion)
+                if self.should_aggregate_facets():
+                    results = results.post_filter(faceted_criterion)
+                else:
+                    results = results.filter(faceted_criterion)
 
             if self.is_exact_match_on():
                 results = results.query(self.get_exact_search_criterion())
             else:
-                results = results.query(self.get_wildcard_search_criterion())
+                results = results.query(self.get_search_criterion())
 
             updated_since = parse_updated_since_param(self.request.query_params)
             if updated_since:
-                results = results.query('range', last_update={"gte": updated_since})
+                results = results.filter('range', last_update={"gte": updated_since})
 
             if extras_fields:
                 for field, value in extras_fields.items():
@@ -421,15 +468,15 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
                     )
             if extras_fields_exists:
                 for field in extras_fields_exists:
-                    results = results.query(
+                    results = results.filter(
                         "exists", field="extras.{}".format(field)
                     )
             if extras_fields_exact:
                 for field, value in extras_fields_exact.items():
-                    results = results.query("match", **{field: value}, _expand__to_dot=False)
+                    results = results.filter("match", **{field: value}, _expand__to_dot=False)
 
             if self._should_exclude_retired_from_search_results():
-                results = results.query('match', retired=False)
+                results = results.filter('term', retired=False)
 
             user = self.request.user
             is_authenticated = user.is_authenticated
@@ -437,7 +484,7 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
 
             include_private = self._should_include_private()
             if not include_private:
-                results = results.query(self.get_public_criteria())
+                results = results.filter(self.get_public_criteria())
 
             if self.is_owner_document_model():
                 kwargs_filters = self.kwargs.copy()
@@ -451,7 +498,7 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
                     kwargs_filters['owner'] = username
 
             for key, value in kwargs_filters.items():
-                results = results.query('match', **{to_snake_case(key): value})
+                results = results.filter('term', **{to_snake_case(key): value})
 
             sort_field = self.get_sort_attr()
             if sort_field:
@@ -459,38 +506,141 @@ class BaseAPIView(generics.GenericAPIView, PathWalkerMixin):
 
         return results
 
-    def get_wildcard_search_criterion(self):
-        search_string = self.get_search_string()
-        wildcard_search_string = self.get_wildcard_search_string()
-        name_attr = 'name'
-        if self.is_concept_document():
-            name_attr = '_name'
-
-        return Q(
-            "wildcard", id=dict(value=search_string, boost=2)
-        ) | Q(
-            "wildcard", **{name_attr: dict(value=search_string, boost=5)}
-        ) | Q(
-            "query_string", query=wildcard_search_string
-        )
+    def get_search_criterion(self):
+        return get_search_criterion(self.get_search_string(), get(self, 'es_fields') or dict())
 
     def get_search_results_qs(self):
         if not self.should_perform_es_search():
             return None
 
-        search_results = self.__search_results
-        self.total_count = search_results.count()
-
         if isinstance(self.limit, str):
             self.limit = int(self.limit)
 
         self.limit = self.limit or LIST_DEFAULT_LIMIT
+        self.is_cursor_paginated = self.should_paginate_search_by_cursor()
+
+        cache_key = self.get_search_cache_key()
+        search_result = cache.get(cache_key) if cache_key else None
+        if search_result is None:
+            search_result = self.__execute_search()
+            if cache_key:
+                cache.set(cache_key, search_result, settings.SEARCH_CACHE_TIMEOUT)
+
+        self.total_count = search_result['total_count']
+        self.search_facets = search_result['facets']
+        self.cursor_next = search_result['next_cursor']
+        if search_result['hydrated_results'] is not None:
+            self.is_search_results_hydrated = True
+            return self.document_model.resolve_list_data(search_result['ids'], search_result['hydrated_results'])
+
+        ids = search_result['ids']
+        model = self.document_model.django.model
+        queryset = model.objects.filter(id__in=ids).select_related(
+            *model.list_select_related).prefetch_related(*model.list_prefetch_related)
+        return queryset.order_by(Case(*[When(id=_id, then=position) for position, _id in enumerate(ids)]))
+
+    def __execute_search(self):
+        should_track_total_hits = True
+        if self.is_cursor_paginated:
+            search_results = self.__search_results.sort(
+                self.get_sort_attr(), self.search_cursor_tiebreaker).extra(size=self.limit)
+            search_after = decode_cursor(self.request.query_params.get(SEARCH_CURSOR_PARAM))
+            if search_after:
+                should_track_total_hits = False
+                search_results = search_results.extra(search_after=search_after)
+        else:
+            page = int(self.request.GET.get('page', '1'))
+            start = (page - 1) * self.limit
+            end = start + self.limit
+            search_results = self.__search_results[start:end]
+
+        search_results = search_results.extra(track_total_hits=should_track_total_hits)
+        should_hydrate = self.should_hydrate_search_results()
+        search_results = search_results.source(['list_data'] if should_hydrate else dict(excludes=['*']))
+        should_aggregate_facets = self.should_aggregate_facets()
+        if should_aggregate_facets:
+            search_results = self.aggregate_facets(search_results)
+        search_response = search_results.execute()
+        hits = search_response.to_dict()['hits']['hits']
+        search_result = dict(
+            total_count=search_response.hits.total.value if should_track_total_hits else None,
+            facets=self.get_facets_from_response(search_response) if should_aggregate_facets else None,
+            next_cursor=None, hydrated_results=None, ids=[hit['_id'] for hit in hits]
+        )
+        if self.is_cursor_paginated and len(hits) == self.limit:
+            search_result['next_cursor'] = encode_cursor(hits[-1]['sort'])
+
+        if should_hydrate:
+            results = [get(hit, '_source.list_data') for hit in hits]
+            if results and all(results):
+                search_result['hydrated_results'] = results
+
+        return search_result
+
+    def should_cache_search_results(self):
+        return bool(get(settings, 'SEARCH_CACHE_TIMEOUT')) and self.request.method == 'GET' and \
+            self.request.user.is_anonymous
+
+    def get_search_cache_key(self):
+        """
+        Anonymous searches are cached by view, kwargs, normalised query params and access scope, plus the search cache
+        version of the repository in kwargs, which is bumped whenever the repository or its children change.
+        """
+        if not self.should_cache_search_results():
+            return None
+
+        try:
+            version = self.get_search_cache_repository_version()
+        except RedisError:  # the cache is only an optimisation, search uncached while Redis is unavailable
+            return None
+
+        query_params = self.request.query_params
+        key = json.dumps(
+            dict(
+                view=self.__class__.__name__,
+                kwargs=self.kwargs,
+                params={param: [value.strip() for value in query_params.getlist(param)] for param in query_params},
+                facets=self.should_include_facets(),
+                private=self._should_include_private(),
+                version=version,
+            ),
+            sort_keys=True
+        )
+        return SEARCH_CACHE_KEY.format(hashlib.md5(key.encode('utf-8')).hexdigest())
+
+    def get_search_cache_repository_version(self):
+        owner_uri = None
+        if 'org' in self.kwargs:
+            owner_uri = '/orgs/{}/'.format(self.kwargs['org'])
+        elif 'user' in self.kwargs:
+            owner_uri = '/users/{}/'.format(self.kwargs['user'])
+
+        for resource in ['source', 'collection']:
+            if owner_uri and resource in self.kwargs:
+                repository_uri = '{}{}s/{}/'.format(owner_uri, resource, self.kwargs[resource])
+                return RedisService().get_formatted(SEARCH_CACHE_VERSION_KEY.format(repository_uri))
+
+        return None
 
-        page = int(self.request.GET.get('page', '1'))
-        start = (page - 1) * self.limit
-        end = start + self.limit
+    def should_paginate_search_by_cursor(self):
+        """
+        With the cursor param, search results are paged with search_after on the sort values of the previous page's
+        last hit (search_cursor_tiebreaker making the order total), so that deep pages cost the same as the first one.
+        """
+        return bool(self.search_cursor_tiebreaker) and SEARCH_CURSOR_PARAM in self.request.query_params
+
+    def should_hydrate_search_results(self):
+        """
+        Search results can be rendered straight from the list serializer data stored in the ES documents (list_data),
+        unless the request asks for a representation other than the stored one.
+        """
+        if not self.search_hydration_serializer_class or self.request.method != 'GET':
+            return False
 
-        return search_results[start:end].to_queryset()
+        query_params = self.request.query_params
+        return self.get_serializer_class() is self.search_hydration_serializer_class and not any(
+            param in query_params for param in SEARCH_HYDRATION_BYPASS_PARAMS
+        )
 
     def is_head(self):
         return self.request.method.lower() == 'head'
@@ -649,6 +799,42 @@ class BaseLogoView:
         return Response(self.get_serializer_class()(obj).data, status=status.HTTP_200_OK)
 
 
+class CSVExportStatusView(APIView):
+    permission_classes = (AllowAny, )
+
+    @staticmethod
+    def get(_, task_id):
+        export_status = RedisService().get_formatted(CSV_EXPORT_TASK_KEY.format(task_id))
+        if not export_status:
+            return Response(dict(detail=NOT_FOUND), status=status.HTTP_404_NOT_FOUND)
+
+        return Response(export_status)
+
+
+class ProfilingView(APIView):
+    """Per view percentiles of the latest request profiles recorded with PROFILING_ENABLED"""
+    permission_classes = (IsAdminUser, )
+
+    @staticmethod
+    def get(_):
+        redis_service = RedisService()
+        prefix = PROFILE_KEY.format('')
+        stats = dict()
+        for key in redis_service.scan_keys(PROFILE_KEY.format('*')):
+            key = key.decode() if isinstance(key, bytes) else key
+            stats[key[len(prefix):]] = get_profile_stats(redis_service.get_list_formatted(key))
+
+        return Response(dict(sorted(stats.items())))
+
+    @staticmethod
+    def delete(_):
+        redis_service = RedisService()
+        for key in redis_service.scan_keys(PROFILE_KEY.format('*')):
+            redis_service.delete(key)
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class FeedbackView(APIView):  # pragma: no cover
     permission_classes = (AllowAny, )
 
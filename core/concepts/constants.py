@@ -32,3 +32,4 @@ PERSIST_CLONE_SPECIFY_USER_ERROR = "Must specify which user is attempting to cre
 PERSIST_CLONE_ERROR = 'An error occurred while saving new concept version.'
 COULD_NOT_FIND_CONCEPT_TO_UPDATE = 'Could not find concept to update'
 PARENT_VERSION_NOT_LATEST_CANNOT_UPDATE_CONCEPT = 'Parent version is not the latest. Cannot update concept.'
+PAGE_MAPPINGS_BATCH_SIZE = 1000  # concepts whose mappings are fetched together when listing with mappings
@@ -1,6 +1,8 @@
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
+from pydash import get
 
+from core.common.search import autocomplete_fields
 from core.common.utils import jsonify_safe, flatten_dict
 from core.concepts.models import Concept
 
@@ -11,8 +13,11 @@ class ConceptDocument(Document):
         name = 'concepts'
         settings = {'number_of_shards': 1, 'number_of_replicas': 0}
 
-    id = fields.KeywordField(attr='mnemonic', normalizer="lowercase")
-    name = fields.TextField()
+    list_data_resolved_fields = ('display_name', 'display_locale')
+
+    id = fields.KeywordField(attr='mnemonic', normalizer="lowercase", fields=autocomplete_fields())
+    db_id = fields.LongField(attr='id')
+    name = fields.TextField(fields=autocomplete_fields(keyword=False))
     _name = fields.KeywordField(attr='display_name', normalizer='lowercase')
     last_update = fields.DateField(attr='updated_at')
     locale = fields.ListField(fields.KeywordField())
@@ -30,6 +35,7 @@ class ConceptDocument(Document):
     is_active = fields.KeywordField(attr='is_active')
     is_latest_version = fields.KeywordField(attr='is_latest_version')
     extras = fields.ObjectField(dynamic=True)
+    list_data = fields.ObjectField(enabled=False)
 
     class Django:
         model = Concept
@@ -38,6 +44,10 @@ class ConceptDocument(Document):
             'external_id',
         ]
 
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            *Concept.list_select_related).prefetch_related(*Concept.list_prefetch_related)
+
     @staticmethod
     def prepare_name(instance):
         name = instance.display_name
@@ -47,9 +57,7 @@ class ConceptDocument(Document):
 
     @staticmethod
     def prepare_locale(instance):
-        return list(
-            instance.names.filter(locale__isnull=False).distinct('locale').values_list('locale', flat=True)
-        )
+        return sorted({name.locale for name in instance.names.all() if name.locale is not None})
 
     @staticmethod
     def prepare_source_version(instance):
@@ -77,3 +85,26 @@ class ConceptDocument(Document):
                 value = flatten_dict(value)
 
         return value or {}
+
+    @classmethod
+    def prepare_list_data(cls, instance):  # stored (not indexed) representation used to render search results
+        from core.concepts.serializers import ConceptListSerializer
+        data = ConceptListSerializer(instance).data
+        return {field: value for field, value in data.items() if field not in cls.list_data_resolved_fields}
+
+    @staticmethod
+    def resolve_list_data(ids, results):
+        """
+        Adds the list_data fields depending on the names and the parent's locales (not stored, so that renames and
+        locale changes never serve stale names) to the hydrated results of the concepts with ids.
+        """
+        concepts = {
+            str(concept.id): concept for concept in Concept.objects.filter(
+                id__in=ids).select_related('parent').prefetch_related('names')
+        }
+        return [
+            dict(
+                result, display_name=get(concepts, [_id, 'display_name']),
+                display_locale=get(concepts, [_id, 'display_locale'])
+            ) for _id, result in zip(ids, results)
+        ]
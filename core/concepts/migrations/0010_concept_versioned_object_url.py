@@ -0,0 +1,18 @@
+# Generated by Django 3.1.8 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('concepts', '0009_auto_20210414_1020_squashed_0012_auto_20210414_1031'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='concept',
+            name='_versioned_object_url',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models, IntegrityError, transaction
@@ -136,9 +138,12 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
     WAS_RETIRED = CONCEPT_WAS_RETIRED
     WAS_UNRETIRED = CONCEPT_WAS_UNRETIRED
 
+    list_select_related = ('parent__organization', 'parent__user', 'created_by')
+    list_prefetch_related = ('names',)
+
     es_fields = {
-        'id': {'sortable': True, 'filterable': True, 'exact': True},
-        'name': {'sortable': False, 'filterable': True, 'exact': True},
+        'id': {'sortable': True, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 2},
+        'name': {'sortable': False, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 5},
         '_name': {'sortable': True, 'filterable': False, 'exact': False},
         'last_update': {'sortable': True, 'filterable': False, 'default': 'desc'},
         'is_latest_version': {'sortable': False, 'filterable': True},
@@ -176,69 +181,23 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
 
     @property
     def preferred_locale(self):
-        return self.__get_parent_default_locale_name() or self.__get_parent_supported_locale_name() or \
-               self.__get_system_default_locale() or self.__get_preferred_locale() or self.__get_last_created_locale()
-
-    def __get_system_default_locale(self):
-        system_default_locale = settings.DEFAULT_LOCALE
-
-        return get(
-            self.__names_qs(dict(locale=system_default_locale, locale_preferred=True), 'created_at', 'desc'), '0'
-        ) or get(
-            self.__names_qs(dict(locale=system_default_locale), 'created_at', 'desc'), '0'
-        )
-
-    def __get_parent_default_locale_name(self):
-        parent_default_locale = self.parent.default_locale
-        return get(
-            self.__names_qs(dict(locale=parent_default_locale, locale_preferred=True), 'created_at', 'desc'), '0'
-        ) or get(
-            self.__names_qs(dict(locale=parent_default_locale), 'created_at', 'desc'), '0'
-        )
-
-    def __get_parent_supported_locale_name(self):
-        parent_supported_locales = self.parent.supported_locales
-        return get(
-            self.__names_qs(dict(locale__in=parent_supported_locales, locale_preferred=True), 'created_at', 'desc'), '0'
-        ) or get(
-            self.__names_qs(dict(locale__in=parent_supported_locales), 'created_at', 'desc'), '0'
-        )
-
-    def __get_last_created_locale(self):
-        return get(self.__names_qs(dict(), 'created_at', 'desc'), '0')
-
-    def __get_preferred_locale(self):
-        return get(
-            self.__names_qs(dict(locale_preferred=True), 'created_at', 'desc'), '0'
-        )
-
-    def __names_qs(self, filters, order_by=None, order='desc'):
-        if getattr(self, '_prefetched_objects_cache', None) and \
-           'names' in self._prefetched_objects_cache:  # pragma: no cover
-            return self.__names_from_prefetched_object_cache(filters, order_by, order)
-
-        return self.__names_from_db(filters, order_by, order)
-
-    def __names_from_db(self, filters, order_by=None, order='desc'):
-        names = self.names.filter(
-            **filters
-        )
-        if order_by:
-            if order:
-                order_by = '-' + order_by if order.lower() == 'desc' else order_by
-
-            names = names.order_by(order_by)
-
-        return names
-
-    def __names_from_prefetched_object_cache(self, filters, order_by=None, order='desc'):  # pragma: no cover
-        def is_eligible(name):
-            return all([get(name, key) == value for key, value in filters.items()])
+        """
+        The name to display: preferred (else latest created) name in the parent's default locale, else in one of the
+        parent's supported locales, else in the system default locale, else of any locale. Resolved in memory over
+        the prefetched names (one query otherwise).
+        """
+        names = sorted(self.names.all(), key=lambda name: name.created_at, reverse=True)
+        locale_groups = [
+            [get(self, 'parent.default_locale')], get(self, 'parent.supported_locales') or [],
+            [settings.DEFAULT_LOCALE], None
+        ]
+        for locales in locale_groups:
+            candidates = names if locales is None else [name for name in names if name.locale in locales]
+            name = next((name for name in candidates if name.locale_preferred), None) or get(candidates, '0')
+            if name:
+                return name
 
-        names = list(filter(is_eligible, self.names.all()))
-        if order_by:
-            names = sorted(names, key=lambda name: get(name, order_by), reverse=(order.lower() == 'desc'))
-        return names
+        return None
 
     @property
     def default_name_locales(self):
@@ -262,7 +221,7 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
 
     @property
     def iso_639_1_locale(self):
-        return get(self.__names_qs(dict(type=ISO_639_1)), '0.name')
+        return next((name.name for name in self.names.all() if name.type == ISO_639_1), None)
 
     @property
     def custom_validation_schema(self):
@@ -679,6 +638,75 @@ class Concept(ConceptValidationMixin, SourceChildMixin, VersionedModel):  # pyli
 
         return queryset.distinct()
 
+    @staticmethod
+    def get_related_version_ids(concepts):
+        """
+        {concept id: ids of the concept versions whose mappings are the concept's mappings}, i.e. the concept, its
+        latest version (for a versioned object) and its versioned object (for a latest version).
+        """
+        latest_version_ids = dict()
+        versioned_object_ids = [concept.id for concept in concepts if concept.is_versioned_object]
+        if versioned_object_ids:
+            for versioned_object_id, latest_version_id in Concept.objects.filter(
+                    versioned_object_id__in=versioned_object_ids, is_active=True, is_latest_version=True
+            ).exclude(id=F('versioned_object_id')).order_by(
+                'versioned_object_id', '-created_at'
+            ).values_list('versioned_object_id', 'id'):
+                latest_version_ids.setdefault(versioned_object_id, latest_version_id)
+
+        related_ids = dict()
+        for concept in concepts:
+            ids = {concept.id}
+            if concept.is_versioned_object and concept.id in latest_version_ids:
+                ids.add(latest_version_ids[concept.id])
+            if concept.is_latest_version and concept.versioned_object_id:
+                ids.add(concept.versioned_object_id)
+            related_ids[concept.id] = ids
+
+        return related_ids
+
+    @staticmethod
+    def get_mappings_by_concept(concepts, include_indirect=False):
+        """
+        Batched get_unidirectional_mappings (get_bidirectional_mappings with include_indirect) of many concepts, as
+        {concept id: mappings}. Runs two queries (plus the prefetches of the mappings' concept names) whatever the
+        number of concepts, instead of several per concept. Each mapping is listed once per concept; unlike the
+        distinct('updated_at') of get_unidirectional_mappings, mappings sharing an updated_at are all kept.
+        """
+        from core.mappings.models import Mapping
+        concepts = [concept for concept in concepts if concept.id]
+        if not concepts:
+            return dict()
+
+        related_ids = Concept.get_related_version_ids(concepts)
+        all_ids = set().union(*related_ids.values())
+        criteria = models.Q(from_concept_id__in=all_ids)
+        if include_indirect:
+            criteria |= models.Q(to_concept_id__in=all_ids)
+
+        mappings = Mapping.objects.filter(
+            criteria, parent_id__in={concept.parent_id for concept in concepts}, id=F('versioned_object_id')
+        ).select_related(
+            'updated_by', *Mapping.list_select_related
+        ).prefetch_related(*Mapping.list_prefetch_related).order_by('-updated_at', '-id')
+
+        concept_ids_by_related_id = defaultdict(set)
+        for concept_id, ids in related_ids.items():
+            for related_id in ids:
+                concept_ids_by_related_id[related_id].add(concept_id)
+
+        parent_ids = {concept.id: concept.parent_id for concept in concepts}
+        result = {concept.id: [] for concept in concepts}
+        for mapping in mappings:
+            concept_ids = set(concept_ids_by_related_id.get(mapping.from_concept_id, ()))
+            if include_indirect:
+                concept_ids |= concept_ids_by_related_id.get(mapping.to_concept_id, set())
+            for concept_id in concept_ids:
+                if parent_ids[concept_id] == mapping.parent_id:
+                    result[concept_id].append(mapping)
+
+        return result
+
     @staticmethod
     def get_latest_versions_for_queryset(concepts_qs):
         """Takes any concepts queryset and returns queryset of latest_version of each of those concepts"""
@@ -7,9 +7,7 @@ class CanAccessParentDictionary(BasePermission):
     parent_permission_class = None
 
     def has_object_permission(self, request, view, obj):
-        if hasattr(obj, 'versioned_object'):
-            obj = obj.versioned_object
-        parent = obj.parent
+        parent = obj.parent  # same for every version
         parent_view_perm = self.parent_permission_class()  # pylint: disable=not-callable
         return parent_view_perm.has_object_permission(request, view, parent)
 
@@ -1,10 +1,12 @@
+from django.db.models import Manager
 from pydash import get
 from rest_framework.fields import CharField, DateTimeField, BooleanField, URLField, JSONField, SerializerMethodField, \
     UUIDField, ListField
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import ModelSerializer, ListSerializer
 
 from core.common.constants import INCLUDE_INVERSE_MAPPINGS_PARAM, INCLUDE_MAPPINGS_PARAM, INCLUDE_EXTRAS_PARAM, \
     INCLUDE_PARENT_CONCEPTS, INCLUDE_CHILD_CONCEPTS
+from core.concepts.constants import PAGE_MAPPINGS_BATCH_SIZE
 from core.concepts.models import Concept, LocalizedText
 
 
@@ -97,7 +99,37 @@ class ConceptDescriptionSerializer(ConceptLabelSerializer):
         return ret
 
 
-class ConceptListSerializer(ModelSerializer):
+class ConceptPageMappingsMixin:
+    mappings_by_concept = None
+    page_concepts = None
+    page_positions = None
+
+    def get_page_mappings(self, obj, include_indirect):
+        """
+        Mappings of obj, fetched in one go for the next PAGE_MAPPINGS_BATCH_SIZE concepts of the list being
+        serialized (from obj on), so that unpaginated (compressed) lists hold the mappings of one batch at a time.
+        """
+        if self.mappings_by_concept is None or obj.id not in self.mappings_by_concept:
+            self.mappings_by_concept = Concept.get_mappings_by_concept(self.get_batch_concepts(obj), include_indirect)
+
+        return self.mappings_by_concept[obj.id]
+
+    def get_batch_concepts(self, obj):
+        if not isinstance(self.parent, ListSerializer):
+            return [obj]
+        if self.page_concepts is None:
+            concepts = self.parent.instance  # already evaluated by the list serializer, unless a manager
+            self.page_concepts = list(concepts.all() if isinstance(concepts, Manager) else concepts)
+            self.page_positions = {concept.id: position for position, concept in enumerate(self.page_concepts)}
+
+        position = self.page_positions.get(obj.id)
+        if position is None:
+            return [obj]
+
+        return self.page_concepts[position:position + PAGE_MAPPINGS_BATCH_SIZE]
+
+
+class ConceptListSerializer(ConceptPageMappingsMixin, ModelSerializer):
     uuid = CharField(source='id', read_only=True)
     id = CharField(source='mnemonic')
     source = CharField(source='parent_resource')
@@ -140,10 +172,9 @@ class ConceptListSerializer(ModelSerializer):
     def get_mappings(self, obj):
         from core.mappings.serializers import MappingDetailSerializer
         context = get(self, 'context')
-        if self.include_direct_mappings:
-            return MappingDetailSerializer(obj.get_unidirectional_mappings(), many=True, context=context).data
-        if self.include_indirect_mappings:
-            return MappingDetailSerializer(obj.get_bidirectional_mappings(), many=True, context=context).data
+        if self.include_direct_mappings or self.include_indirect_mappings:
+            return MappingDetailSerializer(
+                self.get_page_mappings(obj, not self.include_direct_mappings), many=True, context=context).data
 
         return []
 
@@ -158,7 +189,7 @@ class ConceptVersionListSerializer(ConceptListSerializer):
         )
 
 
-class ConceptDetailSerializer(ModelSerializer):
+class ConceptDetailSerializer(ConceptPageMappingsMixin, ModelSerializer):
     uuid = CharField(source='id', read_only=True)
     version = CharField(read_only=True)
     type = CharField(source='versioned_resource_type', read_only=True)
@@ -220,10 +251,9 @@ class ConceptDetailSerializer(ModelSerializer):
     def get_mappings(self, obj):
         from core.mappings.serializers import MappingDetailSerializer
         context = get(self, 'context')
-        if self.include_indirect_mappings:
-            return MappingDetailSerializer(obj.get_bidirectional_mappings(), many=True, context=context).data
-        if self.include_direct_mappings:
-            return MappingDetailSerializer(obj.get_unidirectional_mappings(), many=True, context=context).data
+        if self.include_indirect_mappings or self.include_direct_mappings:
+            return MappingDetailSerializer(
+                self.get_page_mappings(obj, self.include_indirect_mappings), many=True, context=context).data
 
         return []
 
@@ -1,4 +1,6 @@
 import factory
+from django.http import QueryDict
+from mock import patch, Mock
 from pydash import omit
 
 from core.common.constants import CUSTOM_VALIDATION_SCHEMA_OPENMRS, HEAD, ACCESS_TYPE_EDIT, ACCESS_TYPE_VIEW
@@ -89,6 +91,27 @@ class ConceptTest(OCLTestCase):
         source.save()
         self.assertEqual(concept.display_name, 'MALARIA SMEAR, QUALITATIVE')
 
+    def test_display_name_and_locales_from_prefetched_names(self):
+        from core.concepts.documents import ConceptDocument
+        source = OrganizationSourceFactory(default_locale='fr', supported_locales=['fr', 'es'])
+        concept = ConceptFactory(
+            parent=source,
+            names=[
+                LocalizedTextFactory(locale_preferred=True, locale='en', name='Malaria'),
+                LocalizedTextFactory(locale_preferred=False, locale='es', name='Paludismo'),
+                LocalizedTextFactory(type='ISO 639-1', locale='en', name='ma'),
+            ]
+        )
+
+        concept = Concept.objects.filter(id=concept.id).select_related(
+            *Concept.list_select_related).prefetch_related(*Concept.list_prefetch_related).first()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(concept.display_name, 'Paludismo')
+            self.assertEqual(concept.display_locale, 'es')
+            self.assertEqual(concept.iso_639_1_locale, 'ma')
+            self.assertEqual(ConceptDocument.prepare_locale(concept), ['en', 'es'])
+
     def test_display_locale(self):
         preferred_locale = LocalizedTextFactory(locale_preferred=True)
         concept = ConceptFactory(names=(preferred_locale,))
@@ -681,6 +704,66 @@ class ConceptTest(OCLTestCase):
         mappings = concept4.get_indirect_mappings()
         self.assertEqual(mappings.count(), 0)
 
+    def test_get_mappings_by_concept(self):
+        source1 = OrganizationSourceFactory()
+        source2 = OrganizationSourceFactory()
+        concept1 = ConceptFactory(parent=source1)
+        concept2 = ConceptFactory(parent=source1)
+        concept3 = ConceptFactory(parent=source2)
+        concept4 = ConceptFactory(parent=source2)
+
+        mapping1 = MappingFactory(from_concept=concept1, to_concept=concept2, parent=source1)
+        mapping2 = MappingFactory(from_concept=concept1, to_concept=concept3, parent=source1)
+        mapping3 = MappingFactory(from_concept=concept1, to_concept=concept3, parent=source2)
+        mapping4 = MappingFactory(from_concept=concept4, to_concept=concept1, parent=source1)
+        mapping5 = MappingFactory(from_concept=concept4, to_concept=concept1, parent=source2)
+        MappingFactory(from_concept=concept1, to_concept=concept2, parent=source2)
+        concepts = [concept1, concept2, concept3, concept4]
+
+        with self.assertNumQueries(4):
+            mappings = Concept.get_mappings_by_concept(concepts)
+        self.assertEqual(
+            mappings, {concept1.id: [mapping2, mapping1], concept2.id: [], concept3.id: [], concept4.id: [mapping5]})
+        for concept in concepts:
+            self.assertEqual(mappings[concept.id], list(concept.get_unidirectional_mappings()))
+
+        with self.assertNumQueries(4):
+            mappings = Concept.get_mappings_by_concept(concepts, True)
+        self.assertEqual(
+            mappings,
+            {
+                concept1.id: [mapping4, mapping2, mapping1], concept2.id: [mapping1], concept3.id: [mapping3],
+                concept4.id: [mapping5]
+            }
+        )
+        for concept in concepts:
+            self.assertEqual(mappings[concept.id], list(concept.get_bidirectional_mappings()))
+
+        self.assertEqual(Concept.get_mappings_by_concept([]), dict())
+
+    @patch('core.concepts.serializers.PAGE_MAPPINGS_BATCH_SIZE', 2)
+    def test_list_serializer_fetches_mappings_in_batches(self):
+        from core.concepts.serializers import ConceptListSerializer
+        source = OrganizationSourceFactory()
+        concepts = [ConceptFactory(parent=source) for _ in range(3)]
+        mapping = MappingFactory(from_concept=concepts[2], to_concept=concepts[0], parent=source)
+        request = Mock(query_params=QueryDict('includeMappings=true'))
+
+        with patch.object(
+                Concept, 'get_mappings_by_concept', wraps=Concept.get_mappings_by_concept
+        ) as get_mappings_by_concept_mock:
+            data = ConceptListSerializer(
+                Concept.objects.filter(id__in=[concept.id for concept in concepts]).order_by('id'), many=True,
+                context=dict(request=request)
+            ).data
+
+        self.assertEqual(
+            [call_args[0] for call_args in get_mappings_by_concept_mock.call_args_list],
+            [(concepts[:2], False), (concepts[2:], False)]
+        )
+        self.assertEqual([len(concept['mappings']) for concept in data], [0, 0, 1])
+        self.assertEqual(data[2]['mappings'][0]['uuid'], str(mapping.id))
+
     def test_get_parent_and_owner_filters_from_uri(self):
         self.assertEqual(Concept.get_parent_and_owner_filters_from_uri(None), dict())
         self.assertEqual(Concept.get_parent_and_owner_filters_from_uri(''), dict())
@@ -701,6 +784,37 @@ class ConceptTest(OCLTestCase):
             dict(parent__mnemonic='bar', parent__organization__mnemonic='foo')
         )
 
+    def test_document_list_data(self):
+        from core.concepts.documents import ConceptDocument
+        from core.concepts.serializers import ConceptListSerializer
+        concept = ConceptFactory()
+
+        list_data = ConceptDocument.prepare_list_data(concept)
+
+        self.assertEqual(
+            list_data,
+            {
+                field: value for field, value in ConceptListSerializer(concept).data.items()
+                if field not in ['display_name', 'display_locale']
+            }
+        )
+        self.assertNotIn('extras', list_data)
+        self.assertEqual(list_data['mappings'], [])
+
+    def test_document_resolve_list_data(self):
+        from core.concepts.documents import ConceptDocument
+        concept = ConceptFactory(names=[LocalizedTextFactory(locale='fr', name='Foo')])
+        concept.parent.default_locale = 'fr'
+        concept.parent.save()
+
+        self.assertEqual(
+            ConceptDocument.resolve_list_data([str(concept.id), '0'], [dict(id='c1'), dict(id='c2')]),
+            [
+                dict(id='c1', display_name='Foo', display_locale='fr'),
+                dict(id='c2', display_name=None, display_locale=None),
+            ]
+        )
+
 
 class OpenMRSConceptValidatorTest(OCLTestCase):
     def setUp(self):
@@ -29,6 +29,7 @@ from core.concepts.serializers import (
     ConceptDetailSerializer, ConceptListSerializer, ConceptDescriptionSerializer, ConceptNameSerializer,
     ConceptVersionDetailSerializer,
     ConceptVersionListSerializer)
+from core.mappings.models import Mapping
 from core.mappings.serializers import MappingListSerializer
 
 
@@ -39,6 +40,9 @@ class ConceptBaseView(SourceChildCommonBaseView):
     document_model = ConceptDocument
     facet_class = ConceptSearch
     es_fields = Concept.es_fields
+    search_hydration_serializer_class = ConceptListSerializer
+    search_cursor_tiebreaker = 'db_id'
+    cursor_pagination_fields = ('updated_at', 'id')
     default_filters = dict(is_active=True)
 
     def get_detail_serializer(self, obj, data=None, files=None, partial=False):
@@ -93,9 +97,7 @@ class ConceptListView(ConceptBaseView, ListWithHeadersMixin, CreateModelMixin):
         if is_latest_version:
             queryset = queryset.filter(is_latest_version=True)
 
-        return queryset.select_related(
-            'parent__organization', 'parent__user', 'created_by'
-        ).prefetch_related('names')
+        return queryset.select_related(*Concept.list_select_related).prefetch_related(*Concept.list_prefetch_related)
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -225,7 +227,8 @@ class ConceptVersionsView(ConceptBaseView, ConceptDictionaryMixin, ListWithHeade
     permission_classes = (CanViewParentDictionary,)
 
     def get_queryset(self):
-        return super().get_queryset().exclude(id=F('versioned_object_id'))
+        return super().get_queryset().exclude(id=F('versioned_object_id')).select_related(
+            *Concept.list_select_related).prefetch_related(*Concept.list_prefetch_related)
 
     def get_serializer_class(self):
         return ConceptVersionDetailSerializer if self.is_verbose() else ConceptVersionListSerializer
@@ -250,7 +253,8 @@ class ConceptMappingsView(ConceptBaseView, ListWithHeadersMixin):
         if not include_retired:
             mappings_queryset = mappings_queryset.exclude(retired=True)
 
-        return mappings_queryset
+        return mappings_queryset.select_related(
+            *Mapping.list_select_related).prefetch_related(*Mapping.list_prefetch_related)
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
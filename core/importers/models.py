@@ -11,6 +11,7 @@ from pydash import compact, get
 
 from core.collections.models import Collection
 from core.common.constants import HEAD
+from core.common.models import IndexingSession
 from core.common.services import RedisService
 from core.common.tasks import bulk_import_parts_inline, delete_organization
 from core.common.utils import drop_version
@@ -573,58 +574,59 @@ class BulkImportInline(BaseImporter):
             print("****STARTED SUBPROCESS****")
             print("TASK ID: {}".format(self.self_task_id))
             print("***************")
-        for original_item in self.input_list:
-            self.processed += 1
-            logger.info('Processing %s of %s', str(self.processed), str(self.total))
-            self.notify_progress()
-            item = original_item.copy()
-            item_type = item.pop('type', '').lower()
-            action = item.pop('__action', '').lower()
-            if not item_type:
-                self.unknown.append(original_item)
-            if item_type == 'organization':
-                org_importer = OrganizationImporter(item, self.user, self.update_if_exists)
-                self.handle_item_import_result(
-                    org_importer.delete() if action == 'delete' else org_importer.run(), original_item
-                )
-                continue
-            if item_type == 'source':
-                source_importer = SourceImporter(item, self.user, self.update_if_exists)
-                self.handle_item_import_result(
-                    source_importer.delete() if action == 'delete' else source_importer.run(), original_item
-                )
-                continue
-            if item_type == 'source version':
-                self.handle_item_import_result(
-                    SourceVersionImporter(item, self.user, self.update_if_exists).run(), original_item
-                )
-                continue
-            if item_type == 'collection':
-                collection_importer = CollectionImporter(item, self.user, self.update_if_exists)
-                self.handle_item_import_result(
-                    collection_importer.delete() if action == 'delete' else collection_importer.run(), original_item
-                )
-                continue
-            if item_type == 'collection version':
-                self.handle_item_import_result(
-                    CollectionVersionImporter(item, self.user, self.update_if_exists).run(), original_item
-                )
-                continue
-            if item_type == 'concept':
-                self.handle_item_import_result(
-                    ConceptImporter(item, self.user, self.update_if_exists).run(), original_item
-                )
-                continue
-            if item_type == 'mapping':
-                self.handle_item_import_result(
-                    MappingImporter(item, self.user, self.update_if_exists).run(), original_item
-                )
-                continue
-            if item_type == 'reference':
-                self.handle_item_import_result(
-                    ReferenceImporter(item, self.user, self.update_if_exists).run(), original_item
-                )
-                continue
+        with IndexingSession():
+            for original_item in self.input_list:
+                self.processed += 1
+                logger.info('Processing %s of %s', str(self.processed), str(self.total))
+                self.notify_progress()
+                item = original_item.copy()
+                item_type = item.pop('type', '').lower()
+                action = item.pop('__action', '').lower()
+                if not item_type:
+                    self.unknown.append(original_item)
+                if item_type == 'organization':
+                    org_importer = OrganizationImporter(item, self.user, self.update_if_exists)
+                    self.handle_item_import_result(
+                        org_importer.delete() if action == 'delete' else org_importer.run(), original_item
+                    )
+                    continue
+                if item_type == 'source':
+                    source_importer = SourceImporter(item, self.user, self.update_if_exists)
+                    self.handle_item_import_result(
+                        source_importer.delete() if action == 'delete' else source_importer.run(), original_item
+                    )
+                    continue
+                if item_type == 'source version':
+                    self.handle_item_import_result(
+                        SourceVersionImporter(item, self.user, self.update_if_exists).run(), original_item
+                    )
+                    continue
+                if item_type == 'collection':
+                    collection_importer = CollectionImporter(item, self.user, self.update_if_exists)
+                    self.handle_item_import_result(
+                        collection_importer.delete() if action == 'delete' else collection_importer.run(), original_item
+                    )
+                    continue
+                if item_type == 'collection version':
+                    self.handle_item_import_result(
+                        CollectionVersionImporter(item, self.user, self.update_if_exists).run(), original_item
+                    )
+                    continue
+                if item_type == 'concept':
+                    self.handle_item_import_result(
+                        ConceptImporter(item, self.user, self.update_if_exists).run(), original_item
+                    )
+                    continue
+                if item_type == 'mapping':
+                    self.handle_item_import_result(
+                        MappingImporter(item, self.user, self.update_if_exists).run(), original_item
+                    )
+                    continue
+                if item_type == 'reference':
+                    self.handle_item_import_result(
+                        ReferenceImporter(item, self.user, self.update_if_exists).run(), original_item
+                    )
+                    continue
 
         self.elapsed_seconds = time.time() - self.start_time
 
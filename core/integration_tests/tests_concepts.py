@@ -1,8 +1,15 @@
-from mock import ANY
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from elasticsearch_dsl import Q
+from mock import ANY, MagicMock, patch
+from redis.exceptions import ConnectionError as RedisConnectionError
 
 from core.common.constants import CUSTOM_VALIDATION_SCHEMA_OPENMRS
 from core.common.tests import OCLAPITestCase
+from core.common.utils import encode_cursor
 from core.concepts.models import Concept
+from core.concepts.search import ConceptSearch
 from core.concepts.tests.factories import ConceptFactory, LocalizedTextFactory
 from core.mappings.tests.factories import MappingFactory
 from core.orgs.models import Organization
@@ -52,6 +59,83 @@ class ConceptCreateUpdateDestroyViewTest(OCLAPITestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(len(response.data), 1)
 
+    def test_get_200_with_cursor(self):
+        concepts = [ConceptFactory(parent=self.source) for _ in range(3)]
+        Concept.objects.filter(parent=self.source).update(updated_at=concepts[0].updated_at)
+        response = self.client.get(self.source.concepts_url)
+        expected_ids = sorted([int(concept['uuid']) for concept in response.data], reverse=True)
+        self.assertEqual(len(expected_ids), 3)
+
+        response = self.client.get(self.source.concepts_url + '?limit=2&page=2&cursor=')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([concept['uuid'] for concept in response.data], [str(id) for id in expected_ids[:2]])
+        self.assertEqual(response['num_returned'], '2')
+        self.assertFalse(response.has_header('num_found'))
+        self.assertTrue('cursor=' in response['next'])
+        self.assertFalse('page=' in response['next'])
+
+        response = self.client.get(response['next'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([concept['uuid'] for concept in response.data], [str(expected_ids[2])])
+        self.assertEqual(response['num_returned'], '1')
+        self.assertFalse(response.has_header('num_found'))
+        self.assertFalse(response.has_header('next'))
+
+    def test_get_400_with_invalid_cursor(self):
+        ConceptFactory(parent=self.source)
+
+        for values in [['garbage', 'x'], ['2021-01-01T00:00:00+00:00', 'x'], [{}, 1]]:
+            response = self.client.get(self.source.concepts_url + '?cursor=' + encode_cursor(values))
+
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.data, dict(detail='Invalid cursor.'))
+
+        response = self.client.get(
+            self.source.concepts_url + '?cursor=' + encode_cursor(['2021-01-01T00:00:00+00:00', 1]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+
+    @patch('core.common.mixins.get_estimated_count')
+    def test_get_200_with_estimated_count(self, get_estimated_count_mock):
+        ConceptFactory(parent=self.source)
+        get_estimated_count_mock.return_value = 10
+
+        response = self.client.get('/concepts/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['num_found'], str(len(response.data)))
+        self.assertFalse(response.has_header('num_found_estimated'))
+
+        get_estimated_count_mock.return_value = 20000
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/concepts/?limit=1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in context.captured_queries))
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response['num_found'], '20000')
+        self.assertEqual(response['num_found_estimated'], 'true')
+
+        response = self.client.head('/concepts/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['num_found'], '20000')
+        self.assertEqual(response['num_found_estimated'], 'true')
+
+        get_estimated_count_mock.reset_mock()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.source.concepts_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([query for query in context.captured_queries if 'COUNT(' in query['sql'].upper()]), 1)
+        self.assertEqual(response['num_found'], '1')
+        self.assertFalse(response.has_header('num_found_estimated'))
+        get_estimated_count_mock.assert_not_called()
+
     def test_post_201(self):
         concepts_url = "/orgs/{}/sources/{}/concepts/".format(self.organization.mnemonic, self.source.mnemonic)
 
@@ -919,3 +1003,199 @@ class ConceptMappingsViewTest(OCLAPITestCase):
             sorted([mapping['uuid'] for mapping in response.data]),
             sorted([str(direct_mapping.id), str(indirect_mapping.id)])
         )
+
+
+class ConceptSearchViewTest(OCLAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.concept = ConceptFactory(names=[LocalizedTextFactory(locale='en', name='Foo')])
+        self.hydrated_result = dict(id='from-index', display_name='Foo', display_locale='en')
+        self.search = MagicMock()
+        for method in ['query', 'filter', 'post_filter', 'sort', 'extra', 'source', '__getitem__']:
+            getattr(self.search, method).return_value = self.search
+        self.search.execute.return_value.hits.total.value = 1
+
+    @patch('core.concepts.documents.ConceptDocument.search')
+    def test_get_200_hydrated_from_index(self, search_mock):
+        search_mock.return_value = self.search
+        self.search.execute.return_value.to_dict.return_value = dict(
+            hits=dict(hits=[dict(_id=str(self.concept.id), _source=dict(list_data=dict(id='from-index')))])
+        )
+
+        response = self.client.get('/concepts/?q=foo')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [self.hydrated_result])
+        self.assertEqual(response['num_found'], '1')
+        self.search.extra.assert_called_once_with(track_total_hits=True)
+        self.search.source.assert_called_once_with(['list_data'])
+        self.search.count.assert_not_called()
+        self.search.to_queryset.assert_not_called()
+
+        self.concept.names.update(name='Bar')
+        response = self.client.get('/concepts/?q=foo')
+
+        self.assertEqual(response.data, [dict(self.hydrated_result, display_name='Bar')])
+
+    @patch('core.concepts.documents.ConceptDocument.search')
+    def test_get_200_not_hydrated(self, search_mock):
+        search_mock.return_value = self.search
+        self.search.execute.return_value.to_dict.return_value = dict(
+            hits=dict(hits=[dict(_id=str(self.concept.id), _source=dict())])
+        )
+
+        response = self.client.get('/concepts/?q=foo&verbose=true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['uuid'], str(self.concept.id))
+        self.assertEqual(response['num_found'], '1')
+        self.search.source.assert_called_once_with(dict(excludes=['*']))
+        self.search.count.assert_not_called()
+
+        self.search.source.reset_mock()
+        response = self.client.get('/concepts/?q=foo')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['uuid'], str(self.concept.id))
+        self.search.source.assert_called_once_with(['list_data'])
+
+    @patch('core.concepts.documents.ConceptDocument.search')
+    def test_get_200_with_facets_in_single_request(self, search_mock):
+        search_mock.return_value = self.search
+        self.search.execute.return_value.to_dict.return_value = dict(
+            hits=dict(hits=[dict(_id=str(self.concept.id), _source=dict(list_data=dict(id='from-index')))])
+        )
+        datatype_buckets = MagicMock(buckets=[dict(key='coded', doc_count=1), dict(key='text', doc_count=2)])
+        self.search.execute.return_value.aggregations = dict(
+            _filter_datatype=dict(datatype=datatype_buckets),
+            **{
+                '_filter_' + name: {name: MagicMock(buckets=[])}
+                for name in ConceptSearch.facets if name != 'datatype'
+            }
+        )
+
+        response = self.client.get('/concepts/?q=foo&datatype=coded', HTTP_INCLUDEFACETS='true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [self.hydrated_result])
+        self.assertEqual(response.data['facets']['fields']['datatype'], [('coded', 1, True), ('text', 2, False)])
+        self.assertEqual(response.data['facets']['fields']['conceptClass'], [])
+        self.search.execute.assert_called_once()
+        self.search.post_filter.assert_called_once_with(Q('terms', datatype=['coded']))
+        self.assertEqual(self.search.aggs.bucket.call_count, len(ConceptSearch.facets))
+        self.search.aggs.bucket.assert_any_call('_filter_datatype', 'filter', filter=Q('match_all'))
+        self.search.aggs.bucket.assert_any_call('_filter_conceptClass', 'filter', filter=Q('terms', datatype=['coded']))
+
+    @patch('core.concepts.documents.ConceptDocument.search')
+    def test_get_200_with_structural_filters_in_filter_context(self, search_mock):
+        search_mock.return_value = self.search
+        self.search.execute.return_value.to_dict.return_value = dict(
+            hits=dict(hits=[dict(_id=str(self.concept.id), _source=dict(list_data=dict(id='from-index')))])
+        )
+
+        response = self.client.get(self.concept.parent.concepts_url + '?q=foo&datatype=!coded,text')
+
+        self.assertEqual(response.status_code, 200)
+        self.search.query.assert_called_once()
+        self.search.filter.assert_any_call('term', is_active=True)
+        self.search.filter.assert_any_call('term', is_latest_version=True)
+        self.search.filter.assert_any_call('term', retired=False)
+        self.search.filter.assert_any_call('term', source=self.concept.parent.mnemonic)
+        self.search.filter.assert_any_call(~Q('terms', datatype=['coded', 'text']))  # pylint: disable=invalid-unary-operand-type
+        self.search.filter.assert_any_call(Q('term', public_can_view=True))
+
+    @patch('core.concepts.documents.ConceptDocument.search')
+    def test_get_200_with_cursor(self, search_mock):
+        search_mock.return_value = self.search
+        self.search.execute.return_value.to_dict.return_value = dict(
+            hits=dict(hits=[
+                dict(
+                    _id=str(self.concept.id), _source=dict(list_data=dict(id='from-index')), sort=[1.5, self.concept.id]
+                )
+            ])
+        )
+
+        response = self.client.get('/concepts/?q=foo&limit=1&page=3&cursor=')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [self.hydrated_result])
+        self.assertEqual(response['num_found'], '1')
+        self.assertEqual(response['num_returned'], '1')
+        self.assertFalse(response.has_header('pages'))
+        next_cursor = encode_cursor([1.5, self.concept.id])
+        self.assertEqual(response['next'], 'http://testserver/concepts/?q=foo&limit=1&cursor=' + next_cursor)
+        self.search.__getitem__.assert_not_called()
+        self.search.sort.assert_called_with(dict(_score=dict(order='desc')), 'db_id')
+        self.search.extra.assert_any_call(size=1)
+        self.search.extra.assert_any_call(track_total_hits=True)
+
+        self.search.extra.reset_mock()
+        self.search.execute.return_value.to_dict.return_value = dict(hits=dict(hits=[]))
+
+        response = self.client.get('/concepts/?q=foo&limit=1&cursor=' + next_cursor)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+        self.assertEqual(response['num_returned'], '0')
+        self.assertFalse(response.has_header('num_found'))
+        self.assertFalse(response.has_header('next'))
+        self.search.extra.assert_any_call(search_after=[1.5, self.concept.id])
+        self.search.extra.assert_any_call(track_total_hits=False)
+
+    @patch('core.common.views.RedisService')
+    @patch('core.concepts.documents.ConceptDocument.search')
+    def test_get_200_without_search_cache_when_redis_is_down(self, search_mock, redis_service_mock):
+        search_mock.return_value = self.search
+        self.search.execute.return_value.to_dict.return_value = dict(
+            hits=dict(hits=[dict(_id=str(self.concept.id), _source=dict(list_data=dict(id='from-index')))])
+        )
+        redis_service_mock.return_value.get_formatted.side_effect = RedisConnectionError
+        url = self.concept.parent.concepts_url + '?q=foo'
+        settings.SEARCH_CACHE_TIMEOUT = 300
+
+        try:
+            for _ in range(2):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data, [self.hydrated_result])
+            self.assertEqual(self.search.execute.call_count, 2)
+        finally:
+            settings.SEARCH_CACHE_TIMEOUT = 0
+
+    @patch('core.common.views.RedisService')
+    @patch('core.concepts.documents.ConceptDocument.search')
+    def test_get_200_from_search_cache(self, search_mock, redis_service_mock):
+        search_mock.return_value = self.search
+        self.search.execute.return_value.to_dict.return_value = dict(
+            hits=dict(hits=[dict(_id=str(self.concept.id), _source=dict(list_data=dict(id='from-index')))])
+        )
+        redis_service_mock.return_value.get_formatted.return_value = 1
+        url = self.concept.parent.concepts_url + '?q=foo'
+        settings.SEARCH_CACHE_TIMEOUT = 300
+
+        try:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, [self.hydrated_result])
+            self.assertEqual(response['num_found'], '1')
+
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data, [self.hydrated_result])
+            self.assertEqual(response['num_found'], '1')
+            self.assertEqual(self.search.execute.call_count, 1)
+            redis_service_mock.return_value.get_formatted.assert_called_with(
+                'search-version:' + self.concept.parent.uri)
+
+            self.client.get(url + '&limit=10')
+            self.assertEqual(self.search.execute.call_count, 2)
+
+            redis_service_mock.return_value.get_formatted.return_value = 2
+            self.client.get(url)
+            self.assertEqual(self.search.execute.call_count, 3)
+
+            self.client.get(url, HTTP_AUTHORIZATION='Token ' + self.concept.created_by.get_token())
+            self.assertEqual(self.search.execute.call_count, 4)
+        finally:
+            settings.SEARCH_CACHE_TIMEOUT = 0
@@ -9,7 +9,7 @@ from rest_framework.exceptions import ErrorDetail
 from core.collections.tests.factories import OrganizationCollectionFactory
 from core.common.tasks import export_source
 from core.common.tests import OCLAPITestCase
-from core.common.utils import get_latest_dir_in_path
+from core.common.utils import get_latest_dir_in_path, get_csv_export_queryset
 from core.concepts.serializers import ConceptVersionDetailSerializer
 from core.concepts.tests.factories import ConceptFactory
 from core.mappings.serializers import MappingDetailSerializer
@@ -75,6 +75,56 @@ class SourceListViewTest(OCLAPITestCase):
         for attr in ['active_concepts', 'active_mappings', 'versions']:
             self.assertTrue(attr in response.data[0]['summary'])
 
+    @patch('core.common.tasks.export_csv.apply_async')
+    @patch('core.common.utils.RedisService')
+    @patch('core.common.mixins.get_csv_from_s3')
+    def test_get_202_csv(self, get_csv_from_s3_mock, redis_service_mock, export_csv_mock):
+        get_csv_from_s3_mock.return_value = None
+        redis_service_mock.return_value.get_formatted.return_value = None
+        OrganizationSourceFactory(organization=self.organization)
+
+        response = self.client.get(self.organization.sources_url + '?csv=true')
+
+        self.assertEqual(response.status_code, 202)
+        task_id = response.data['task']
+        self.assertEqual(response.data, dict(task=task_id, state='PENDING', url=None))
+        filename = 'orgs_{}_sources'.format(self.organization.mnemonic)
+        get_csv_from_s3_mock.assert_called_once_with(filename, False)
+        redis_service_mock.return_value.set_nx.assert_called_once_with(
+            'csv-export:downloads/reader/' + filename, task_id, 86400)
+        export_csv_mock.assert_called_once_with((ANY, filename, False), task_id=task_id)
+        query = export_csv_mock.call_args[0][0][0]
+        self.assertIn('LIMIT 1000', query['sql'])
+        self.assertEqual(
+            list(get_csv_export_queryset(query)), list(self.organization.source_set.order_by('-updated_at')))
+
+        redis_service_mock.return_value.set_nx.return_value = False
+        redis_service_mock.return_value.get_formatted.side_effect = [
+            task_id, dict(task=task_id, state='STARTED', url=None)]
+
+        response = self.client.get(self.organization.sources_url + '?csv=true')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, dict(task=task_id, state='STARTED', url=None))
+        export_csv_mock.assert_called_once()
+
+        get_csv_from_s3_mock.return_value = 'https://s3/' + filename + '.csv.zip'
+
+        response = self.client.get(self.organization.sources_url + '?csv=true&verbose=true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, dict(url='https://s3/' + filename + '.csv.zip'))
+        self.assertNotEqual(get_csv_from_s3_mock.call_args[0][0], filename)
+
+        get_csv_from_s3_mock.return_value = None
+        redis_service_mock.return_value.set_nx.return_value = True
+        export_csv_mock.reset_mock()
+
+        response = self.client.get(self.organization.sources_url + '?csv=true&type=source')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('LIMIT 1000', export_csv_mock.call_args[0][0][0]['sql'])
+
     def test_get_200_zip(self):
         response = self.client.get(
             self.organization.sources_url,
@@ -2,6 +2,7 @@ from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 from pydash import get
 
+from core.common.search import autocomplete_fields
 from core.common.utils import jsonify_safe, flatten_dict
 from core.mappings.models import Mapping
 
@@ -12,6 +13,8 @@ class MappingDocument(Document):
         name = 'mappings'
         settings = {'number_of_shards': 1, 'number_of_replicas': 0}
 
+    list_data_resolved_fields = ('from_concept_name_resolved', 'to_concept_name_resolved')
+
     class Django:
         model = Mapping
         fields = [
@@ -19,6 +22,7 @@ class MappingDocument(Document):
         ]
 
     last_update = fields.DateField(attr='updated_at')
+    db_id = fields.LongField(attr='id')
     owner = fields.KeywordField(attr='owner_name', normalizer="lowercase")
     owner_type = fields.KeywordField(attr='owner_type')
     source = fields.KeywordField(attr='source', normalizer="lowercase")
@@ -43,8 +47,13 @@ class MappingDocument(Document):
     collection = fields.ListField(fields.KeywordField())
     collection_owner_url = fields.ListField(fields.KeywordField())
     public_can_view = fields.BooleanField(attr='public_can_view')
-    id = fields.KeywordField(attr='mnemonic', normalizer="lowercase")
+    id = fields.KeywordField(attr='mnemonic', normalizer="lowercase", fields=autocomplete_fields())
     extras = fields.ObjectField(dynamic=True)
+    list_data = fields.ObjectField(enabled=False)
+
+    def get_queryset(self):
+        return super().get_queryset().select_related(
+            *Mapping.list_select_related).prefetch_related(*Mapping.list_prefetch_related)
 
     @staticmethod
     def prepare_from_concept(instance):
@@ -96,3 +105,26 @@ class MappingDocument(Document):
                 value = flatten_dict(value)
 
         return value or {}
+
+    @classmethod
+    def prepare_list_data(cls, instance):  # stored (not indexed) representation used to render search results
+        from core.mappings.serializers import MappingListSerializer
+        data = MappingListSerializer(instance).data
+        return {field: value for field, value in data.items() if field not in cls.list_data_resolved_fields}
+
+    @staticmethod
+    def resolve_list_data(ids, results):
+        """
+        Adds the list_data fields owned by the from/to concepts (not stored, so that concept renames never serve stale
+        names) to the hydrated results of the mappings with ids.
+        """
+        mappings = {
+            str(mapping.id): mapping for mapping in Mapping.objects.filter(id__in=ids).select_related(
+                'from_concept__parent', 'to_concept__parent').prefetch_related('from_concept__names', 'to_concept__names')
+        }
+        return [
+            dict(
+                result, from_concept_name_resolved=get(mappings, [_id, 'from_concept', 'display_name']),
+                to_concept_name_resolved=get(mappings, [_id, 'to_concept', 'display_name'])
+            ) for _id, result in zip(ids, results)
+        ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.8 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mappings', '0015_auto_20210326_1029'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mapping',
+            name='_versioned_object_url',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -70,8 +70,16 @@ class Mapping(MappingValidationMixin, SourceChildMixin, VersionedModel):
     WAS_RETIRED = MAPPING_WAS_RETIRED
     WAS_UNRETIRED = MAPPING_WAS_UNRETIRED
 
+    list_select_related = (
+        'parent__organization', 'parent__user', 'created_by', 'versioned_object',
+        'from_concept__parent__organization', 'from_concept__parent__user',
+        'to_concept__parent__organization', 'to_concept__parent__user',
+        'from_source__organization', 'from_source__user', 'to_source__organization', 'to_source__user',
+    )
+    list_prefetch_related = ('from_concept__names', 'to_concept__names')
+
     es_fields = {
-        'id': {'sortable': True, 'filterable': True, 'exact': True},
+        'id': {'sortable': True, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 2},
         'last_update': {'sortable': True, 'filterable': False, 'facet': False, 'default': 'desc'},
         'concept': {'sortable': False, 'filterable': True, 'facet': False, 'exact': True},
         'from_concept': {'sortable': False, 'filterable': True, 'facet': True, 'exact': True},
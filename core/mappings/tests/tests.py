@@ -194,6 +194,35 @@ class MappingTest(OCLTestCase):
             persisted_mapping.version_url, persisted_mapping.uri
         )
 
+    def test_document_list_data(self):
+        from core.mappings.documents import MappingDocument
+        from core.mappings.serializers import MappingListSerializer
+        mapping = MappingFactory()
+
+        list_data = MappingDocument.prepare_list_data(mapping)
+
+        self.assertEqual(
+            list_data,
+            {
+                field: value for field, value in MappingListSerializer(mapping).data.items()
+                if field not in ['from_concept_name_resolved', 'to_concept_name_resolved']
+            }
+        )
+        self.assertNotIn('from_concept', list_data)
+        self.assertNotIn('extras', list_data)
+
+    def test_document_resolve_list_data(self):
+        from core.mappings.documents import MappingDocument
+        mapping = MappingFactory(
+            from_concept=ConceptFactory(names=[LocalizedTextFactory(name='From')]),
+            to_concept=ConceptFactory(names=[LocalizedTextFactory(name='To')])
+        )
+
+        self.assertEqual(
+            MappingDocument.resolve_list_data([str(mapping.id)], [dict(id='m1')]),
+            [dict(id='m1', from_concept_name_resolved='From', to_concept_name_resolved='To')]
+        )
+
 
 class OpenMRSMappingValidatorTest(OCLTestCase):
     def setUp(self):
@@ -32,6 +32,9 @@ class MappingBaseView(SourceChildCommonBaseView):
     document_model = MappingDocument
     facet_class = MappingSearch
     es_fields = Mapping.es_fields
+    search_hydration_serializer_class = MappingListSerializer
+    search_cursor_tiebreaker = 'db_id'
+    cursor_pagination_fields = ('updated_at', 'id')
 
     @staticmethod
     def get_detail_serializer(obj, data=None, files=None, partial=False):
@@ -62,10 +65,7 @@ class MappingListView(MappingBaseView, ListWithHeadersMixin, CreateModelMixin):
         if is_latest_version:
             queryset = queryset.filter(is_latest_version=True)
 
-        return queryset.select_related(
-            'parent__organization', 'parent__user', 'from_concept__parent', 'to_concept__parent', 'to_source',
-            'versioned_object', 'from_source',
-        )
+        return queryset.select_related(*Mapping.list_select_related).prefetch_related(*Mapping.list_prefetch_related)
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
@@ -224,9 +224,7 @@ class MappingVersionListAllView(MappingBaseView, ListWithHeadersMixin):
     def get_queryset(self):
         return Mapping.global_listing_queryset(
             self.get_filter_params(), self.request.user
-        ).select_related(
-            'parent__organization', 'parent__user',
-        )
+        ).select_related(*Mapping.list_select_related).prefetch_related(*Mapping.list_prefetch_related)
 
     @swagger_auto_schema(
         manual_parameters=[
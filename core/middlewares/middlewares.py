@@ -1,8 +1,17 @@
+import json
+import random
 import re
 import logging
 from time import time
+
+from django.conf import settings
+from django.db import connection
 from django.utils.termcolors import colorize
-from rest_framework.authtoken.models import Token
+
+from core.common.constants import PROFILE_KEY
+from core.common.profiling import profiling, profile
+from core.common.services import RedisService
+from core.users.authentication import get_request_token_user
 
 request_logger = logging.getLogger('request_logger')
 MAX_BODY_LENGTH = 50000
@@ -19,6 +28,9 @@ class RequestLogMiddleware(BaseMiddleware):
     """
 
     def __call__(self, request):
+        if settings.REQUEST_LOG_MODE == 'structured':
+            return self.log_structured(request)
+
         request.request_start_time = time()
         remote_addr = request.META.get('REMOTE_ADDR')
         user = self.get_user(request)
@@ -47,16 +59,44 @@ class RequestLogMiddleware(BaseMiddleware):
         """ Rest framework user can be identified only from the token """
         header_token = request.META.get('HTTP_AUTHORIZATION', None)
         if header_token is not None:
-            try:
-                token = re.sub('Token ', '', request.META.get('HTTP_AUTHORIZATION', None))
-                token_obj = Token.objects.get(key=token)
-                return token_obj.user
-            except Token.DoesNotExist:
-                pass
+            user = get_request_token_user(request, re.sub('Token ', '', header_token))
+            if user:
+                return user
         return request.user
 
+    def log_structured(self, request):
+        """
+        One JSON line per (sampled) request, without reading bodies, unless the path is sampled for bodies by
+        REQUEST_LOG_BODY_SAMPLE_RATES (errors are always logged).
+        """
+        start_time = time()
+        should_log_body = random.random() < self.get_body_sample_rate(request.path)
+        if should_log_body:
+            self.log_body(self.chunked_to_max(request.body), logging.INFO)
+
+        response = self.get_response(request)
+
+        if response.status_code >= 400 or should_log_body or random.random() < settings.REQUEST_LOG_SAMPLE_RATE:
+            request_logger.info(json.dumps(dict(
+                method=request.method, path=request.get_full_path(), user=self.get_user(request).username,
+                remote_addr=request.META.get('REMOTE_ADDR'), status=response.status_code,
+                latency_ms=round((time() - start_time) * 1000, 1),
+                request_size=int(request.META.get('CONTENT_LENGTH') or 0),
+                response_size=int(response['Content-Length']) if response.has_header('Content-Length') else (
+                    None if response.streaming else len(response.content))
+            )))
+        if should_log_body:
+            self.log_resp_body(response, logging.INFO)
+
+        return response
+
+    @staticmethod
+    def get_body_sample_rate(path):
+        prefixes = [prefix for prefix in settings.REQUEST_LOG_BODY_SAMPLE_RATES if path.startswith(prefix)]
+        return settings.REQUEST_LOG_BODY_SAMPLE_RATES[max(prefixes, key=len)] if prefixes else 0
+
     def log_resp_body(self, response, level=logging.DEBUG):
-        if not re.match(    # only log content type: 'application/xxx'
+        if response.streaming or not re.match(    # only log content type: 'application/xxx'
                 '^application/json', response.get('Content-Type', ''), re.I
         ):
             return
@@ -77,6 +117,47 @@ class RequestLogMiddleware(BaseMiddleware):
         return msg
 
 
+class ProfilingMiddleware(BaseMiddleware):
+    """
+    When PROFILING_ENABLED, times the db queries, ES/Redis/S3 calls and serialization of every request into its
+    Server-Timing header and records it to the samples of its view.
+    """
+    def __call__(self, request):
+        if not settings.PROFILING_ENABLED:
+            return self.get_response(request)
+
+        with profiling() as request_profile, connection.execute_wrapper(self.profile_query):
+            response = self.get_response(request)
+
+        response['Server-Timing'] = request_profile.server_timing
+        view_name = self.get_view_name(request)
+        if view_name:
+            self.record(view_name, request_profile)
+
+        return response
+
+    @staticmethod
+    def profile_query(execute, sql, params, many, context):
+        with profile('db'):
+            return execute(sql, params, many, context)
+
+    @staticmethod
+    def record(view_name, request_profile):
+        try:
+            RedisService().push_capped(
+                PROFILE_KEY.format(view_name), request_profile.to_dict(), settings.PROFILING_SAMPLES)
+        except Exception:  # pylint: disable=broad-except # profiling should never fail the request
+            pass
+
+    @staticmethod
+    def get_view_name(request):
+        resolver_match = getattr(request, 'resolver_match', None)
+        if not resolver_match:
+            return None
+
+        return '{} {}.{}'.format(request.method, resolver_match.func.__module__, resolver_match.func.__name__)
+
+
 class FixMalformedLimitParamMiddleware(BaseMiddleware):
     """
     Why this was necessary: https://github.com/OpenConceptLab/ocl_issues/issues/151
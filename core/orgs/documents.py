@@ -1,6 +1,7 @@
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 
+from core.common.search import autocomplete_fields
 from core.common.utils import jsonify_safe, flatten_dict
 from core.orgs.models import Organization
 
@@ -13,8 +14,8 @@ class OrganizationDocument(Document):
 
     last_update = fields.DateField(attr='updated_at')
     public_can_view = fields.BooleanField(attr='public_can_view')
-    name = fields.KeywordField(attr='name', normalizer="lowercase")
-    mnemonic = fields.KeywordField(attr='mnemonic', normalizer="lowercase")
+    name = fields.KeywordField(attr='name', normalizer="lowercase", fields=autocomplete_fields(keyword=False))
+    mnemonic = fields.KeywordField(attr='mnemonic', normalizer="lowercase", fields=autocomplete_fields())
     extras = fields.ObjectField(dynamic=True)
     user = fields.ListField(fields.KeywordField())
 
@@ -16,8 +16,8 @@ class Organization(BaseResourceModel, SourceContainerMixin):
 
     OBJECT_TYPE = ORG_OBJECT_TYPE
     es_fields = {
-        'name': {'sortable': True, 'filterable': True, 'exact': True},
-        'mnemonic': {'sortable': True, 'filterable': True, 'exact': True},
+        'name': {'sortable': True, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 5},
+        'mnemonic': {'sortable': True, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 2},
         'last_update': {'sortable': True, 'default': 'desc', 'filterable': False},
         'company': {'sortable': False, 'filterable': True, 'exact': True},
         'location': {'sortable': False, 'filterable': True, 'exact': True},
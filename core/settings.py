@@ -16,6 +16,8 @@ import os
 from corsheaders.defaults import default_headers
 from kombu import Queue, Exchange
 
+from core.common.profiling import ProfiledTransport
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 API_BASE_URL = os.environ.get('API_BASE_URL', 'http://localhost:8000')
@@ -87,7 +89,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'core.users.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
@@ -122,6 +124,7 @@ REDOC_SETTINGS = {
 
 MIDDLEWARE = [
     'django.middleware.gzip.GZipMiddleware',
+    'core.middlewares.middlewares.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -172,7 +175,8 @@ ES_HOST = os.environ.get('ES_HOST', 'es')
 ES_PORT = os.environ.get('ES_PORT', '9200')
 ELASTICSEARCH_DSL = {
     'default': {
-        'hosts': [ES_HOST + ':' + ES_PORT]
+        'hosts': [ES_HOST + ':' + ES_PORT],
+        'transport_class': ProfiledTransport,
     },
 }
 
@@ -298,7 +302,9 @@ CELERY_TASK_ROUTES = {
     'core.common.tasks.handle_m2m_changed': {'queue': 'indexing'},
     'core.common.tasks.handle_pre_delete': {'queue': 'indexing'},
     'core.common.tasks.populate_indexes': {'queue': 'indexing'},
-    'core.common.tasks.rebuild_indexes': {'queue': 'indexing'}
+    'core.common.tasks.rebuild_indexes': {'queue': 'indexing'},
+    'core.common.tasks.reindex_since': {'queue': 'indexing'},
+    'core.common.tasks.repair_index': {'queue': 'indexing'}
 }
 CELERY_RESULT_BACKEND = 'redis://%s:%s/%s' % (REDIS_HOST, REDIS_PORT, REDIS_DB)
 CELERY_RESULT_EXTENDED = True
@@ -324,6 +330,22 @@ ELASTICSEARCH_DSL_AUTO_REFRESH = True
 ELASTICSEARCH_DSL_AUTOSYNC = True
 ELASTICSEARCH_DSL_SIGNAL_PROCESSOR = 'core.common.models.CelerySignalProcessor'
 ES_SYNC = True
+SEARCH_CACHE_TIMEOUT = int(os.environ.get('SEARCH_CACHE_TIMEOUT', 300))  # seconds, 0 disables
+# seconds, tasks processing a version for longer are checked against their celery state (to drop lost workers' tasks)
+BACKGROUND_PROCESSING_TIMEOUT = int(os.environ.get('BACKGROUND_PROCESSING_TIMEOUT', 3600))
+CSV_EXPORT_STATUS_TIMEOUT = int(os.environ.get('CSV_EXPORT_STATUS_TIMEOUT', 86400))  # seconds
+TOKEN_USER_CACHE_TIMEOUT = int(os.environ.get('TOKEN_USER_CACHE_TIMEOUT', 300))  # seconds
+REQUEST_LOG_MODE = os.environ.get('REQUEST_LOG_MODE', 'verbose')  # verbose (colorized, with bodies) or structured
+REQUEST_LOG_SAMPLE_RATE = float(os.environ.get('REQUEST_LOG_SAMPLE_RATE', 1))  # structured, errors are always logged
+# structured, rate of requests also logging their bodies by path prefix, e.g. '/importers/:0,/concepts/:0.01'
+REQUEST_LOG_BODY_SAMPLE_RATES = {
+    prefix: float(rate) for prefix, rate in (
+        entry.rsplit(':', 1) for entry in os.environ.get('REQUEST_LOG_BODY_SAMPLE_RATES', '').split(',') if entry
+    )
+}
+# Server-Timing header and per view samples (for /profiling/) of db/ES/Redis/S3/serializer calls and latency
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', False) in ['true', True]
+PROFILING_SAMPLES = int(os.environ.get('PROFILING_SAMPLES', 1000))  # latest samples kept per view
 USE_X_FORWARDED_HOST = True
 SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
 ENV = os.environ.get('ENVIRONMENT', 'development')
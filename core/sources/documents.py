@@ -2,6 +2,7 @@ from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 from pydash import get
 
+from core.common.search import autocomplete_fields
 from core.common.utils import jsonify_safe, flatten_dict
 from core.sources.models import Source
 
@@ -20,9 +21,9 @@ class SourceDocument(Document):
     source_type = fields.KeywordField(attr='source_type', normalizer='lowercase')
     is_active = fields.KeywordField(attr='is_active')
     version = fields.KeywordField(attr='version')
-    name = fields.KeywordField(attr='name', normalizer='lowercase')
+    name = fields.KeywordField(attr='name', normalizer='lowercase', fields=autocomplete_fields(keyword=False))
     canonical_url = fields.KeywordField(attr='canonical_url', normalizer='lowercase')
-    mnemonic = fields.KeywordField(attr='mnemonic', normalizer='lowercase')
+    mnemonic = fields.KeywordField(attr='mnemonic', normalizer='lowercase', fields=autocomplete_fields())
     extras = fields.ObjectField(dynamic=True)
     identifier = fields.ObjectField()
     jurisdiction = fields.ObjectField()
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.8 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0020_source_children_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='_last_child_update',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
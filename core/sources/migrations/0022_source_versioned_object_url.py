@@ -0,0 +1,18 @@
+# Generated by Django 3.1.8 on 2026-10-19 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0021_source_last_child_update'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='source',
+            name='_versioned_object_url',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
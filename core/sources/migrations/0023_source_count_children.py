@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def count_children(apps, schema_editor):
+    Source = apps.get_model('sources', 'Source')
+    for source in Source.objects.filter(
+            Q(active_concepts__isnull=True) | Q(active_mappings__isnull=True)).only('id').iterator():
+        Source.objects.filter(id=source.id).update(**{
+            field: getattr(source, relation).filter(
+                retired=False, is_active=True).distinct('versioned_object_id').count()
+            for relation, field in dict(concepts='active_concepts', mappings='active_mappings').items()
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sources', '0022_source_versioned_object_url'),
+        ('concepts', '0012_auto_20210414_1031'),
+        ('mappings', '0016_mapping_versioned_object_url'),
+    ]
+
+    operations = [
+        # versions that existed before the counts were stored
+        migrations.RunPython(count_children, migrations.RunPython.noop)
+    ]
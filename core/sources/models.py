@@ -15,8 +15,8 @@ from core.sources.constants import SOURCE_TYPE, SOURCE_VERSION_TYPE, HIERARCHY_R
 class Source(ConceptContainerModel):
     es_fields = {
         'source_type': {'sortable': True, 'filterable': True, 'facet': True, 'exact': True},
-        'mnemonic': {'sortable': True, 'filterable': True, 'exact': True},
-        'name': {'sortable': True, 'filterable': True, 'exact': True},
+        'mnemonic': {'sortable': True, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 2},
+        'name': {'sortable': True, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 5},
         'last_update': {'sortable': True, 'filterable': False, 'default': 'desc'},
         'locale': {'sortable': False, 'filterable': True, 'facet': True},
         'owner': {'sortable': True, 'filterable': True, 'facet': True, 'exact': True},
@@ -54,6 +54,7 @@ class Source(ConceptContainerModel):
 
     OBJECT_TYPE = SOURCE_TYPE
     OBJECT_VERSION_TYPE = SOURCE_VERSION_TYPE
+    index_membership_fields = ['source_version']
 
     @classmethod
     def head_from_uri(cls, uri):
@@ -92,6 +93,9 @@ class Source(ConceptContainerModel):
     def versions_url(self):
         return reverse_resource(self, 'source-version-list')
 
+    def get_index_filters(self):
+        return dict(**super().get_index_filters(), owner=str(self.parent), owner_type=self.parent_resource_type)
+
     def update_version_data(self, obj=None):
         super().update_version_data(obj)
         if not obj:
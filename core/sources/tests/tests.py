@@ -1,11 +1,19 @@
+import json
+import time
+from importlib import import_module
+from io import StringIO
+
+import factory
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.db import transaction, IntegrityError
-from mock import patch, Mock
+from mock import patch, Mock, ANY
 
 from core.common.constants import HEAD
-from core.common.tasks import seed_children
+from core.common.tasks import seed_children, repair_index
 from core.common.tests import OCLTestCase
-from core.concepts.tests.factories import ConceptFactory
+from core.concepts.models import Concept
+from core.concepts.tests.factories import ConceptFactory, LocalizedTextFactory
 from core.mappings.tests.factories import MappingFactory
 from core.sources.models import Source
 from core.sources.tests.factories import OrganizationSourceFactory
@@ -243,13 +251,142 @@ class SourceTest(OCLTestCase):
         self.assertEqual(source.active_concepts, 0)
 
         concept = ConceptFactory(sources=[source], parent=source)
-        source.save()
+        source.save(update_fields=source.get_save_fields())
+        source.refresh_from_db()
 
         self.assertEqual(source.num_concepts, 1)
         self.assertEqual(source.active_concepts, 1)
         self.assertEqual(source.last_concept_update, concept.updated_at)
         self.assertEqual(source.last_child_update, source.last_concept_update)
 
+    def test_children_counts_are_maintained(self):
+        source = OrganizationSourceFactory(version=HEAD)
+        concept = Concept.persist_new({
+            **factory.build(dict, FACTORY_CLASS=ConceptFactory), 'mnemonic': 'c1', 'parent': source,
+            'names': [LocalizedTextFactory.build(locale='en', name='English', locale_preferred=True)]
+        }, source.created_by)
+        MappingFactory(sources=[source], parent=source)
+        source.refresh_from_db()
+        self.assertEqual(source.active_concepts, 1)
+        self.assertEqual(source.active_mappings, 1)
+
+        concept.retire(source.created_by)  # older versions of the concept are still active
+        source.refresh_from_db()
+        self.assertEqual(source.active_concepts, 1)
+
+        mappings = list(source.mappings.all())
+        source.concepts.remove(*concept.versions.filter(retired=False))
+        source.mappings.clear()
+        source.refresh_from_db()
+        self.assertEqual(source.active_concepts, 0)
+        self.assertEqual(source.active_mappings, 0)
+
+        source.mappings.add(*mappings)
+        source.active_mappings = 10
+        source.save(update_fields=source.get_save_fields())
+        source.refresh_from_db()
+        self.assertEqual(source.active_mappings, 1)
+
+        source_v1 = OrganizationSourceFactory.build(version='v1', mnemonic=source.mnemonic, organization=source.parent)
+        Source.persist_new_version(source_v1, source.created_by)
+        source_v1.refresh_from_db()
+        self.assertEqual(source_v1.active_concepts, 0)
+        self.assertEqual(source_v1.active_mappings, 1)
+
+    def test_children_counts_are_maintained_on_hard_delete(self):
+        from core.collections.tests.factories import OrganizationCollectionFactory
+        source = OrganizationSourceFactory(version=HEAD)
+        concept = Concept.persist_new({
+            **factory.build(dict, FACTORY_CLASS=ConceptFactory), 'mnemonic': 'c1', 'parent': source,
+            'names': [LocalizedTextFactory.build(locale='en', name='English', locale_preferred=True)]
+        }, source.created_by)
+        mapping = MappingFactory(sources=[source], parent=source)
+        collection = OrganizationCollectionFactory()
+        collection.concepts.add(concept.get_latest_version())
+        collection.mappings.add(mapping)
+        source.refresh_from_db()
+        collection.refresh_from_db()
+        self.assertEqual((source.active_concepts, source.active_mappings), (1, 1))
+        self.assertEqual((collection.active_concepts, collection.active_mappings), (1, 1))
+
+        concept.delete()
+        mapping.delete()
+
+        source.refresh_from_db()
+        collection.refresh_from_db()
+        self.assertEqual((source.active_concepts, source.active_mappings), (0, 0))
+        self.assertEqual((collection.active_concepts, collection.active_mappings), (0, 0))
+
+    def test_save_fields_keep_children_stats(self):
+        source = OrganizationSourceFactory(version=HEAD)
+        self.assertIsNone(Source(name='new').get_save_fields())
+        self.assertIn('name', source.get_save_fields())
+        self.assertFalse(set(source.get_save_fields()) & {'id', 'active_concepts', 'active_mappings'})
+
+        Source.objects.filter(id=source.id).update(active_concepts=5, active_mappings=3)
+        source.name = 'updated'
+        self.assertEqual(Source.persist_changes(source, source.created_by), dict())
+        source.soft_delete()
+        source.refresh_from_db()
+        self.assertEqual(source.name, 'updated')
+        self.assertFalse(source.is_active)
+        self.assertEqual((source.active_concepts, source.active_mappings), (5, 3))
+
+    def test_count_children_migration(self):
+        from django.apps import apps
+        count_children = import_module('core.sources.migrations.0023_source_count_children').count_children
+        source = OrganizationSourceFactory(version=HEAD)
+        ConceptFactory(sources=[source], parent=source)
+        ConceptFactory(sources=[source], parent=source, retired=True)
+        MappingFactory(sources=[source], parent=source)
+        other_source = OrganizationSourceFactory(version=HEAD)
+        Source.objects.filter(id=source.id).update(active_concepts=None, active_mappings=None)
+        Source.objects.filter(id=other_source.id).update(active_concepts=7)
+
+        count_children(apps, None)
+
+        source.refresh_from_db()
+        other_source.refresh_from_db()
+        self.assertEqual((source.active_concepts, source.active_mappings), (1, 1))
+        self.assertEqual(other_source.active_concepts, 7)
+
+    def test_update_children_counts(self):
+        source = OrganizationSourceFactory(version=HEAD)
+        ConceptFactory(sources=[source], parent=source)
+        ConceptFactory(sources=[source], parent=source, retired=True)
+        Source.objects.filter(id=source.id).update(active_concepts=None, active_mappings=None)
+
+        call_command('update_children_counts', 'sources', '--missing', stdout=StringIO())
+
+        source.refresh_from_db()
+        self.assertEqual(source.active_concepts, 1)
+        self.assertEqual(source.active_mappings, 0)
+        self.assertEqual(source.update_children_counts(), dict(active_concepts=1, active_mappings=0))
+
+    def test_last_child_update_is_maintained(self):
+        source = OrganizationSourceFactory(version=HEAD)
+        concept = ConceptFactory(sources=[source], parent=source)
+        source.refresh_from_db()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(source.last_child_update, concept.updated_at)
+
+        concept.comment = 'updated'
+        concept.save()
+        source.refresh_from_db()
+        source_last_child_update = source.last_child_update
+        self.assertEqual(source_last_child_update, concept.updated_at)
+
+        source.save()
+        source.refresh_from_db()
+        self.assertEqual(source.last_child_update, source_last_child_update)
+
+        Source.objects.filter(id=source.id).update(_last_child_update=None)
+        call_command('update_children_counts', 'sources', source.id, stdout=StringIO())
+        source.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.assertEqual(source.last_child_update, source_last_child_update)
+
     def test_new_version_should_not_affect_last_child_update(self):
         source = OrganizationSourceFactory(version=HEAD)
         source_updated_at = source.updated_at
@@ -351,7 +488,8 @@ class SourceTest(OCLTestCase):
         self.assertEqual(Source.get_version(source.mnemonic), source)
         self.assertEqual(Source.get_version(source.mnemonic, 'v1'), source_v1)
 
-    def test_clear_processing(self):
+    @patch('core.common.models.RedisService')
+    def test_clear_processing(self, redis_service_mock):
         source = OrganizationSourceFactory(_background_process_ids=[1, 2])
 
         self.assertEqual(source._background_process_ids, [1, 2])  # pylint: disable=protected-access
@@ -359,56 +497,54 @@ class SourceTest(OCLTestCase):
         source.clear_processing()
 
         self.assertEqual(source._background_process_ids, [])  # pylint: disable=protected-access
+        redis_service_mock().delete.assert_called_once_with('processing:sources:{}'.format(source.id))
 
-    @patch('core.common.models.AsyncResult')
-    def test_is_processing(self, async_result_klass_mock):
+    @patch('core.common.models.RedisService')
+    def test_is_processing(self, redis_service_mock):
+        redis_service_mock().hgetall_formatted.return_value = dict()
         source = OrganizationSourceFactory()
         self.assertFalse(source.is_processing)
+        redis_service_mock().hgetall_formatted.assert_not_called()
 
-        async_result_instance_mock = Mock(successful=Mock(return_value=True))
-        async_result_klass_mock.return_value = async_result_instance_mock
-
-        source._background_process_ids = [None, '']  # pylint: disable=protected-access
-        source.save()
-
-        self.assertFalse(source.is_processing)
-        self.assertEqual(source._background_process_ids, [])  # pylint: disable=protected-access
-
-        source._background_process_ids = ['1', '2', '3']  # pylint: disable=protected-access
+        source._background_process_ids = ['1', '2']  # pylint: disable=protected-access
         source.save()
 
         self.assertFalse(source.is_processing)
-        self.assertEqual(source._background_process_ids, [])  # pylint: disable=protected-access
+        redis_service_mock().hgetall_formatted.assert_called_once_with('processing:sources:{}'.format(source.id))
+        self.assertEqual(source._background_process_ids, ['1', '2'])  # pylint: disable=protected-access
 
-        async_result_instance_mock = Mock(successful=Mock(return_value=False), failed=Mock(return_value=True))
-        async_result_klass_mock.return_value = async_result_instance_mock
-
-        source._background_process_ids = [1, 2, 3]  # pylint: disable=protected-access
-        source.save()
-
-        self.assertFalse(source.is_processing)
-        self.assertEqual(source._background_process_ids, [])  # pylint: disable=protected-access
-
-        async_result_instance_mock = Mock(successful=Mock(return_value=False), failed=Mock(return_value=False))
-        async_result_klass_mock.return_value = async_result_instance_mock
-
-        source._background_process_ids = [1, 2, 3]  # pylint: disable=protected-access
-        source.save()
+        redis_service_mock().hgetall_formatted.return_value = {
+            '2': json.dumps(dict(name='core.common.tasks.seed_children', started_at=time.time()))}
 
         self.assertTrue(source.is_processing)
-        self.assertEqual(source._background_process_ids, [1, 2, 3])  # pylint: disable=protected-access
+        redis_service_mock().set.assert_not_called()
+        redis_service_mock().hdel.assert_not_called()
 
     @patch('core.common.models.AsyncResult')
-    def test_is_exporting(self, async_result_klass_mock):
-        source = OrganizationSourceFactory()
-        self.assertFalse(source.is_exporting)
-
-        async_result_instance_mock = Mock(successful=Mock(return_value=True))
-        async_result_klass_mock.return_value = async_result_instance_mock
+    @patch('core.common.models.RedisService')
+    def test_get_processing_tasks_drops_lost_tasks(self, redis_service_mock, async_result_mock):
+        source = OrganizationSourceFactory(_background_process_ids=['1', '2', '3'])
+        started_at = time.time() - 3601
+        redis_service_mock().hgetall_formatted.return_value = {
+            '1': json.dumps(dict(name='core.common.tasks.seed_children', started_at=time.time())),
+            '2': json.dumps(dict(name='core.common.tasks.export_source', started_at=started_at)),
+            '3': 'core.common.tasks.add_references',
+        }
+        async_result_mock.side_effect = lambda process_id: Mock(state='STARTED' if process_id == '2' else 'PENDING')
 
-        source._background_process_ids = [None, '']  # pylint: disable=protected-access
-        source.save()
+        self.assertEqual(
+            source.get_processing_tasks(),
+            {'1': 'core.common.tasks.seed_children', '2': 'core.common.tasks.export_source'}
+        )
+        self.assertEqual(sorted(call[0][0] for call in async_result_mock.call_args_list), ['2', '3'])
+        redis_service_mock().hdel.assert_called_once_with('processing:sources:{}'.format(source.id), '3')
+        source.refresh_from_db()
+        self.assertEqual(source._background_process_ids, ['1', '2'])  # pylint: disable=protected-access
 
+    @patch('core.common.models.RedisService')
+    def test_is_exporting(self, redis_service_mock):
+        redis_service_mock().hgetall_formatted.return_value = dict()
+        source = OrganizationSourceFactory()
         self.assertFalse(source.is_exporting)
 
         source._background_process_ids = ['1', '2', '3']  # pylint: disable=protected-access
@@ -416,35 +552,22 @@ class SourceTest(OCLTestCase):
 
         self.assertFalse(source.is_exporting)
 
-        async_result_instance_mock = Mock(successful=Mock(return_value=False), failed=Mock(return_value=True))
-        async_result_klass_mock.return_value = async_result_instance_mock
-
-        source._background_process_ids = [1, 2, 3]  # pylint: disable=protected-access
-        source.save()
-
-        self.assertFalse(source.is_exporting)
-
-        async_result_instance_mock = Mock(successful=Mock(return_value=False), failed=Mock(return_value=False))
-        async_result_instance_mock.name = 'core.common.tasks.foobar'
-        async_result_klass_mock.return_value = async_result_instance_mock
-
-        source._background_process_ids = [1, 2, 3]  # pylint: disable=protected-access
-        source.save()
+        redis_service_mock().hgetall_formatted.return_value = {
+            '1': json.dumps(dict(name='core.common.tasks.foobar', started_at=time.time())),
+            '2': json.dumps(dict(name='', started_at=time.time()))
+        }
 
         self.assertFalse(source.is_exporting)
 
-        async_result_instance_mock = Mock(
-            name='core.common.tasks.export_source', successful=Mock(return_value=False), failed=Mock(return_value=False)
-        )
-        async_result_instance_mock.name = 'core.common.tasks.export_source'
-        async_result_klass_mock.return_value = async_result_instance_mock
-
-        source._background_process_ids = [1, 2, 3]  # pylint: disable=protected-access
-        source.save()
+        redis_service_mock().hgetall_formatted.return_value = {
+            '1': json.dumps(dict(name='core.common.tasks.foobar', started_at=time.time())),
+            '3': json.dumps(dict(name='core.common.tasks.export_source', started_at=time.time()))
+        }
 
         self.assertTrue(source.is_exporting)
 
-    def test_add_processing(self):
+    @patch('core.common.models.RedisService')
+    def test_add_processing(self, redis_service_mock):
         source = OrganizationSourceFactory()
         self.assertEqual(source._background_process_ids, [])  # pylint: disable=protected-access
 
@@ -454,12 +577,60 @@ class SourceTest(OCLTestCase):
         source.add_processing('123')
         self.assertEqual(source._background_process_ids, ['123', '123'])  # pylint: disable=protected-access
 
-        source.add_processing('abc')
+        source.add_processing('abc', 'core.common.tasks.export_source')
         self.assertEqual(source._background_process_ids, ['123', '123', 'abc'])  # pylint: disable=protected-access
 
         source.refresh_from_db()
         self.assertEqual(source._background_process_ids, ['123', '123', 'abc'])  # pylint: disable=protected-access
 
+        key = 'processing:sources:{}'.format(source.id)
+        redis_service_mock().hset.assert_called_with(key, 'abc', ANY)
+        self.assertEqual(
+            json.loads(redis_service_mock().hset.call_args[0][2]),
+            dict(name='core.common.tasks.export_source', started_at=ANY)
+        )
+        redis_service_mock().expire.assert_called_with(key, 259200)
+        redis_service_mock().set_json.assert_called_with(
+            'processing-task:abc', dict(app='sources', model='Source', id=source.id), 259200)
+
+    @patch('core.common.models.RedisService')
+    def test_remove_processing(self, redis_service_mock):
+        source = OrganizationSourceFactory(_background_process_ids=['123', 'abc'])
+
+        source.remove_processing('abc')
+
+        source.refresh_from_db()
+        self.assertEqual(source._background_process_ids, ['123'])  # pylint: disable=protected-access
+        redis_service_mock().hdel.assert_called_once_with('processing:sources:{}'.format(source.id), 'abc')
+        redis_service_mock().delete.assert_called_once_with('processing-task:abc')
+
+        redis_service_mock().get_formatted.return_value = dict(app='sources', model='Source', id=source.id)
+
+        Source.remove_task_processing('123')
+
+        source.refresh_from_db()
+        self.assertEqual(source._background_process_ids, [])  # pylint: disable=protected-access
+        redis_service_mock().get_formatted.assert_called_once_with('processing-task:123')
+        redis_service_mock().hdel.assert_called_with('processing:sources:{}'.format(source.id), '123')
+
+    @patch('core.common.models.ConceptContainerModel.remove_task_processing')
+    def test_finished_task_processing_is_removed_for_processing_tasks_only(self, remove_task_processing_mock):
+        from core.common.signals import remove_finished_task_processing, remove_revoked_task_processing
+        task = Mock()
+        task.name = 'core.common.tasks.index_source_concepts'
+
+        remove_finished_task_processing(sender=task, task_id='123')
+        remove_revoked_task_processing(sender=task, request=Mock(id='123'))
+
+        remove_task_processing_mock.assert_not_called()
+
+        task.name = 'core.common.tasks.export_source'
+
+        remove_finished_task_processing(sender=task, task_id='123')
+        remove_revoked_task_processing(sender=task, request=Mock(id='456'))
+
+        self.assertEqual(remove_task_processing_mock.call_args_list, [(('123',),), (('456',),)])
+
     def test_hierarchy_root(self):
         source = OrganizationSourceFactory()
         source_concept = ConceptFactory(parent=source)
@@ -474,6 +645,68 @@ class SourceTest(OCLTestCase):
         source.hierarchy_root = source_concept
         source.full_clean()
 
+    def test_get_index_filters(self):
+        source = OrganizationSourceFactory(version='v1')
+
+        self.assertEqual(
+            source.get_index_filters(),
+            dict(
+                source=source.mnemonic, owner=source.organization.mnemonic, owner_type='Organization',
+                source_version='v1'
+            )
+        )
+
+    def test_get_index_drift(self):
+        source = OrganizationSourceFactory()
+        concept1 = ConceptFactory(parent=source)
+        concept2 = ConceptFactory(parent=source)
+        concept3 = ConceptFactory(parent=source)
+        source.concepts.set([concept1, concept2, concept3])
+        document = Mock()
+        search = document.search.return_value.source.return_value.params.return_value
+        search.filter.return_value = search
+        search.scan.return_value = [
+            Mock(meta=Mock(id=str(concept1.id)), last_update=concept1.updated_at.isoformat()),
+            Mock(meta=Mock(id=str(concept2.id)), last_update='2020-01-01T00:00:00+00:00'),
+            Mock(meta=Mock(id='0'), last_update='2020-01-01T00:00:00+00:00'),
+        ]
+
+        drift = source.get_index_drift(source.concepts, document)
+
+        self.assertEqual(drift, dict(missing=[concept3.id], stale=[concept2.id], extra=[0]))
+        document.search.return_value.source.assert_called_once_with(['last_update'])
+        self.assertEqual(search.filter.call_count, 4)
+        search.filter.assert_any_call('term', source_version=HEAD)
+
+    @patch('core.common.models.IndexingSession.bulk_index')
+    @patch('core.common.models.ConceptContainerModel.get_index_drift')
+    def test_repair_index(self, get_index_drift_mock, bulk_index_mock):
+        from core.concepts.documents import ConceptDocument
+        source = OrganizationSourceFactory()
+        concept1 = ConceptFactory(parent=source)
+        concept2 = ConceptFactory(parent=source)
+        get_index_drift_mock.side_effect = [
+            dict(missing=[concept1.id], stale=[concept2.id], extra=[]),
+            dict(missing=[], stale=[], extra=[]),
+        ]
+
+        self.assertEqual(
+            source.repair_index(dry_run=True),
+            dict(
+                concept=dict(missing=1, stale=1, extra=0),
+                mapping=dict(missing=0, stale=0, extra=0)
+            )
+        )
+        bulk_index_mock.assert_not_called()
+
+        get_index_drift_mock.side_effect = [
+            dict(missing=[concept1.id], stale=[concept2.id], extra=[]),
+            dict(missing=[], stale=[], extra=[]),
+        ]
+        source.repair_index()
+
+        bulk_index_mock.assert_called_once_with(ConceptDocument, sorted([concept1.id, concept2.id]))
+
 
 class TasksTest(OCLTestCase):
     @patch('core.common.models.ConceptContainerModel.index_children')
@@ -513,3 +746,12 @@ class TasksTest(OCLTestCase):
         self.assertEqual(source_v1.mappings.count(), 1)
         export_source_task.delay.assert_called_once_with(source_v1.id)
         index_children_mock.assert_called_once()
+
+    @patch('core.common.models.ConceptContainerModel.repair_index')
+    def test_repair_index_task(self, repair_index_mock):
+        repair_index_mock.return_value = 'drift'
+        source = OrganizationSourceFactory()
+
+        self.assertEqual(repair_index('sources', 'Source', source.id, True), 'drift')
+
+        repair_index_mock.assert_called_once_with(True)
@@ -0,0 +1,81 @@
+import hashlib
+import pickle
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from redis.exceptions import RedisError
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from core.common.constants import TOKEN_USER_CACHE_KEY
+from core.common.services import RedisService
+
+
+def get_token_user_cache_key(key):
+    return TOKEN_USER_CACHE_KEY.format(hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def get_token_user(key):
+    """
+    User of the token key, cached in redis (shared by all workers) for TOKEN_USER_CACHE_TIMEOUT, until the user is
+    saved or the token is replaced/deleted. Falls back to the db when redis is unavailable.
+    """
+    cache_key = get_token_user_cache_key(key)
+    try:
+        cached_user = RedisService().get(cache_key)
+        if cached_user:
+            return pickle.loads(cached_user)
+    except RedisError:
+        cache_key = None
+
+    token = Token.objects.select_related('user').filter(key=key).first()
+    if not token:
+        return None
+
+    if cache_key:
+        try:
+            RedisService().set(cache_key, pickle.dumps(token.user), settings.TOKEN_USER_CACHE_TIMEOUT)
+        except RedisError:
+            pass
+
+    return token.user
+
+
+def get_request_token_user(request, key):
+    """User of the token key, resolved once per request (shared by the request log middleware and DRF auth)"""
+    token_users = request.__dict__.setdefault('_token_users', dict())
+    if key not in token_users:
+        token_users[key] = get_token_user(key)
+
+    return token_users[key]
+
+
+def clear_token_user_cache(keys):
+    cache_keys = [get_token_user_cache_key(key) for key in keys]
+    if cache_keys:
+        try:
+            RedisService().delete(*cache_keys)
+        except RedisError:
+            pass
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication with the token's user read from the redis cache, once per request (reused by the request
+    log middleware).
+    """
+    http_request = None
+
+    def authenticate(self, request):
+        self.http_request = request._request  # pylint: disable=protected-access
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        user = get_token_user(key) if self.http_request is None else get_request_token_user(self.http_request, key)
+        if user is None:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+
+        return user, Token(key=key, user=user)
@@ -1,6 +1,7 @@
 from django_elasticsearch_dsl import Document, fields
 from django_elasticsearch_dsl.registries import registry
 
+from core.common.search import autocomplete_fields
 from core.common.utils import jsonify_safe, flatten_dict
 from core.users.models import UserProfile
 
@@ -13,10 +14,10 @@ class UserProfileDocument(Document):
 
     last_update = fields.DateField(attr='updated_at')
     date_joined = fields.DateField(attr='created_at')
-    username = fields.KeywordField(attr='username', normalizer='lowercase')
+    username = fields.KeywordField(attr='username', normalizer='lowercase', fields=autocomplete_fields())
     location = fields.KeywordField(attr='location', normalizer='lowercase')
     company = fields.KeywordField(attr='company', normalizer='lowercase')
-    name = fields.KeywordField(attr='name', normalizer='lowercase')
+    name = fields.KeywordField(attr='name', normalizer='lowercase', fields=autocomplete_fields(keyword=False))
     extras = fields.ObjectField(dynamic=True)
     org = fields.ListField(fields.KeywordField())
 
@@ -10,6 +10,7 @@ from core.common.mixins import SourceContainerMixin
 from core.common.models import BaseModel, CommonLogoModel
 from core.common.tasks import send_user_verification_email, send_user_reset_password_email
 from core.common.utils import web_url
+from core.users.authentication import clear_token_user_cache
 from .constants import USER_OBJECT_TYPE
 
 
@@ -31,7 +32,8 @@ class UserProfile(AbstractUser, BaseModel, CommonLogoModel, SourceContainerMixin
     mnemonic_attr = 'username'
 
     es_fields = {
-        'username': {'sortable': True, 'filterable': True, 'exact': True},
+        'username': {'sortable': True, 'filterable': True, 'exact': True, 'autocomplete': True, 'boost': 2},
+        'name': {'sortable': False, 'filterable': False, 'exact': False, 'autocomplete': True, 'boost': 5},
         'date_joined': {'sortable': True, 'default': 'asc', 'filterable': False},
         'company': {'sortable': True, 'filterable': True, 'exact': True},
         'location': {'sortable': True, 'filterable': True, 'exact': True},
@@ -99,10 +101,26 @@ class UserProfile(AbstractUser, BaseModel, CommonLogoModel, SourceContainerMixin
         parent_id = concept_container.parent_id
         return parent_id == self.id or self.organizations.filter(id=parent_id).exists()
 
+    def get_organization_ids(self):
+        """Ids of the user's organizations, loaded once per user instance (i.e. once per request)"""
+        organization_ids = getattr(self, '_organization_ids', None)
+        if organization_ids is None:
+            organization_ids = frozenset(self.organizations.values_list('id', flat=True))
+            self._organization_ids = organization_ids
+
+        return organization_ids
+
+    def clear_organization_ids_cache(self):
+        self._organization_ids = None
+
     def __create_token(self):
         return Token.objects.create(user=self)
 
+    def clear_token_cache(self):
+        clear_token_user_cache(Token.objects.filter(user_id=self.id).values_list('key', flat=True))
+
     def __delete_token(self):
+        self.clear_token_cache()
         return Token.objects.filter(user=self).delete()
 
     @property
@@ -1,4 +1,7 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from mock import Mock, patch, ANY
+from redis.exceptions import ConnectionError as RedisConnectionError
 from rest_framework.authtoken.models import Token
 
 from core.collections.tests.factories import OrganizationCollectionFactory
@@ -6,12 +9,21 @@ from core.common.constants import ACCESS_TYPE_NONE, HEAD, OCL_ORG_ID
 from core.common.tasks import send_user_verification_email, send_user_reset_password_email
 from core.common.tests import OCLTestCase, OCLAPITestCase
 from core.orgs.models import Organization
+from core.users.authentication import get_token_user
 from core.sources.tests.factories import OrganizationSourceFactory
 from core.users.constants import USER_OBJECT_TYPE
 from core.users.models import UserProfile
 from core.users.tests.factories import UserProfileFactory
 
 
+def use_dict_cache(redis_service_mock):
+    cache = dict()
+    redis_service_mock().get.side_effect = cache.get
+    redis_service_mock().set.side_effect = lambda key, val, expiry=None: cache.update({key: val})
+    redis_service_mock().delete.side_effect = lambda *keys: [cache.pop(key, None) for key in keys]
+    return cache
+
+
 class UserProfileTest(OCLTestCase):
     def setUp(self):
         super().setUp()
@@ -149,6 +161,64 @@ class UserProfileTest(OCLTestCase):
         self.assertFalse(user.check_password('password'))
         self.assertEqual(user.password, 'hashedpassword')
 
+    def test_get_organization_ids(self):
+        user = UserProfileFactory()
+        org = Organization.objects.create(mnemonic='org1', name='Org 1', created_by=user, updated_by=user)
+        user.organizations.add(self.org)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(user.get_organization_ids(), {self.org.id})
+            self.assertEqual(user.get_organization_ids(), {self.org.id})
+
+        user.organizations.add(org)
+
+        self.assertEqual(user.get_organization_ids(), {self.org.id, org.id})
+
+        user.organizations.remove(self.org)
+
+        self.assertEqual(user.get_organization_ids(), {org.id})
+
+        org.members.clear()
+
+        self.assertEqual(user.get_organization_ids(), {org.id})  # memoized for the instance (request) only
+        self.assertEqual(UserProfile.objects.get(id=user.id).get_organization_ids(), set())
+
+    @patch('core.users.authentication.RedisService')
+    def test_get_token_user(self, redis_service_mock):
+        cache = use_dict_cache(redis_service_mock)
+        user = UserProfileFactory()
+        token = user.get_token()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(get_token_user(token), user)
+        redis_service_mock().set.assert_called_once_with(ANY, ANY, 300)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_token_user(token), user)
+        self.assertIsNone(get_token_user('foobar'))
+
+        user.first_name = 'Updated'
+        user.save()
+
+        self.assertEqual(get_token_user(token).first_name, 'Updated')
+
+        user.refresh_token()
+
+        self.assertIsNone(get_token_user(token))
+        self.assertEqual(get_token_user(user.get_token()), user)
+
+        Token.objects.filter(user=user).delete()
+
+        self.assertEqual(cache, dict())
+        self.assertIsNone(get_token_user(token))
+
+    @patch('core.users.authentication.RedisService')
+    def test_get_token_user_without_redis(self, redis_service_mock):
+        redis_service_mock().get.side_effect = RedisConnectionError()
+        user = UserProfileFactory()
+
+        self.assertEqual(get_token_user(user.get_token()), user)
+        redis_service_mock().set.assert_not_called()
+
     def test_get_token(self):
         user = UserProfileFactory()
 
@@ -246,6 +316,29 @@ class TokenAuthenticationViewTest(OCLAPITestCase):
         user.refresh_from_db()
         self.assertIsNotNone(user.last_login)
 
+    @patch('core.users.authentication.RedisService')
+    def test_authentication_from_cached_token(self, redis_service_mock):
+        use_dict_cache(redis_service_mock)
+        user = UserProfileFactory()
+        token = user.get_token()
+        get_token_user(token)
+        redis_service_mock().get.reset_mock()
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/user/', HTTP_AUTHORIZATION='Token ' + token)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], user.username)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in context.captured_queries))
+        redis_service_mock().get.assert_called_once()  # shared by the request log middleware and DRF auth
+
+        user.is_active = False
+        user.save()
+
+        response = self.client.get('/user/', HTTP_AUTHORIZATION='Token ' + token)
+
+        self.assertEqual(response.status_code, 401)
+
 
 class UserLogoViewTest(OCLAPITestCase):
     def setUp(self):